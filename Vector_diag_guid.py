@@ -1,31 +1,48 @@
 import sys
 import os
-import csv
 import traceback
-import uuid
 from datetime import datetime
+from collections import deque
 import time # Cho việc sleep nhỏ trong thread
 
+STARTUP_TIME = time.perf_counter() # Mốc đo thời gian hiển thị cửa sổ chính
+
 # --- Kiểm tra và Nhập Thư viện ---
-try:
-    import cantools
-except ImportError:
+# cantools và pyqtgraph chỉ được kiểm tra có cài đặt hay không; chúng được import
+# ở lần dùng đầu tiên (tải DBC / mở tab Đồ thị) qua module_loader.
+from module_loader import load_module, module_available, format_import_times
+if not module_available('cantools'):
     print("Lỗi: Thư viện 'cantools' chưa được cài đặt.")
     sys.exit(1)
+from can_decoder import load_dbc # Đọc DBC (thử nhiều encoding)
+from can_network import new_network, set_dbc, set_trace, clear_trace, set_signal_lod # Dữ liệu mạng (không phụ thuộc Qt)
+from live_decode import DecodedBatch, decode_live_batch # Giải mã batch frame live
+from trace_loader import load_trace # Đọc trace CSV/ASC/BLF + cache + giải mã
+
+from trace_buffer import FrameRingBuffer
+from signal_series import (SampleRingBuffer, MinMaxPyramid, series_length, decimate_series, build_signal_pyramids,
+                           MIN_PLOT_BUCKETS, LOD_MIN_SAMPLES, LIVE_LOD_BASE_BLOCK) # Chuỗi tín hiệu live + giảm điểm min/max / LOD cho đồ thị
+from can_logger import (open_log_writer, log_format_for_path, available_compressions, LOG_FORMAT_CSV,
+                        LOG_FORMAT_BLF, FLUSH_BYTES, FLUSH_INTERVAL_S,
+                        TriggeredLogWriter, LogTrigger, TRIGGER_ID, TRIGGER_SIGNAL, TRIGGER_ERROR) # Ghi log CSV/BLF theo khối, tách file + nén, trigger
 
 try:
     from PyQt5.QtWidgets import (
         QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-        QAction, QFileDialog, QTreeWidget, QTreeWidgetItem, QTableWidget, QTableWidgetItem,
+        QAction, QFileDialog, QTreeWidget, QTreeWidgetItem,
         QStatusBar, QMessageBox, QSplitter, QHeaderView, QLabel, QMenuBar,
         QTabWidget, QPushButton, QLineEdit, QComboBox, QCheckBox, QSizePolicy,
-        QProgressDialog # Để hiển thị quá trình quét kênh
+        QProgressDialog, # Để hiển thị quá trình quét kênh
+        QTableView, QSpinBox, QDoubleSpinBox, QGroupBox, QListWidget
     )
-    from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QTimer, QMutex, QMutexLocker
+    from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QTimer, QMutex, QMutexLocker, QWaitCondition
     from PyQt5.QtGui import QIcon, QFont, QColor
 except ImportError:
     print("Lỗi: Thư viện 'PyQt5' chưa được cài đặt.")
     sys.exit(1)
+from trace_model import TraceTableModel, LIVE_TRACE_COLUMNS # Model Qt cho bảng Trace
+from signal_model import SignalTableModel, SIGNAL_COLUMN_HEADERS # Model Qt cho bảng Tín hiệu
+from signal_export import export_signals, default_export_format, EXPORT_FORMAT_PARQUET # Xuất tín hiệu dạng cột
 
 try:
     import can
@@ -37,12 +54,10 @@ except ImportError:
     PYTHON_CAN_AVAILABLE = False
     # sys.exit(1) # Có thể thoát hoặc để ứng dụng chạy với tính năng hạn chế
 
-# Tùy chọn: Thư viện đồ thị
-try:
-    import pyqtgraph as pg
-    PYQTGRAPH_AVAILABLE = True
-except ImportError:
-    PYQTGRAPH_AVAILABLE = False
+# Tùy chọn: Thư viện đồ thị (nạp khi tab Đồ thị được mở lần đầu)
+pg = None
+PYQTGRAPH_AVAILABLE = module_available('pyqtgraph')
+if not PYQTGRAPH_AVAILABLE:
     print("Cảnh báo: Thư viện 'pyqtgraph' không có sẵn. Tab đồ thị sẽ bị vô hiệu hóa.")
 
 # --- Định nghĩa Hằng số ---
@@ -60,19 +75,18 @@ CONNECTION_STATUS = {
 # --- Worker Threads (DbcLoadingWorker, TraceLoadingWorker giữ nguyên từ bản trước) ---
 # Thêm CanListenerThread
 
-class DbcLoadingWorker(QThread): # Giữ nguyên
+class DbcLoadingWorker(QThread):
     finished = pyqtSignal(str, object, str) # network_id, db, path_or_error
     progress = pyqtSignal(str, str)
-    # ... (code giống bản trước) ...
+
     def __init__(self, network_id, file_path):
         super().__init__()
         self.network_id = network_id
         self.file_path = file_path
     def run(self):
-        # (Code from previous version)
         try:
             self.progress.emit(self.network_id, f"Phân tích DBC: {os.path.basename(self.file_path)}...")
-            db = cantools.db.load_file(self.file_path, strict=False, encoding='latin-1') # Or try multiple encodings
+            db = load_dbc(self.file_path, progress=lambda message: self.progress.emit(self.network_id, message))
             self.finished.emit(self.network_id, db, self.file_path)
         except FileNotFoundError:
             self.finished.emit(self.network_id, None, f"Error: DBC file not found '{self.file_path}'")
@@ -80,92 +94,155 @@ class DbcLoadingWorker(QThread): # Giữ nguyên
              error_details = traceback.format_exc()
              self.finished.emit(self.network_id, None, f"Error reading DBC:\n{e}\n\nDetails:\n{error_details}")
 
-class TraceLoadingWorker(QThread): # Giữ nguyên
-    finished = pyqtSignal(str, list, dict, str) # network_id, trace_data, signal_timeseries, path_or_error
+class TraceLoadingWorker(QThread):
+    finished = pyqtSignal(str, object, dict, str) # network_id, TraceStore, signal_timeseries, path_or_error
     progress = pyqtSignal(str, str)
     progress_percent = pyqtSignal(str, int)
-    # ... (code giống bản trước) ...
-    def __init__(self, network_id, file_path, db=None):
+
+    def __init__(self, network_id, file_path, decoder_table=None, dbc_path=None):
         super().__init__()
         self.network_id = network_id
         self.file_path = file_path
-        self.db = db
+        self.decoder_table = decoder_table
+        self.dbc_path = dbc_path if decoder_table is not None else None # Khóa cache theo DBC
+
     def run(self):
-        # (Code from previous version - parses CSV)
-        # Emits finished signal with parsed data or errors
-        trace_data = []
-        signal_timeseries = {}
         try:
-             # Simplified parsing logic
-             with open(self.file_path, 'r', encoding='utf-8') as f:
-                 # ... (parsing logic for timestamp, id, dlc, data) ...
-                 # Simulate loading completion
-                 time.sleep(1) # Simulate work for demonstration
-                 self.progress.emit(self.network_id, "Trace file read complete.")
-                 self.progress_percent.emit(self.network_id, 100)
-             self.finished.emit(self.network_id, trace_data, signal_timeseries, self.file_path)
+            trace_data, signal_timeseries, _decoded, _errors = load_trace(
+                self.file_path, self.decoder_table, self.dbc_path,
+                status=lambda message: self.progress.emit(self.network_id, message),
+                percent=lambda value: self.progress_percent.emit(self.network_id, value))
+            self.finished.emit(self.network_id, trace_data, signal_timeseries, self.file_path)
         except FileNotFoundError:
             self.finished.emit(self.network_id, None, {}, f"Error: Trace file not found '{self.file_path}'")
         except Exception as e:
              error_details = traceback.format_exc()
              self.finished.emit(self.network_id, None, {}, f"Error reading Trace file:\n{e}\n\nDetails:\n{error_details}")
 
-class LoggingWorker(QThread): # Giữ nguyên
+class LodBuildWorker(QThread):
+    """Tạo kim tự tháp min/max (LOD) cho các chuỗi tín hiệu dài sau khi tải trace."""
+    finished = pyqtSignal(str, object, object) # network_id, signal_timeseries đã dùng, {tên: MinMaxPyramid}
+
+    def __init__(self, network_id, signal_timeseries):
+        super().__init__()
+        self.network_id = network_id
+        self.signal_timeseries = signal_timeseries
+        self._stop_requested = False
+
+    def run(self):
+        pyramids = build_signal_pyramids(self.signal_timeseries, should_stop=lambda: self._stop_requested)
+        self.finished.emit(self.network_id, self.signal_timeseries, pyramids)
+
+    def stop(self):
+        self._stop_requested = True
+
+class SignalExportWorker(QThread):
+    """Giải mã trace (file hoặc bản chụp bộ đệm live) và xuất tín hiệu dạng cột."""
+    finished = pyqtSignal(str, bool, str) # network_id, success, output_path_or_error
+    progress = pyqtSignal(str, str)
+    progress_percent = pyqtSignal(str, int)
+
+    def __init__(self, network_id, trace_data, decoder_table, file_path):
+        super().__init__()
+        self.network_id = network_id
+        self.trace_data = trace_data
+        self.decoder_table = decoder_table
+        self.file_path = file_path
+
+    def run(self):
+        def report_progress(done, total):
+            self.progress_percent.emit(self.network_id, int(done * 100 / total) if total else 100)
+
+        try:
+            output_path, _fmt, row_count = export_signals(self.trace_data, self.decoder_table, self.file_path,
+                                                          progress=report_progress)
+            self.progress.emit(self.network_id, f"Exported {row_count} signal rows: {os.path.basename(output_path)}")
+            self.finished.emit(self.network_id, True, output_path)
+        except Exception as e:
+            error_details = traceback.format_exc()
+            self.finished.emit(self.network_id, False, f"Error exporting signals:\n{e}\n\nDetails:\n{error_details}")
+
+class LoggingWorker(QThread):
+    """Ghi frame live ra file log (CSV/BLF) trên thread riêng.
+
+    Producer đưa batch vào một deque (append/extend của deque an toàn giữa
+    các thread) rồi đánh thức thread ghi qua QWaitCondition, không có polling.
+    Mỗi lần thức dậy thread ghi lấy hết hàng đợi và ghi cả khối; flush theo
+    ngưỡng byte/thời gian của LogFileWriter, số đếm gửi lên UI có giới hạn tần suất.
+    """
     error = pyqtSignal(str, str) # network_id, error_message
     status = pyqtSignal(str, str) # network_id, status_message
     message_count = pyqtSignal(str, int) # net_id, count
 
-    # ... (code gần giống bản trước, có message_queue, mutex) ...
-    def __init__(self, network_id, log_file_path):
+    COUNT_UPDATE_INTERVAL_S = 0.25 # Tối đa ~4 lần cập nhật số đếm mỗi giây
+
+    def __init__(self, network_id, log_file_path, log_format=None,
+                 flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S,
+                 rotate_bytes=None, rotate_interval=None, compression=None,
+                 start_trigger=None, stop_trigger=None, pre_trigger=5.0, post_trigger=10.0, decoder_table=None):
         super().__init__()
         self.network_id = network_id
         self.log_file_path = log_file_path
-        self._is_running = False
-        self.message_queue = [] # Simple list-based queue for demo
+        self.log_format = log_format or log_format_for_path(log_file_path)
+        self.rotate_bytes = rotate_bytes       # Tách file khi đạt dung lượng (byte)
+        self.rotate_interval = rotate_interval # ... hoặc sau khoảng thời gian (giây)
+        self.compression = compression         # Nén file đã đóng: None/"gzip"/"zstd"
+        # Chế độ trigger (start_trigger khác None): chỉ ghi quanh các sự kiện
+        self.start_trigger = start_trigger
+        self.stop_trigger = stop_trigger
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.decoder_table = decoder_table
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._stop_requested = False # Frame tới trước khi run() bắt đầu vẫn được giữ lại
+        self.message_queue = deque()
         self.queue_mutex = QMutex()
-        self.writer = None
-        self.file = None
+        self.queue_not_empty = QWaitCondition()
         self._message_counter = 0
 
     def run(self):
-        self._is_running = True
         self._message_counter = 0
+        log_writer = None
         try:
             self.status.emit(self.network_id, f"Starting log: {os.path.basename(self.log_file_path)}")
-            # Use 'a' to append if file exists? Or 'w' to overwrite?
-            self.file = open(self.log_file_path, 'w', newline='', encoding='utf-8')
-            self.writer = csv.writer(self.file)
-            self.writer.writerow(['Timestamp', 'ID_Hex', 'DLC', 'Data_Hex', 'IsExtended', 'IsRemote', 'IsError']) # Include more message attrs
-
-            while self._is_running:
-                messages_to_write = []
+            on_error = lambda message: self.error.emit(self.network_id, message)
+            if self.start_trigger is not None:
+                log_writer = TriggeredLogWriter(
+                    self.log_file_path, self.start_trigger, self.stop_trigger, self.pre_trigger, self.post_trigger,
+                    self.decoder_table, self.log_format, self.compression, self.flush_bytes, self.flush_interval,
+                    on_capture=lambda message: self.status.emit(self.network_id, message), on_error=on_error)
+                self.status.emit(self.network_id, f"Chờ trigger ({self.start_trigger.describe()})...")
+            else:
+                log_writer = open_log_writer(
+                    self.log_file_path, self.log_format, self.rotate_bytes, self.rotate_interval, self.compression,
+                    self.flush_bytes, self.flush_interval, on_error=on_error)
+            # Thức dậy định kỳ khi hàng đợi trống để flush theo thời gian
+            wait_ms = int((self.flush_interval or 1.0) * 1000)
+            last_count_update = 0.0
+
+            while True:
                 with QMutexLocker(self.queue_mutex):
-                    if self.message_queue:
-                        messages_to_write = self.message_queue
-                        self.message_queue = [] # Clear the queue
+                    if not self.message_queue and not self._stop_requested:
+                        self.queue_not_empty.wait(self.queue_mutex, wait_ms)
+                    stop_requested = self._stop_requested
 
+                # Lấy hết hàng đợi (popleft an toàn khi producer vẫn đang thêm)
+                queue = self.message_queue
+                messages_to_write = [queue.popleft() for _ in range(len(queue))]
                 if messages_to_write:
-                    for msg in messages_to_write:
-                        # Format can.Message for CSV
-                        row = [
-                            f"{msg.timestamp:.6f}", # Timestamp with higher precision
-                            f"{msg.arbitration_id:X}",
-                            str(msg.dlc),
-                            msg.data.hex().upper(),
-                            str(msg.is_extended_id),
-                            str(msg.is_remote_frame),
-                            str(msg.is_error_frame),
-                            # Add channel? msg.channel?
-                        ]
-                        self.writer.writerow(row)
-                        self._message_counter +=1
-                    self.file.flush() # Flush occasionally
-                    self.message_count.emit(self.network_id, self._message_counter) # Emit count
-
-
-                # Sleep only if the queue was empty to avoid delaying writes
-                if not messages_to_write:
-                     self.msleep(50) # Check queue periodically
+                    log_writer.write(messages_to_write)
+                    self._message_counter = log_writer.message_count
+                else:
+                    log_writer.maybe_flush()
+
+                now = time.monotonic()
+                if messages_to_write and now - last_count_update >= self.COUNT_UPDATE_INTERVAL_S:
+                    last_count_update = now
+                    self.message_count.emit(self.network_id, self._message_counter)
+
+                if stop_requested and not self.message_queue:
+                    break # Đã dừng và ghi hết hàng đợi
 
             self.status.emit(self.network_id, "Logging stopped.")
 
@@ -173,33 +250,52 @@ class LoggingWorker(QThread): # Giữ nguyên
             self.error.emit(self.network_id, f"Logging Error: {e}")
             self.status.emit(self.network_id, "Logging Error.")
         finally:
-            if self.file:
-                self.file.close()
-            self._is_running = False
+            if log_writer is not None:
+                try:
+                    log_writer.close()
+                except Exception as e:
+                    self.error.emit(self.network_id, f"Logging Error: {e}")
             self.message_count.emit(self.network_id, self._message_counter) # Final count
 
     def stop(self):
+        """Dừng sau khi đã ghi hết các frame còn trong hàng đợi."""
         self.status.emit(self.network_id, "Stopping log...")
-        self._is_running = False
+        with QMutexLocker(self.queue_mutex):
+            self._stop_requested = True
+            self.queue_not_empty.wakeAll()
 
     def add_message(self, message: can.Message):
-         """Adds a single message to the queue (thread-safe)."""
-         if self._is_running:
-              with QMutexLocker(self.queue_mutex):
-                   self.message_queue.append(message)
+        """Adds a single message to the queue (thread-safe)."""
+        self.add_messages([message])
+
+    def on_messages_received(self, network_id, messages: list):
+        """Slot cho CanListenerThread.messages_received (DirectConnection, chạy trên luồng listener)."""
+        self.add_messages(messages)
 
     def add_messages(self, messages: list):
         """Adds a list of messages to the queue (thread-safe)."""
-        if self._is_running:
-            with QMutexLocker(self.queue_mutex):
-                self.message_queue.extend(messages)
+        if self._stop_requested:
+            return
+        self.message_queue.extend(messages)
+        # Khóa chỉ để không mất tín hiệu đánh thức giữa lúc kiểm tra và wait()
+        with QMutexLocker(self.queue_mutex):
+            self.queue_not_empty.wakeOne()
 
 class CanListenerThread(QThread):
-    """Thread to receive messages from a python-can bus."""
-    message_received = pyqtSignal(str, object) # network_id, can.Message object
+    """Thread to receive messages from a python-can bus.
+
+    Frames are delivered in batches (bounded by BATCH_MAX_FRAMES and
+    BATCH_MAX_INTERVAL_S) so that a loaded bus does not flood the GUI event
+    loop with one queued signal per frame.
+    """
+    messages_received = pyqtSignal(str, list) # network_id, [can.Message, ...]
     listener_error = pyqtSignal(str, str)      # network_id, error message
     connection_closed = pyqtSignal(str)       # network_id
 
+    BATCH_MAX_FRAMES = 256       # Emit khi batch đủ số frame này...
+    BATCH_MAX_INTERVAL_S = 0.020 # ...hoặc khi frame đầu tiên trong batch đã chờ quá 20 ms
+    IDLE_RECV_TIMEOUT_S = 0.1    # Timeout khi batch rỗng để kiểm tra cờ _is_running
+
     def __init__(self, network_id, can_bus: can.Bus, parent=None):
         super().__init__(parent)
         self.network_id = network_id
@@ -209,19 +305,25 @@ class CanListenerThread(QThread):
     def run(self):
         self._is_running = True
         print(f"Listener thread started for network {self.network_id}")
+        batch = []
+        batch_deadline = 0.0
         while self._is_running:
             try:
-                # Use a timeout to allow checking _is_running flag
-                msg = self.bus.recv(timeout=0.1)
+                # Block for the full idle timeout only while the batch is empty,
+                # otherwise wait at most until the batch has to be flushed.
+                if batch:
+                    timeout = max(0.0, batch_deadline - time.monotonic())
+                else:
+                    timeout = self.IDLE_RECV_TIMEOUT_S
+                msg = self.bus.recv(timeout=timeout)
                 if msg:
-                    # Add network_id or potentially channel info to the message if needed later
-                    # msg.network_id = self.network_id
-                    self.message_received.emit(self.network_id, msg)
-                # else:
-                    # Timeout occurred, loop continues
+                    if not batch:
+                        batch_deadline = time.monotonic() + self.BATCH_MAX_INTERVAL_S
+                    batch.append(msg)
 
-                # Add a small sleep to prevent high CPU usage if recv is non-blocking immediately
-                # self.msleep(1) # Careful: this adds latency
+                if batch and (len(batch) >= self.BATCH_MAX_FRAMES or time.monotonic() >= batch_deadline):
+                    self.messages_received.emit(self.network_id, batch)
+                    batch = []
 
             except can.CanError as e:
                  # Handle specific CAN errors (e.g., bus detached)
@@ -235,9 +337,11 @@ class CanListenerThread(QThread):
 
         print(f"Listener thread stopping for network {self.network_id}")
         try:
+             # Deliver frames still pending in the last partial batch
+             if batch:
+                 self.messages_received.emit(self.network_id, batch)
              # Optionally, ensure bus cleanup if not done elsewhere
              # self.bus.shutdown() # Careful: shutdown might be called by main thread
-             pass
         except Exception as e:
             print(f"Error during listener ({self.network_id}) cleanup: {e}")
         finally:
@@ -247,6 +351,62 @@ class CanListenerThread(QThread):
         print(f"Requesting stop for listener thread {self.network_id}")
         self._is_running = False
 
+class LiveDecodeWorker(QThread):
+    """Per-network decode stage between CanListenerThread and the GUI.
+
+    The listener hands raw frame batches to add_messages() directly from its
+    own thread; this thread decodes them with the network's DecoderTable
+    and publishes one DecodedBatch per input batch.
+    """
+    decoded_batch = pyqtSignal(str, object) # network_id, DecodedBatch
+
+    def __init__(self, network_id, decoder_table=None, parent=None):
+        super().__init__(parent)
+        self.network_id = network_id
+        self._decoder_table = decoder_table
+        self._stop_requested = False # Không dùng cờ _is_running: frame có thể tới trước khi run() bắt đầu
+        self.message_queue = []
+        self.queue_mutex = QMutex()
+        self.queue_not_empty = QWaitCondition()
+
+    def run(self):
+        while True:
+            with QMutexLocker(self.queue_mutex):
+                while not self._stop_requested and not self.message_queue:
+                    self.queue_not_empty.wait(self.queue_mutex)
+                pending = self.message_queue
+                self.message_queue = []
+                decoder_table = self._decoder_table
+                stop_requested = self._stop_requested
+
+            if pending:
+                try:
+                    batch = decode_live_batch(pending, decoder_table)
+                except Exception as e:
+                    print(f"Decode worker ({self.network_id}) error: {e}")
+                    batch = DecodedBatch(pending)
+                self.decoded_batch.emit(self.network_id, batch)
+            elif stop_requested:
+                break # Stopped and the queue is drained
+
+    def set_decoder_table(self, decoder_table):
+        """Đổi bảng giải mã khi tải DBC mới (thread-safe)."""
+        with QMutexLocker(self.queue_mutex):
+            self._decoder_table = decoder_table
+
+    def add_messages(self, network_id, messages: list):
+        """Queues a batch of raw frames (thread-safe, called from the listener thread)."""
+        with QMutexLocker(self.queue_mutex):
+            if not self._stop_requested:
+                self.message_queue.extend(messages)
+                self.queue_not_empty.wakeOne()
+
+    def stop(self):
+        """Dừng sau khi đã giải mã hết các frame còn trong hàng đợi."""
+        with QMutexLocker(self.queue_mutex):
+            self._stop_requested = True
+            self.queue_not_empty.wakeAll()
+
 # --- Widgets cho các Tab ---
 
 class BaseNetworkTab(QWidget): # Giữ nguyên cơ sở
@@ -254,6 +414,7 @@ class BaseNetworkTab(QWidget): # Giữ nguyên cơ sở
     loadTraceRequested = pyqtSignal(str)
     selectLogFileRequested = pyqtSignal(str)
     toggleLoggingRequested = pyqtSignal(str)
+    exportSignalsRequested = pyqtSignal(str) # Xuất tín hiệu đã giải mã (Parquet/npz)
     connectRequested = pyqtSignal(str)      # NEW: Request connect
     disconnectRequested = pyqtSignal(str)   # NEW: Request disconnect
     rescanChannelsRequested = pyqtSignal()  # NEW: Request channel rescan
@@ -488,8 +649,8 @@ class HardwareConfigTab(BaseNetworkTab):
 # Tab Trace/Messages (Cập nhật để nhận live data)
 class TraceMessagesTab(BaseNetworkTab): # Sửa đổi nhiều
     signalValueUpdate = pyqtSignal(str, str, object, object) # net_id, sig_name, value, timestamp_obj
-    # Maximum rows to keep in the table to prevent memory issues with long live traces
-    MAX_TABLE_ROWS = 10000
+    # Số frame live giữ lại cho mỗi mạng (bộ đệm vòng, frame cũ nhất bị ghi đè)
+    MAX_LIVE_FRAMES = 1000000
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -507,25 +668,28 @@ class TraceMessagesTab(BaseNetworkTab): # Sửa đổi nhiều
         self.clearButton = QPushButton(QIcon.fromTheme("edit-clear"), "Xóa Bảng")
         self.clearButton.clicked.connect(self._clear_table)
 
+        self.exportSignalsButton = QPushButton(QIcon.fromTheme("document-save-as"), "Xuất Tín hiệu...")
+        self.exportSignalsButton.setToolTip("Export decoded signals as columns (Parquet, or npz without pyarrow)")
+        self.exportSignalsButton.clicked.connect(self._request_export_signals)
+
         control_layout.addWidget(self.loadTraceButton)
         control_layout.addWidget(self.liveStatusLabel)
         control_layout.addStretch(1)
         control_layout.addWidget(self.messageCounterLabel)
+        control_layout.addWidget(self.exportSignalsButton)
         control_layout.addWidget(self.clearButton)
 
         layout.addLayout(control_layout)
 
-        self.traceTable = QTableWidget()
+        self.traceModel = TraceTableModel(LIVE_TRACE_COLUMNS, self)
+        self.traceTable = QTableView()
+        self.traceTable.setModel(self.traceModel)
         self._setup_trace_table()
         layout.addWidget(self.traceTable)
 
-        self._message_count = 0
         self._is_live_mode = False
 
     def _setup_trace_table(self): # Thêm các cột từ can.Message
-        self.traceTable.setColumnCount(8) # Timestamp, ID, Ext, RTR, ERR, DLC, Data, Decoded
-        headers = ["Timestamp", "ID (Hex)", "Xtd", "RTR", "ERR", "DLC", "Data (Hex)", "Decoded Signals"]
-        self.traceTable.setHorizontalHeaderLabels(headers)
         self.traceTable.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         # Điều chỉnh kích thước cột mặc định
         self.traceTable.setColumnWidth(0, 120) # Timestamp
@@ -536,15 +700,15 @@ class TraceMessagesTab(BaseNetworkTab): # Sửa đổi nhiều
         self.traceTable.setColumnWidth(5, 30)  # DLC
         self.traceTable.setColumnWidth(6, 200) # Data
         self.traceTable.horizontalHeader().setStretchLastSection(True) # Decoded giãn ra
-        self.traceTable.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.traceTable.setSelectionBehavior(QTableWidget.SelectRows)
+        # Chiều cao dòng cố định: view không phải đo từng dòng khi có hàng triệu dòng
+        self.traceTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.traceTable.verticalHeader().setDefaultSectionSize(self.traceTable.fontMetrics().height() + 6)
+        self.traceTable.setEditTriggers(QTableView.NoEditTriggers)
+        self.traceTable.setSelectionBehavior(QTableView.SelectRows)
         self.traceTable.setAlternatingRowColors(True)
         self.traceTable.setWordWrap(False)
-        self.traceTable.setVerticalScrollMode(QTableWidget.ScrollPerPixel)
-        self.traceTable.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
-
-        # Tối ưu hóa cho live data: bật sorting có thể chậm
-        # self.traceTable.setSortingEnabled(True)
+        self.traceTable.setVerticalScrollMode(QTableView.ScrollPerPixel)
+        self.traceTable.setHorizontalScrollMode(QTableView.ScrollPerPixel)
 
     def _request_load_trace(self):
         if self.current_network_id and not self._is_live_mode: # Chỉ cho phép load file khi offline
@@ -552,9 +716,12 @@ class TraceMessagesTab(BaseNetworkTab): # Sửa đổi nhiều
         elif self._is_live_mode:
             QMessageBox.information(self, "Chế độ Live", "Không thể tải file trace khi đang kết nối trực tiếp. Vui lòng Ngắt kết nối trước.")
 
+    def _request_export_signals(self):
+        if self.current_network_id:
+            self.exportSignalsRequested.emit(self.current_network_id)
+
     def _clear_table(self):
-        self.traceTable.setRowCount(0)
-        self._message_count = 0
+        self.traceModel.clear()
         self.messageCounterLabel.setText("Msgs: 0")
         # Nếu muốn xóa cả dữ liệu gốc (trace_data) thì cần emit signal về MainWindow
 
@@ -563,263 +730,137 @@ class TraceMessagesTab(BaseNetworkTab): # Sửa đổi nhiều
         super().update_content(network_id, network_data)
         status = network_data.get('connection_status', 'offline')
         self._is_live_mode = (status == 'online')
+        decoder_table = network_data.get('decoder_table', None)
+        self.exportSignalsButton.setEnabled(decoder_table is not None)
 
         if self._is_live_mode:
-            # Nếu chuyển sang live, xóa bảng cũ (dữ liệu từ file)
+            # Khi online, bảng hiển thị bộ đệm live của mạng
             self.liveStatusLabel.setText("Mode: Online (Live)")
             self.loadTraceButton.setEnabled(False)
-            if self.traceTable.rowCount() > 0: # Chỉ xóa nếu bảng có dữ liệu file cũ
-                 # Có thể hỏi user trước khi xóa
-                 # reply = QMessageBox.question(...)
-                 # if reply == QMessageBox.Yes:
-                 #     self._clear_table()
-                 # Hoặc tự động xóa:
-                 self._clear_table()
+            live_buffer = network_data.get('live_buffer')
+            if live_buffer is not self.traceModel.frame_buffer():
+                 self.traceModel.set_source(live_buffer, decoder_table)
+            else:
+                 self.traceModel.set_decoder_table(decoder_table)
+            self._update_live_counter()
+            self.traceTable.scrollToBottom()
         else:
             # Nếu offline, hiển thị dữ liệu từ file (nếu có)
             self.liveStatusLabel.setText("Mode: Offline (File)")
             self.loadTraceButton.setEnabled(True)
-            trace_path = network_data.get('trace_path', None)
-            trace_data = network_data.get('trace_data', [])
-            db = network_data.get('db', None)
-            self.populate_from_file_data(trace_data, db) # Populate lại từ file data
-
-    def populate_from_file_data(self, trace_data, db):
-        """Điền dữ liệu vào bảng từ trace_data (danh sách list)."""
-        self._clear_table() # Xóa bảng trước khi điền mới
+            trace_data = network_data.get('trace_data', None)
+            self.populate_from_file_data(trace_data, decoder_table) # Populate lại từ file data
+
+    def populate_from_file_data(self, trace_data, decoder_table):
+        """Hiển thị trace đã tải (TraceStore) trong bảng."""
         if not trace_data:
+             self.traceModel.set_source(None)
+             self.messageCounterLabel.setText("Msgs: 0")
              return
 
-        # Tối ưu: disable updates
-        self.traceTable.setUpdatesEnabled(False)
-        self.traceTable.setSortingEnabled(False) # Tắt sort khi đang thêm nhiều dòng
-
-        limited_data = trace_data[-self.MAX_TABLE_ROWS:] # Chỉ hiển thị MAX_TABLE_ROWS dòng cuối
-        self.traceTable.setRowCount(len(limited_data))
-
-        for row_idx, row_file_data in enumerate(limited_data):
-             timestamp, id_hex, dlc, data_hex = row_file_data[:4] # Lấy 4 phần tử đầu
-
-             # Tạo các QTableWidgetItem
-             item_ts = QTableWidgetItem(timestamp)
-             item_id = QTableWidgetItem(id_hex)
-             # Các cột live data (Xtd, RTR, ERR) để trống khi load từ file CSV đơn giản
-             item_xtd = QTableWidgetItem("")
-             item_rtr = QTableWidgetItem("")
-             item_err = QTableWidgetItem("")
-             item_dlc = QTableWidgetItem(dlc)
-             item_data = QTableWidgetItem(data_hex)
-             item_decoded = QTableWidgetItem("")
-
-             # Căn chỉnh
-             item_id.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-             item_dlc.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-
-             # Decode nếu có DB
-             decoded_str = self._decode_message(id_hex, data_hex, db, timestamp)
-             if decoded_str:
-                  item_decoded.setText(decoded_str)
-                  item_decoded.setToolTip(decoded_str)
-
-             # Set items vào bảng
-             self.traceTable.setItem(row_idx, 0, item_ts)
-             self.traceTable.setItem(row_idx, 1, item_id)
-             self.traceTable.setItem(row_idx, 2, item_xtd)
-             self.traceTable.setItem(row_idx, 3, item_rtr)
-             self.traceTable.setItem(row_idx, 4, item_err)
-             self.traceTable.setItem(row_idx, 5, item_dlc)
-             self.traceTable.setItem(row_idx, 6, item_data)
-             self.traceTable.setItem(row_idx, 7, item_decoded)
-             self._message_count += 1
-
-
-        self.messageCounterLabel.setText(f"Msgs: {self._message_count} (from file)")
-        # self.traceTable.setSortingEnabled(True) # Bật lại sort nếu muốn
-        self.traceTable.setUpdatesEnabled(True)
+        # CSV không có thông tin Xtd/RTR/ERR nên các cột này để trống
+        self.traceModel.set_source(trace_data, decoder_table, show_flags=False)
+        self.messageCounterLabel.setText(f"Msgs: {len(trace_data)} (from file)")
         self.traceTable.scrollToBottom() # Cuộn xuống cuối
 
+    def add_live_messages(self, live_buffer, msgs: list):
+        """Thêm một batch message trực tiếp vào bộ đệm live của mạng.
 
-    def add_live_message(self, msg: can.Message, db: cantools.db.Database = None):
-        """Thêm một message trực tiếp vào bảng."""
-        if not self._is_live_mode: return # Chỉ thêm khi đang online
+        Nếu bộ đệm đang được hiển thị, model thông báo các dòng mới cho view;
+        text của ô chỉ được tạo khi dòng được vẽ.
+        """
+        if not msgs: return
+        if not self._is_live_mode or live_buffer is not self.traceModel.frame_buffer():
+            live_buffer.append_messages(msgs)
+            return
 
-        # Giới hạn số dòng trong bảng
-        if self._message_count >= self.MAX_TABLE_ROWS:
-             self.traceTable.removeRow(0) # Xóa dòng đầu tiên
-        else:
-             self.traceTable.setRowCount(self._message_count + 1) # Thêm dòng mới
-
-        row_idx = self.traceTable.rowCount() - 1 # Index của dòng mới (hoặc dòng bị ghi đè)
-
-        # Tạo items từ can.Message
-        item_ts = QTableWidgetItem(f"{msg.timestamp:.6f}")
-        item_id = QTableWidgetItem(f"{msg.arbitration_id:X}")
-        item_xtd = QTableWidgetItem("Y" if msg.is_extended_id else "N")
-        item_rtr = QTableWidgetItem("Y" if msg.is_remote_frame else "N")
-        item_err = QTableWidgetItem("Y" if msg.is_error_frame else "N")
-        item_dlc = QTableWidgetItem(str(msg.dlc))
-        item_data = QTableWidgetItem(msg.data.hex().upper())
-        item_decoded = QTableWidgetItem("")
-
-        # Căn chỉnh
-        item_id.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        item_dlc.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        item_xtd.setTextAlignment(Qt.AlignCenter)
-        item_rtr.setTextAlignment(Qt.AlignCenter)
-        item_err.setTextAlignment(Qt.AlignCenter)
-        # if msg.is_error_frame: item_id.setForeground(QColor("red")) # Highlight error frame
-
-        # Decode nếu có DB
-        decoded_str = self._decode_message(f"{msg.arbitration_id:X}", msg.data.hex(), db, msg.timestamp)
-        if decoded_str:
-             item_decoded.setText(decoded_str)
-             item_decoded.setToolTip(decoded_str)
-
-        # Thêm items vào hàng mới
-        # Tắt tạm update để tăng hiệu năng? Có thể không cần nếu chỉ thêm 1 dòng
-        # self.traceTable.setUpdatesEnabled(False)
-        self.traceTable.setItem(row_idx, 0, item_ts)
-        self.traceTable.setItem(row_idx, 1, item_id)
-        self.traceTable.setItem(row_idx, 2, item_xtd)
-        self.traceTable.setItem(row_idx, 3, item_rtr)
-        self.traceTable.setItem(row_idx, 4, item_err)
-        self.traceTable.setItem(row_idx, 5, item_dlc)
-        self.traceTable.setItem(row_idx, 6, item_data)
-        self.traceTable.setItem(row_idx, 7, item_decoded)
-        # self.traceTable.setUpdatesEnabled(True)
-
-
-        self._message_count += 1
-        self.messageCounterLabel.setText(f"Msgs: {self._message_count} (Live)")
-
-        # Tự động cuộn xuống nếu đang ở gần cuối
+        # Tự động cuộn xuống nếu đang ở gần cuối (kiểm tra trước khi thêm dòng)
         scrollbar = self.traceTable.verticalScrollBar()
-        if scrollbar.value() >= scrollbar.maximum() - scrollbar.pageStep() :
-            self.traceTable.scrollToBottom()
+        follow_tail = scrollbar.value() >= scrollbar.maximum() - scrollbar.pageStep()
 
+        self.traceModel.append_messages(msgs)
+        self._update_live_counter()
 
-    def _decode_message(self, id_hex, data_hex, db, timestamp):
-         """Helper function to decode a single message and emit signal."""
-         decoded_signals_dict = {}
-         if db and data_hex: # Cần có DB và data để giải mã
-              try:
-                  can_id = int(id_hex, 16)
-                  message_def = db.get_message_by_frame_id(can_id)
-                  data_bytes = bytes.fromhex(data_hex)
-                  # Decode (bỏ qua choices, cho phép truncated)
-                  decoded_signals_dict = message_def.decode(data_bytes, decode_choices=False, allow_truncated=True)
-
-                  # Format string để hiển thị trong bảng
-                  decoded_str_parts = []
-                  for name, val in decoded_signals_dict.items():
-                        # Format số float với độ chính xác hợp lý
-                        if isinstance(val, float):
-                           formatted_val = f"{val:.4g}"
-                        else:
-                           formatted_val = str(val)
-                        decoded_str_parts.append(f"{name}={formatted_val}")
-                  decoded_display_str = "; ".join(decoded_str_parts)
-
-                  # -- Emit signal cập nhật giá trị cho các tab khác --
-                  ts_obj = timestamp # Dùng timestamp gốc (float hoặc string)
-                  for sig_name, sig_value in decoded_signals_dict.items():
-                      # Thêm check network_id trước khi emit? BaseNetworkTab không lưu sẵn db
-                      if self.current_network_id: # Cần chắc chắn current_network_id là đúng
-                          self.signalValueUpdate.emit(self.current_network_id, sig_name, sig_value, ts_obj)
-
-                  return decoded_display_str
-
-              except KeyError:
-                  return "(ID không có trong DBC)" # ID not in DBC
-              except ValueError:
-                   return "(Lỗi dữ liệu Hex)" # Invalid hex data
-              except Exception as e:
-                   # print(f"Decode Error ({id_hex}): {e}") # Ghi log lỗi chi tiết hơn
-                   return f"(Lỗi Decode)"
-         return "" # Trả về chuỗi rỗng nếu không decode
+        if follow_tail:
+            self.traceTable.scrollToBottom()
+
+    def _update_live_counter(self):
+        live_buffer = self.traceModel.frame_buffer()
+        total = live_buffer.first_seq + len(live_buffer) if live_buffer is not None else 0
+        self.messageCounterLabel.setText(f"Msgs: {total} (Live)")
 
 
 # Tab Signal Data (Cập nhật để nhận signalValueUpdate)
 class SignalDataTab(BaseNetworkTab): # Ít thay đổi logic, chỉ nhận update
+    REFRESH_INTERVAL_MS = 66 # Cập nhật giá trị trên bảng tối đa ~15 lần/giây
+
     def __init__(self, parent=None):
         super().__init__(parent)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(5, 5, 5, 5)
-        self.signalTable = QTableWidget()
+        self.filterEdit = QLineEdit()
+        self.filterEdit.setPlaceholderText("Lọc theo tên tín hiệu...")
+        self.filterEdit.setClearButtonEnabled(True)
+        layout.addWidget(self.filterEdit)
+        # Model dùng chung cho mọi mạng: đổi mạng chỉ đổi SignalIndex / giá trị của model
+        self.signalModel = SignalTableModel(SIGNAL_COLUMN_HEADERS, self)
+        self.signalTable = QTableView()
+        self.signalTable.setModel(self.signalModel)
         self._setup_signal_table()
         layout.addWidget(self.signalTable)
-        self.signal_row_map = {} # Map tên signal -> chỉ số hàng để update nhanh
+        self.filterEdit.textChanged.connect(self.signalModel.set_filter)
         # Lưu ý: latest_signal_values giờ sẽ được quản lý trong MainWindow và truyền vào qua update_content
-
-    def _setup_signal_table(self): # Giống bản trước
-        self.signalTable.setColumnCount(4)
-        headers = ["Signal Name", "Current Value", "Unit", "Last Update Timestamp"]
-        self.signalTable.setHorizontalHeaderLabels(headers)
-        self.signalTable.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
-        self.signalTable.horizontalHeader().setStretchLastSection(False)
-        self.signalTable.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.signalTable.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.signalTable.setSelectionBehavior(QTableWidget.SelectRows)
+        self._latest_values = {}
+        # Giá trị live chỉ được ghi nhận; timer báo cho view các tín hiệu đã đổi
+        # (view chỉ vẽ lại các hàng đang hiển thị, text được tạo trong model.data())
+        self._pending_signals = set()
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True) # Bật lại khi có giá trị mới
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self._refresh_timer.timeout.connect(self._flush_pending_values)
+
+    def _setup_signal_table(self):
+        header = self.signalTable.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        self.signalTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed) # Không đo chiều cao từng dòng
+        self.signalTable.setEditTriggers(QTableView.NoEditTriggers)
+        self.signalTable.setSelectionBehavior(QTableView.SelectRows)
         self.signalTable.setAlternatingRowColors(True)
+        self.signalTable.setWordWrap(False)
 
     def update_content(self, network_id, network_data, available_channels=None):
         super().update_content(network_id, network_data)
-        db = network_data.get('db', None)
-        latest_values = network_data.get('latest_signal_values', {}) # Lấy giá trị mới nhất
-        self.populate_signal_list(db, latest_values)
-
-    def populate_signal_list(self, db, latest_values):
-        self.signalTable.setRowCount(0)
-        self.signal_row_map.clear()
-        if not db: return
-
-        # Tạo danh sách tín hiệu từ DBC
-        signals = sorted(
-             [sig for msg in db.messages for sig in msg.signals],
-             key=lambda s: s.name
-        )
-
-        self.signalTable.setUpdatesEnabled(False)
-        self.signalTable.setRowCount(len(signals))
-
-        for row_idx, sig in enumerate(signals):
-            sig_name = sig.name
-            self.signal_row_map[sig_name] = row_idx # Lưu map để update
-
-            item_name = QTableWidgetItem(sig_name)
-            item_value = QTableWidgetItem("-") # Giá trị ban đầu
-            item_unit = QTableWidgetItem(sig.unit if sig.unit else "")
-            item_ts = QTableWidgetItem("-")
-
-            # Điền giá trị mới nhất nếu có
-            if sig_name in latest_values:
-                value, timestamp = latest_values[sig_name]
-                value_str = f"{value:.4g}" if isinstance(value, (float, int)) else str(value)
-                ts_str = f"{timestamp:.6f}" if isinstance(timestamp, float) else str(timestamp)
-                item_value.setText(value_str)
-                item_ts.setText(ts_str)
-
-            self.signalTable.setItem(row_idx, 0, item_name)
-            self.signalTable.setItem(row_idx, 1, item_value)
-            self.signalTable.setItem(row_idx, 2, item_unit)
-            self.signalTable.setItem(row_idx, 3, item_ts)
-
-        self.signalTable.setUpdatesEnabled(True)
+        self._latest_values = network_data.get('latest_signal_values', {}) # Lấy giá trị mới nhất
+        self._pending_signals.clear() # Model đọc thẳng từ latest_values
+        self.signalModel.set_source(network_data.get('signal_index'), self._latest_values)
 
     def update_signal_value(self, signal_name, value, timestamp):
-        """Cập nhật giá trị của một signal trong bảng (được gọi từ MainWindow)."""
-        if signal_name in self.signal_row_map:
-            row = self.signal_row_map[signal_name]
-            value_str = f"{value:.4g}" if isinstance(value, (float, int)) else str(value)
-            ts_str = f"{timestamp:.6f}" if isinstance(timestamp, float) else str(timestamp)
-            # Cập nhật trực tiếp các cell
-            self.signalTable.item(row, 1).setText(value_str)
-            self.signalTable.item(row, 3).setText(ts_str)
-        # else: signal might not be in the current DBC view
+        """Ghi nhận giá trị mới của một signal (được gọi từ MainWindow), bảng cập nhật theo timer."""
+        self._latest_values[signal_name] = (value, timestamp)
+        self._pending_signals.add(signal_name)
+        self._schedule_refresh()
+
+    def update_signal_values(self, signal_names):
+        """Báo các tín hiệu có giá trị mới trong latest_signal_values của mạng (MainWindow đã ghi)."""
+        self._pending_signals.update(signal_names)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._pending_signals and not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def _flush_pending_values(self):
+        pending_signals = self._pending_signals
+        self._pending_signals = set()
+        if self.isVisible(): # Tab ẩn: view đọc giá trị mới nhất khi hiện lại
+            self.signalModel.signals_updated(pending_signals)
 
 # Tab Graphing (Cập nhật để nhận dữ liệu live/file)
 class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
-    MAX_PLOT_POINTS = 10000 # Giới hạn số điểm vẽ để tránh lag
+    REDRAW_INTERVAL_MS = 33 # Vẽ lại các đường live tối đa ~30 lần/giây
+    VIEW_UPDATE_DELAY_MS = 30 # Gom các thay đổi zoom/pan liên tiếp trước khi giảm điểm lại
 
     def __init__(self, parent=None):
          super().__init__(parent)
@@ -841,25 +882,63 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
               control_layout.addWidget(clear_button)
               control_widget.setMaximumWidth(300)
 
-              # Plot area
-              self.plotWidget = pg.PlotWidget()
-              self.plotWidget.setBackground('w')
-              self.plotWidget.showGrid(x=True, y=True)
-              self.plot_items = {} # {sig_name: plot_data_item}
+              # Plot area: PlotWidget được tạo khi tab hiển thị lần đầu (_ensure_plot_widget)
+              self._plotPlaceholder = QLabel("Đang khởi tạo đồ thị...")
+              self._plotPlaceholder.setAlignment(Qt.AlignCenter)
 
               graph_splitter.addWidget(control_widget)
-              graph_splitter.addWidget(self.plotWidget)
+              graph_splitter.addWidget(self._plotPlaceholder)
               graph_splitter.setSizes([250, 650])
+              self._graph_splitter = graph_splitter
               layout.addWidget(graph_splitter)
          else:
               layout.addWidget(QLabel("pyqtgraph chưa cài đặt."))
+         self.plotWidget = None
+         self.plot_items = {} # {sig_name: plot_data_item}
+         # Tín hiệu live có mẫu mới từ lần vẽ trước; vẽ lại theo timer, không theo từng mẫu
+         self._dirty_signals = set()
+         self._redraw_timer = QTimer(self)
+         self._redraw_timer.setInterval(self.REDRAW_INTERVAL_MS)
+         self._redraw_timer.timeout.connect(self._redraw_dirty_plots)
+         # Zoom/pan/resize: giảm điểm lại từ dữ liệu đầy đủ cho khoảng đang xem
+         self._view_timer = QTimer(self)
+         self._view_timer.setSingleShot(True)
+         self._view_timer.setInterval(self.VIEW_UPDATE_DELAY_MS)
+         self._view_timer.timeout.connect(self._update_plots_for_view)
 
          self._current_timeseries_data = {} # Dữ liệu được truyền từ MainWindow
+         self._signal_lod = {} # {tên: MinMaxPyramid} của mạng đang xem
+
+    def _ensure_plot_widget(self):
+        """Import pyqtgraph và tạo PlotWidget ở lần đầu tab được hiển thị."""
+        if self.plotWidget is not None or not PYQTGRAPH_AVAILABLE:
+             return False
+        global pg
+        pg = load_module('pyqtgraph')
+        print(f"Đã nạp pyqtgraph cho tab Đồ thị ({format_import_times()})")
+        self.plotWidget = pg.PlotWidget()
+        self.plotWidget.setBackground('w')
+        self.plotWidget.showGrid(x=True, y=True)
+        view_box = self.plotWidget.getViewBox()
+        view_box.sigXRangeChanged.connect(self._view_timer.start)
+        view_box.sigResized.connect(self._view_timer.start)
+        self._graph_splitter.replaceWidget(1, self.plotWidget)
+        self._plotPlaceholder.deleteLater()
+        self._plotPlaceholder = None
+        return True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._ensure_plot_widget():
+             self.plot_selected_signals() # Vẽ các tín hiệu đã chọn trước khi có đồ thị
+        if self._dirty_signals:
+             self._redraw_timer.start() # Mẫu tới khi tab bị ẩn
 
     def _clear_plots(self):
-        if PYQTGRAPH_AVAILABLE:
+        if self.plotWidget is not None:
              self.plotWidget.clear()
              self.plot_items = {}
+             self._dirty_signals.clear()
              # Bỏ chọn trong list
              self.signalListWidget.clearSelection()
              # Có thể thêm legend lại nếu cần
@@ -870,6 +949,7 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
         super().update_content(network_id, network_data)
         # Lấy dữ liệu timeseries đã xử lý (từ file hoặc live tích lũy)
         self._current_timeseries_data = network_data.get('signal_time_series', {})
+        self._signal_lod = network_data.get('signal_lod', {})
         db = network_data.get('db', None)
 
         if PYQTGRAPH_AVAILABLE:
@@ -878,7 +958,7 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
             if db:
                 signals_with_data = sorted([
                     sig.name for msg in db.messages for sig in msg.signals
-                    if sig.name in self._current_timeseries_data and self._current_timeseries_data[sig.name][0] # Check có timestamp
+                    if sig.name in self._current_timeseries_data and series_length(self._current_timeseries_data[sig.name]) > 0 # Check có timestamp
                 ])
                 self.signalListWidget.addItems(signals_with_data)
 
@@ -887,7 +967,7 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
 
 
     def plot_selected_signals(self):
-         if not PYQTGRAPH_AVAILABLE: return
+         if self.plotWidget is None: return # pyqtgraph không có hoặc tab chưa mở
          selected_names = {item.text() for item in self.signalListWidget.selectedItems()}
          existing_plots = set(self.plot_items.keys())
 
@@ -906,33 +986,15 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
          for name in selected_names:
               if name not in self.plot_items: # Only add if not already plotted
                    if name in self._current_timeseries_data:
-                        timestamps, values = self._current_timeseries_data[name]
-                        if timestamps and values and len(timestamps) == len(values):
-                              # Lọc chỉ lấy giá trị số
-                              numeric_ts = []
-                              numeric_vals = []
-                              for t, v in zip(timestamps, values):
-                                   if isinstance(v, (int, float)):
-                                        try: # Ensure timestamp is numeric
-                                             numeric_ts.append(float(t))
-                                             numeric_vals.append(float(v))
-                                        except (ValueError, TypeError):
-                                             continue # Skip non-numeric timestamps
-
-                              if numeric_ts and numeric_vals:
-                                   # Giới hạn số điểm vẽ
-                                   if len(numeric_ts) > self.MAX_PLOT_POINTS:
-                                        indices = [int(i * (len(numeric_ts)-1) / (self.MAX_PLOT_POINTS-1)) for i in range(self.MAX_PLOT_POINTS)]
-                                        sampled_ts = [numeric_ts[i] for i in indices]
-                                        sampled_vals = [numeric_vals[i] for i in indices]
-                                        plot_item = self.plotWidget.plot(sampled_ts, sampled_vals, pen=pens[plot_index % len(pens)], name=name)
-                                        # Có thể thêm label "(sampled)" vào name nếu muốn
-                                   else:
-                                        plot_item = self.plotWidget.plot(numeric_ts, numeric_vals, pen=pens[plot_index % len(pens)], name=name)
-
-                                   self.plot_items[name] = plot_item
-                                   plot_index += 1
-                                   needs_legend = True
+                        # Chuỗi thời gian chỉ chứa giá trị số (mảng float64 từ file, SampleRingBuffer khi live)
+                        series = self._current_timeseries_data[name]
+                        if series_length(series) > 0:
+                              # Giới hạn số điểm vẽ: min/max mỗi cột pixel của khoảng đang xem
+                              plot_ts, plot_vals = self._plot_arrays(name, series)
+                              plot_item = self.plotWidget.plot(plot_ts, plot_vals, pen=pens[plot_index % len(pens)], name=name)
+                              self.plot_items[name] = plot_item
+                              plot_index += 1
+                              needs_legend = True
                         # else: print(f"Graph: No valid data for {name}")
                    # else: print(f"Graph: No timeseries data found for {name}")
 
@@ -941,42 +1003,69 @@ class GraphingTab(BaseNetworkTab): # Sửa đổi để nhận data timeseries
             # Check if legend exists, if so remove it? pyqtgraph might handle duplicates.
              self.plotWidget.addLegend(offset=(-30, 30))
 
-    def update_plot_data(self, signal_name, timestamp, value):
-         """Appends a new data point to an existing plot (if plotted)."""
-         if not PYQTGRAPH_AVAILABLE or signal_name not in self.plot_items:
+    def _plot_arrays(self, signal_name, series):
+         """Điểm cần vẽ cho một chuỗi: min/max mỗi cột pixel trong khoảng thời gian đang xem.
+
+         Đọc từ mức LOD phù hợp nếu tín hiệu có kim tự tháp. Mảng trả về là bản
+         sao (setData giữ tham chiếu, bộ đệm vòng live bị ghi đè).
+         """
+         view_box = self.plotWidget.getViewBox()
+         # Đang tự co giãn (chưa zoom/pan): khoảng xem đi theo dữ liệu, giảm điểm trên toàn chuỗi
+         x_range = None if view_box.autoRangeEnabled()[0] else view_box.viewRange()[0]
+         buckets = int(view_box.width()) or MIN_PLOT_BUCKETS
+         return decimate_series(series, self._signal_lod.get(signal_name), x_range, buckets)
+
+    def set_signal_lod(self, pyramids):
+         """Kim tự tháp LOD vừa tạo xong cho mạng đang xem: vẽ lại từ LOD."""
+         self._signal_lod = pyramids
+         self._update_plots_for_view()
+
+    def _update_plots_for_view(self):
+         """Giảm điểm lại tất cả đường đang vẽ sau khi zoom/pan/đổi kích thước."""
+         if self.plotWidget is None:
              return
-
-         plot_item = self.plot_items[signal_name]
-         try:
-             # Lấy dữ liệu hiện có từ plot item
-             x_data, y_data = plot_item.getData()
-             if x_data is None: # Plot might have been cleared or empty
-                 x_data = []
-                 y_data = []
-             # Chuyển đổi sang list nếu là numpy array
-             x_data = list(x_data)
-             y_data = list(y_data)
-
-             # Thêm điểm mới (đảm bảo là float)
-             x_data.append(float(timestamp))
-             y_data.append(float(value))
-
-             # Giới hạn số điểm
-             if len(x_data) > self.MAX_PLOT_POINTS:
-                 x_data = x_data[-self.MAX_PLOT_POINTS:]
-                 y_data = y_data[-self.MAX_PLOT_POINTS:]
-
-             # Cập nhật lại plot item
-             plot_item.setData(x_data, y_data)
-
-         except (ValueError, TypeError):
-             # Ignore if timestamp/value cannot be converted to float
-             pass
-         except Exception as e:
-             print(f"Error updating plot for {signal_name}: {e}")
+         for signal_name, plot_item in self.plot_items.items():
+             series = self._current_timeseries_data.get(signal_name)
+             if series is not None:
+                 plot_item.setData(*self._plot_arrays(signal_name, series))
+                 self._dirty_signals.discard(signal_name)
+
+    def update_plot_data(self, signal_name):
+         """Báo tín hiệu live có mẫu mới (đã nằm trong SampleRingBuffer); đường được vẽ lại theo timer."""
+         if self.plotWidget is None or signal_name not in self.plot_items:
+             return
+         self._dirty_signals.add(signal_name)
+         if not self._redraw_timer.isActive():
+             self._redraw_timer.start()
+
+    def _redraw_dirty_plots(self):
+         """Vẽ lại các đường có mẫu mới, mỗi đường một lần setData cho mỗi nhịp timer."""
+         if not self._dirty_signals or not self.isVisible():
+             self._redraw_timer.stop() # Tab ẩn: giữ danh sách, vẽ lại khi tab hiện (showEvent)
+             return
+         dirty_signals = self._dirty_signals
+         self._dirty_signals = set()
+         for signal_name in dirty_signals:
+             plot_item = self.plot_items.get(signal_name)
+             series = self._current_timeseries_data.get(signal_name)
+             if plot_item is None or series is None:
+                 continue
+             try:
+                 plot_item.setData(*self._plot_arrays(signal_name, series))
+             except Exception as e:
+                 print(f"Error updating plot for {signal_name}: {e}")
 
 # Tab Logging (Cập nhật để biết trạng thái Online/Offline)
+# Cấu hình ghi theo trigger mặc định của mỗi mạng
+LOG_TRIGGER_DEFAULTS = {
+    'log_trigger_enabled': False, 'log_trigger_kind': TRIGGER_ID, 'log_trigger_id': "",
+    'log_trigger_signal': "", 'log_trigger_rising': True, 'log_trigger_threshold': 0.0,
+    'log_stop_kind': None, 'log_stop_id': "", 'log_pre_trigger_s': 5.0, 'log_post_trigger_s': 10.0,
+}
+
 class LoggingTab(BaseNetworkTab): # Ít thay đổi logic, chỉ thay đổi label/tooltip
+    configChanged = pyqtSignal(str, str, object) # net_id, key, value (tùy chọn tách file/nén)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         layout = QVBoxLayout(self)
@@ -996,6 +1085,98 @@ class LoggingTab(BaseNetworkTab): # Ít thay đổi logic, chỉ thay đổi lab
         file_layout.addWidget(select_button)
         layout.addLayout(file_layout)
 
+        # Tách file theo dung lượng/thời gian (0 = không tách), nén file đã đóng
+        rotate_layout = QHBoxLayout()
+        self.rotateSizeSpin = QSpinBox()
+        self.rotateSizeSpin.setRange(0, 1000000)
+        self.rotateSizeSpin.setSuffix(" MB")
+        self.rotateSizeSpin.setSpecialValueText("Không")
+        self.rotateMinutesSpin = QSpinBox()
+        self.rotateMinutesSpin.setRange(0, 10080)
+        self.rotateMinutesSpin.setSuffix(" phút")
+        self.rotateMinutesSpin.setSpecialValueText("Không")
+        self.compressionCombo = QComboBox()
+        self.compressionCombo.addItem("Không nén", None)
+        for method in available_compressions():
+            self.compressionCombo.addItem(method, method)
+        self.compressionCombo.setToolTip("Nén các file CSV đã đóng trên thread nền (BLF vốn đã nén)")
+        rotate_layout.addWidget(QLabel("Tách file mỗi:"))
+        rotate_layout.addWidget(self.rotateSizeSpin)
+        rotate_layout.addWidget(QLabel("hoặc"))
+        rotate_layout.addWidget(self.rotateMinutesSpin)
+        rotate_layout.addWidget(QLabel("Nén:"))
+        rotate_layout.addWidget(self.compressionCombo)
+        rotate_layout.addStretch(1)
+        layout.addLayout(rotate_layout)
+        self.rotateSizeSpin.valueChanged.connect(lambda value: self._emit_config_change('log_rotate_mb', value))
+        self.rotateMinutesSpin.valueChanged.connect(lambda value: self._emit_config_change('log_rotate_minutes', value))
+        self.compressionCombo.currentIndexChanged.connect(
+            lambda index: self._emit_config_change('log_compression', self.compressionCombo.itemData(index)))
+
+        # Ghi theo trigger: giữ pre-trigger giây gần nhất trong RAM, chỉ ghi quanh sự kiện
+        self.triggerGroup = QGroupBox("Ghi theo trigger")
+        self.triggerGroup.setCheckable(True)
+        self.triggerGroup.setChecked(False)
+        trigger_layout = QGridLayout(self.triggerGroup)
+        self.triggerKindCombo = QComboBox()
+        self.triggerKindCombo.addItem("ID xuất hiện", TRIGGER_ID)
+        self.triggerKindCombo.addItem("Tín hiệu vượt ngưỡng", TRIGGER_SIGNAL)
+        self.triggerKindCombo.addItem("Error frame", TRIGGER_ERROR)
+        self.triggerIdEdit = QLineEdit()
+        self.triggerIdEdit.setPlaceholderText("ID (hex), vd. 7DF")
+        self.triggerSignalEdit = QLineEdit()
+        self.triggerSignalEdit.setPlaceholderText("Tên tín hiệu")
+        self.triggerDirectionCombo = QComboBox()
+        self.triggerDirectionCombo.addItem("↑ cắt lên", True)
+        self.triggerDirectionCombo.addItem("↓ cắt xuống", False)
+        self.triggerThresholdSpin = QDoubleSpinBox()
+        self.triggerThresholdSpin.setRange(-1e12, 1e12)
+        self.triggerThresholdSpin.setDecimals(3)
+        self.stopKindCombo = QComboBox()
+        self.stopKindCombo.addItem("Hết cửa sổ post-trigger", None)
+        self.stopKindCombo.addItem("ID xuất hiện", TRIGGER_ID)
+        self.stopKindCombo.addItem("Error frame", TRIGGER_ERROR)
+        self.stopIdEdit = QLineEdit()
+        self.stopIdEdit.setPlaceholderText("ID dừng (hex)")
+        self.preTriggerSpin = QDoubleSpinBox()
+        self.preTriggerSpin.setRange(0, 3600)
+        self.preTriggerSpin.setSuffix(" s")
+        self.postTriggerSpin = QDoubleSpinBox()
+        self.postTriggerSpin.setRange(0, 86400)
+        self.postTriggerSpin.setSuffix(" s")
+        self.postTriggerSpin.setSpecialValueText("Tới điều kiện dừng")
+        trigger_layout.addWidget(QLabel("Bắt đầu khi:"), 0, 0)
+        trigger_layout.addWidget(self.triggerKindCombo, 0, 1)
+        trigger_layout.addWidget(self.triggerIdEdit, 0, 2)
+        trigger_layout.addWidget(self.triggerSignalEdit, 1, 1)
+        trigger_layout.addWidget(self.triggerDirectionCombo, 1, 2)
+        trigger_layout.addWidget(self.triggerThresholdSpin, 1, 3)
+        trigger_layout.addWidget(QLabel("Dừng khi:"), 2, 0)
+        trigger_layout.addWidget(self.stopKindCombo, 2, 1)
+        trigger_layout.addWidget(self.stopIdEdit, 2, 2)
+        trigger_layout.addWidget(QLabel("Pre-trigger:"), 3, 0)
+        trigger_layout.addWidget(self.preTriggerSpin, 3, 1)
+        trigger_layout.addWidget(QLabel("Post-trigger:"), 3, 2)
+        trigger_layout.addWidget(self.postTriggerSpin, 3, 3)
+        layout.addWidget(self.triggerGroup)
+        self._trigger_widgets = {
+            'log_trigger_enabled': (self.triggerGroup, self.triggerGroup.toggled, self.triggerGroup.isChecked, self.triggerGroup.setChecked),
+            'log_trigger_kind': (self.triggerKindCombo, self.triggerKindCombo.currentIndexChanged, self.triggerKindCombo.currentData,
+                                 lambda value: self.triggerKindCombo.setCurrentIndex(max(0, self.triggerKindCombo.findData(value)))),
+            'log_trigger_id': (self.triggerIdEdit, self.triggerIdEdit.editingFinished, self.triggerIdEdit.text, self.triggerIdEdit.setText),
+            'log_trigger_signal': (self.triggerSignalEdit, self.triggerSignalEdit.editingFinished, self.triggerSignalEdit.text, self.triggerSignalEdit.setText),
+            'log_trigger_rising': (self.triggerDirectionCombo, self.triggerDirectionCombo.currentIndexChanged, self.triggerDirectionCombo.currentData,
+                                   lambda value: self.triggerDirectionCombo.setCurrentIndex(0 if value else 1)),
+            'log_trigger_threshold': (self.triggerThresholdSpin, self.triggerThresholdSpin.valueChanged, self.triggerThresholdSpin.value, self.triggerThresholdSpin.setValue),
+            'log_stop_kind': (self.stopKindCombo, self.stopKindCombo.currentIndexChanged, self.stopKindCombo.currentData,
+                              lambda value: self.stopKindCombo.setCurrentIndex(max(0, self.stopKindCombo.findData(value)))),
+            'log_stop_id': (self.stopIdEdit, self.stopIdEdit.editingFinished, self.stopIdEdit.text, self.stopIdEdit.setText),
+            'log_pre_trigger_s': (self.preTriggerSpin, self.preTriggerSpin.valueChanged, self.preTriggerSpin.value, self.preTriggerSpin.setValue),
+            'log_post_trigger_s': (self.postTriggerSpin, self.postTriggerSpin.valueChanged, self.postTriggerSpin.value, self.postTriggerSpin.setValue),
+        }
+        for key, (_widget, changed_signal, getter, _setter) in self._trigger_widgets.items():
+            changed_signal.connect(lambda *_args, key=key, getter=getter: self._emit_config_change(key, getter()))
+
         self.toggleLogButton = QPushButton(QIcon.fromTheme("media-record"), "Bắt đầu Ghi")
         self.toggleLogButton.setCheckable(True)
         self.toggleLogButton.toggled.connect(self._handle_toggle_log)
@@ -1012,6 +1193,10 @@ class LoggingTab(BaseNetworkTab): # Ít thay đổi logic, chỉ thay đổi lab
         if self.current_network_id:
             self.selectLogFileRequested.emit(self.current_network_id)
 
+    def _emit_config_change(self, key, value):
+        if self.current_network_id:
+            self.configChanged.emit(self.current_network_id, key, value)
+
     def _handle_toggle_log(self, checked):
         if self.current_network_id:
             if checked and not self.network_data.get('log_path'):
@@ -1032,6 +1217,21 @@ class LoggingTab(BaseNetworkTab): # Ít thay đổi logic, chỉ thay đổi lab
         self.logPathEdit.setText(log_path if log_path else "")
         self.logCountLabel.setText(f"Messages Logged: {log_count}")
 
+        for widget in (self.rotateSizeSpin, self.rotateMinutesSpin, self.compressionCombo):
+            widget.blockSignals(True)
+            widget.setEnabled(not is_logging) # Chỉ đổi khi chưa ghi
+        self.rotateSizeSpin.setValue(network_data.get('log_rotate_mb', 0))
+        self.rotateMinutesSpin.setValue(network_data.get('log_rotate_minutes', 0))
+        compression_index = self.compressionCombo.findData(network_data.get('log_compression'))
+        self.compressionCombo.setCurrentIndex(max(0, compression_index))
+        for widget in (self.rotateSizeSpin, self.rotateMinutesSpin, self.compressionCombo):
+            widget.blockSignals(False)
+        self.triggerGroup.setEnabled(not is_logging)
+        for key, (widget, _changed_signal, _getter, setter) in self._trigger_widgets.items():
+            widget.blockSignals(True)
+            setter(network_data.get(key, LOG_TRIGGER_DEFAULTS[key]))
+            widget.blockSignals(False)
+
         was_blocked = self.toggleLogButton.blockSignals(True)
         self.toggleLogButton.setChecked(is_logging)
         log_mode = "(Live Data)" if self._is_live_mode else "(Offline Data - Requires Load)"
@@ -1168,9 +1368,11 @@ class MultiCanManagerApp(QMainWindow):
         self.hwConfigTab.disconnectRequested.connect(self.disconnect_network)
         self.hwConfigTab.rescanChannelsRequested.connect(self.scan_vector_channels)
         self.hwConfigTab.configChanged.connect(self.handle_hw_config_change) # NEW: Handle hw config update
+        self.logTab.configChanged.connect(self.handle_log_config_change)
         self.dbcTab.loadDbcRequested.connect(self.handle_load_dbc)
         self.traceTab.loadTraceRequested.connect(self.handle_load_trace)
-        # Tín hiệu cập nhật signal value giờ sẽ được xử lý trong handle_live_message
+        self.traceTab.exportSignalsRequested.connect(self.handle_export_signals)
+        # Tín hiệu cập nhật signal value giờ sẽ được xử lý trong handle_decoded_batch
         # self.traceTab.signalValueUpdate.connect(self.handle_signal_value_update) # Remove this connection
         self.logTab.selectLogFileRequested.connect(self.handle_select_log_file)
         self.logTab.toggleLoggingRequested.connect(self.handle_toggle_logging)
@@ -1180,17 +1382,15 @@ class MultiCanManagerApp(QMainWindow):
 
     # --- Quản lý Mạng ---
     def add_new_network(self): # Thêm các trường mới cho hardware
-        network_id = str(uuid.uuid4())
         network_name = f"CAN Network {self.next_network_id_counter}"
         self.next_network_id_counter += 1
 
-        self.networks_data[network_id] = {
-            "id": network_id, # Store ID also inside for convenience
-            "name": network_name,
-            "dbc_path": None, "db": None,
-            "trace_path": None, "trace_data": [],
-            "signal_time_series": {}, "latest_signal_values": {},
-            "log_path": None, "is_logging": False, "logging_worker": None, "log_message_count": 0,
+        # Trường chung (DBC/trace/log/chẩn đoán) từ can_network, thêm trường log và phần cứng
+        network_id, net_data = new_network(network_name, extra={
+            "log_format": LOG_FORMAT_CSV,
+            "log_rotate_mb": 0, "log_rotate_minutes": 0, "log_compression": None, "log_message_count": 0,
+            "logger_listener": None, # Listener mà logger đang được nối trực tiếp vào
+            **LOG_TRIGGER_DEFAULTS, # Ghi theo trigger (pre/post-trigger)
             # --- Hardware Fields ---
             "interface_channel": None, # Dữ liệu kênh đã chọn (từ detect_available_configs)
             "baud_rate": 500000,     # Default baud rate
@@ -1199,8 +1399,11 @@ class MultiCanManagerApp(QMainWindow):
             "connection_status": "offline", # "offline", "online", "connecting", "error"
             "can_bus": None,          # Đối tượng can.Bus khi kết nối
             "listener_thread": None, # Luồng nhận message khi kết nối
+            "decode_worker": None,   # Luồng giải mã DBC cho dữ liệu live
+            "live_buffer": None,     # FrameRingBuffer chứa frame live (bảng Trace)
             "last_hw_error": None     # Lưu lỗi phần cứng gần nhất
-        }
+        })
+        self.networks_data[network_id] = net_data
         # ... (thêm vào cây và chọn item như trước) ...
         root = self.networkTreeWidget.topLevelItem(0)
         network_item = QTreeWidgetItem(root, [network_name])
@@ -1330,6 +1533,11 @@ class MultiCanManagerApp(QMainWindow):
                          self.hwConfigTab.connectButton.setEnabled(is_offline and channel_selected)
 
 
+    def handle_log_config_change(self, network_id, key, value):
+        """Lưu tùy chọn tách file/nén log của mạng."""
+        if network_id and network_id in self.networks_data:
+            self.networks_data[network_id][key] = value
+
     def connect_network(self, network_id):
         """Attempts to connect the specified network to its configured hardware."""
         if not PYTHON_CAN_AVAILABLE: return
@@ -1377,15 +1585,28 @@ class MultiCanManagerApp(QMainWindow):
                 # Có thể thêm các tham số khác như sjw, sample_point nếu cần
             )
             net_data['can_bus'] = can_bus
+            net_data['live_buffer'] = FrameRingBuffer(TraceMessagesTab.MAX_LIVE_FRAMES) # Trace live cho phiên này
+            net_data['signal_time_series'] = {} # Đồ thị live bắt đầu mới (chuỗi từ file là mảng NumPy chỉ đọc)
+            net_data['signal_lod'] = {}
             net_data['connection_status'] = 'online'
             print(f"Network {network_id} connected successfully.")
 
+            # Khởi tạo luồng giải mã trước, để không mất frame đầu tiên từ listener
+            decode_worker = LiveDecodeWorker(network_id, net_data.get('decoder_table'))
+            decode_worker.decoded_batch.connect(self.handle_decoded_batch)
+            net_data['decode_worker'] = decode_worker
+            self.workers[f"{network_id}_decoder"] = decode_worker
+            decode_worker.start()
+
             # Khởi tạo và bắt đầu luồng Listener
             listener_thread = CanListenerThread(network_id, can_bus)
-            listener_thread.message_received.connect(self.handle_live_message)
+            # DirectConnection: batch đi thẳng từ luồng listener sang hàng đợi của
+            # luồng giải mã, không đi qua event loop của GUI
+            listener_thread.messages_received.connect(decode_worker.add_messages, Qt.DirectConnection)
             listener_thread.listener_error.connect(self.handle_listener_error)
             listener_thread.connection_closed.connect(self.handle_connection_closed) # Khi thread tự dừng
             net_data['listener_thread'] = listener_thread
+            self._attach_logger(network_id) # Nếu đang ghi log từ trước khi kết nối
             worker_id = f"{network_id}_listener"
             self.workers[worker_id] = listener_thread # Track the worker
             listener_thread.start()
@@ -1473,9 +1694,19 @@ class MultiCanManagerApp(QMainWindow):
          else:
               print(f"No active bus object found to shutdown for {net_name}.")
 
+         # Stop the decode stage; it drains frames already handed over by the listener
+         decode_worker = net_data.get('decode_worker')
+         if decode_worker:
+              decode_worker.stop()
+              if not decode_worker.wait(1000):
+                   print(f"Warning: Decode worker for {net_name} did not stop in time.")
+         self.workers.pop(f"{network_id}_decoder", None)
+
          # Clear hardware-related data and update status
          net_data['can_bus'] = None
          net_data['listener_thread'] = None
+         net_data['logger_listener'] = None # Kết nối mới sẽ nối lại logger
+         net_data['decode_worker'] = None
          net_data['connection_status'] = 'offline'
          net_data['last_hw_error'] = None
          # Maybe clear live data buffers?
@@ -1498,78 +1729,46 @@ class MultiCanManagerApp(QMainWindow):
              self.show_network_error(network_id, f"Lỗi Listener:\n{error_message}")
 
     # --- Xử lý Dữ liệu Live Message ---
-    def handle_live_message(self, network_id, msg: can.Message):
-        """Handles a single live message received from a listener thread."""
-        # This runs in the main GUI thread
+    def handle_decoded_batch(self, network_id, batch):
+        """Handles a batch already decoded by the network's LiveDecodeWorker."""
+        # This runs in the main GUI thread, once per batch; no DBC decoding happens here
         if network_id not in self.networks_data: return
 
         net_data = self.networks_data[network_id]
-        db = net_data.get('db') # Get the DBC for this network
+        is_current = (network_id == self.current_selected_network_id)
 
-        # --- 1. Gửi message cho Logger (nếu đang ghi log) ---
-        if net_data.get('is_logging'):
-            log_worker = net_data.get('logging_worker')
-            if log_worker and log_worker.isRunning():
-                 log_worker.add_message(msg) # Logging worker handles formatting
+        # (Logger nhận frame trực tiếp từ luồng listener, xem _attach_logger)
 
-        # --- 2. Decode Message và Cập nhật Dữ liệu Tín hiệu ---
-        decoded_signals = {}
-        if db and not msg.is_error_frame and not msg.is_remote_frame and msg.data:
-            try:
-                 message_def = db.get_message_by_frame_id(msg.arbitration_id)
-                 # Sử dụng try-except vì decode có thể fail (DLC không khớp, data lỗi...)
-                 try:
-                      decoded_signals = message_def.decode(msg.data, decode_choices=False, allow_truncated=True)
-                 except ValueError as ve: # E.g., wrong data length after filtering allowed truncated
-                      # print(f"Decode ValueError Net {network_id} ID {msg.arbitration_id:X}: {ve} - Data: {msg.data.hex()}")
-                      pass # Ignore decode error for this message? Or log it.
-                 except Exception as de:
-                      # print(f"Decode Error Net {network_id} ID {msg.arbitration_id:X}: {de}")
-                      pass # Ignore other decode errors
-
-                 if decoded_signals:
-                      # Cập nhật latest_signal_values trong data chính
-                      current_latest = net_data.get('latest_signal_values', {})
-                      needs_signal_tab_update = False
-                      for sig_name, sig_value in decoded_signals.items():
-                            current_latest[sig_name] = (sig_value, msg.timestamp)
-                            # Nếu tab signal đang hiển thị network này, update trực tiếp
-                            if network_id == self.current_selected_network_id:
-                                 self.signalsTab.update_signal_value(sig_name, sig_value, msg.timestamp)
-                                 # Cập nhật đồ thị nếu đang vẽ tín hiệu này
-                                 self.graphTab.update_plot_data(sig_name, msg.timestamp, sig_value)
-
-
-            except KeyError:
-                 pass # ID not in DBC
-
-
-        # --- 3. Cập nhật dữ liệu timeseries (cho đồ thị) ---
-        # Append to existing timeseries data structure
+        # --- 1. Cập nhật giá trị mới nhất của các tín hiệu ---
+        net_data.get('latest_signal_values', {}).update(batch.latest)
+        if is_current:
+            self.signalsTab.update_signal_values(batch.latest)
+
+        # --- 2. Cập nhật dữ liệu timeseries (cho đồ thị) ---
+        # Mỗi tín hiệu live là một SampleRingBuffer dung lượng cố định: thêm batch
+        # không sao chép dữ liệu cũ, bộ nhớ không tăng theo thời gian chạy
+        # Kim tự tháp LOD của mỗi tín hiệu được mở rộng theo batch, bỏ khối của mẫu đã bị ghi đè
         current_timeseries = net_data.get('signal_time_series', {})
-        for sig_name, sig_value in decoded_signals.items():
-            if sig_name not in current_timeseries:
-                 current_timeseries[sig_name] = ([], []) # Init (timestamps, values)
-            # Append (handle potential non-numeric timestamp from earlier logic if needed)
-            try:
-                ts_float = float(msg.timestamp)
-                val_float = float(sig_value) # Graph needs numeric values
-                # Append data
-                current_timeseries[sig_name][0].append(ts_float)
-                current_timeseries[sig_name][1].append(val_float)
-                # Limit timeseries length to avoid unbounded memory growth
-                max_len = 2 * self.graphTab.MAX_PLOT_POINTS # Keep more history than plotting shows
-                if len(current_timeseries[sig_name][0]) > max_len:
-                     current_timeseries[sig_name] = (current_timeseries[sig_name][0][-max_len:],
-                                                     current_timeseries[sig_name][1][-max_len:])
-            except (ValueError, TypeError):
-                 continue # Skip if value/timestamp not numeric
-
-        # --- 4. Cập nhật Bảng Trace (nếu đang hiển thị) ---
-        # Chỉ cập nhật bảng nếu tab đó đang được hiển thị VÀ network này đang được chọn
-        # This can be a bottleneck if message rate is very high!
-        if network_id == self.current_selected_network_id and self.detailsTabWidget.currentWidget() == self.traceTab:
-             self.traceTab.add_live_message(msg, db)
+        signal_lod = net_data.setdefault('signal_lod', {})
+        for sig_name, (timestamps, values) in batch.series.items():
+            series = current_timeseries.get(sig_name)
+            if not isinstance(series, SampleRingBuffer): # Chưa có, hoặc chuỗi từ file trace
+                 series = current_timeseries[sig_name] = SampleRingBuffer()
+                 signal_lod[sig_name] = MinMaxPyramid(LIVE_LOD_BASE_BLOCK)
+            series.append(timestamps, values)
+            pyramid = signal_lod.get(sig_name)
+            if pyramid is not None:
+                 pyramid.extend(timestamps, values)
+                 pyramid.drop_before(series.total - len(series))
+            # Đánh dấu để đồ thị vẽ lại ở nhịp timer kế tiếp nếu đang vẽ tín hiệu này
+            if is_current:
+                 self.graphTab.update_plot_data(sig_name)
+
+        # --- 3. Cập nhật Bảng Trace ---
+        # Frame luôn vào bộ đệm live của mạng; view chỉ được báo khi đang hiển thị bộ đệm đó
+        live_buffer = net_data.get('live_buffer')
+        if live_buffer is not None:
+             self.traceTab.add_live_messages(live_buffer, batch.msgs)
 
 
     # --- Xử lý tải file và các handlers khác (Giữ nguyên hoặc cập nhật nhỏ) ---
@@ -1600,29 +1799,106 @@ class MultiCanManagerApp(QMainWindow):
         if worker_id in self.workers and self.workers[worker_id].isRunning(): return
         current_path = self.networks_data[network_id].get('trace_path', None)
         dir_path = os.path.dirname(current_path) if current_path else ""
-        file_path, _ = QFileDialog.getOpenFileName(self, f"Select Trace CSV for {self.networks_data[network_id]['name']}", dir_path, "*.csv")
+        file_path, _ = QFileDialog.getOpenFileName(self, f"Select Trace for {self.networks_data[network_id]['name']}", dir_path, "Trace Files (*.csv *.asc *.blf);;CSV Files (*.csv);;Vector Log (*.asc *.blf);;All Files (*)")
         if file_path:
              self.statusLabel.setText(f"Net {self.networks_data[network_id]['name']}: Starting Trace load...")
-             db_obj = self.networks_data[network_id].get('db')
-             worker = TraceLoadingWorker(network_id, file_path, db_obj)
+             decoder_table = self.networks_data[network_id].get('decoder_table')
+             dbc_path = self.networks_data[network_id].get('dbc_path')
+             worker = TraceLoadingWorker(network_id, file_path, decoder_table, dbc_path)
              worker.finished.connect(self.on_trace_loaded)
              worker.progress.connect(self.update_network_status)
              worker.progress_percent.connect(self.update_network_progress_percent)
              self.workers[worker_id] = worker
              worker.start()
 
+    def handle_export_signals(self, network_id):
+        if not network_id or network_id not in self.networks_data: return
+        net_data = self.networks_data[network_id]
+        decoder_table = net_data.get('decoder_table')
+        # Online (hoặc chưa tải file): xuất bản chụp bộ đệm live, ngược lại xuất trace đã tải
+        live_buffer = net_data.get('live_buffer')
+        if live_buffer is not None and len(live_buffer) and (net_data.get('connection_status') == 'online' or not net_data.get('trace_data')):
+            trace_data = live_buffer.snapshot()
+        else:
+            trace_data = net_data.get('trace_data')
+        if decoder_table is None or not trace_data:
+            QMessageBox.information(self, "Export Signals", "Load a DBC and a trace (or capture live data) before exporting signals.")
+            return
+        worker_id = f"{network_id}_export"
+        if worker_id in self.workers and self.workers[worker_id].isRunning(): return
+
+        trace_path = net_data.get('trace_path') or ""
+        if default_export_format() == EXPORT_FORMAT_PARQUET:
+            file_filter = "Parquet Files (*.parquet);;All Files (*)"
+        else: # Không có pyarrow: ghi thư mục "<tên>.signals" chứa các file .npz
+            file_filter = "NumPy npz (*.signals);;All Files (*)"
+        suggested_path = os.path.splitext(trace_path)[0] + "_signals" if trace_path else ""
+        file_path, _ = QFileDialog.getSaveFileName(self, f"Export Signals for {net_data['name']}", suggested_path, file_filter)
+        if file_path:
+             self.statusLabel.setText(f"Net {net_data['name']}: Exporting signals...")
+             worker = SignalExportWorker(network_id, trace_data, decoder_table, file_path)
+             worker.finished.connect(self.on_signals_exported)
+             worker.progress.connect(self.update_network_status)
+             worker.progress_percent.connect(self.update_network_progress_percent)
+             self.workers[worker_id] = worker
+             worker.start()
+
+    def on_signals_exported(self, network_id, success, path_or_error):
+        worker_id = f"{network_id}_export"
+        if worker_id in self.workers: del self.workers[worker_id]
+        if network_id not in self.networks_data: return
+        if not success:
+            self.show_network_error(network_id, path_or_error)
+
     def handle_select_log_file(self, network_id): # Giống bản trước
          # ... (code similar to previous version) ...
          if not network_id or network_id not in self.networks_data: return
          current_path = self.networks_data[network_id].get('log_path', None)
          dir_path = os.path.dirname(current_path) if current_path else ""
-         file_path, _ = QFileDialog.getSaveFileName(self, f"Select Log File for {self.networks_data[network_id]['name']}", dir_path, "*.csv")
+         csv_filter, blf_filter = "CSV Files (*.csv)", "BLF Files (*.blf)"
+         current_format = self.networks_data[network_id].get('log_format', LOG_FORMAT_CSV)
+         file_path, selected_filter = QFileDialog.getSaveFileName(
+             self, f"Select Log File for {self.networks_data[network_id]['name']}", dir_path,
+             f"{csv_filter};;{blf_filter}", blf_filter if current_format == LOG_FORMAT_BLF else csv_filter)
          if file_path:
-             if not file_path.lower().endswith(".csv"): file_path += ".csv"
+             # Định dạng theo phần mở rộng nếu có, nếu không theo bộ lọc đã chọn
+             if file_path.lower().endswith((".csv", ".blf")):
+                 log_format = log_format_for_path(file_path)
+             else:
+                 log_format = LOG_FORMAT_BLF if selected_filter == blf_filter else LOG_FORMAT_CSV
+                 file_path += f".{log_format}"
              self.networks_data[network_id]['log_path'] = file_path
+             self.networks_data[network_id]['log_format'] = log_format
              self.networks_data[network_id]['log_message_count'] = 0 # Reset count when selecting new file
              self.networkDataUpdated.emit(network_id) # Update UI
 
+    @staticmethod
+    def _build_log_triggers(net_data):
+        """Tạo (start_trigger, stop_trigger) từ cấu hình mạng. Ném ValueError nếu không hợp lệ."""
+        def parse_id(text, label):
+            try:
+                return int(text.strip().lower().replace("0x", ""), 16)
+            except ValueError:
+                raise ValueError(f"{label} không hợp lệ: '{text}'")
+
+        kind = net_data.get('log_trigger_kind', TRIGGER_ID)
+        if kind == TRIGGER_ID:
+            start_trigger = LogTrigger(TRIGGER_ID, frame_id=parse_id(net_data.get('log_trigger_id', ""), "ID trigger"))
+        elif kind == TRIGGER_SIGNAL:
+            start_trigger = LogTrigger(TRIGGER_SIGNAL, signal_name=net_data.get('log_trigger_signal', "").strip(),
+                                       threshold=net_data.get('log_trigger_threshold', 0.0),
+                                       rising=net_data.get('log_trigger_rising', True))
+        else:
+            start_trigger = LogTrigger(TRIGGER_ERROR)
+
+        stop_kind = net_data.get('log_stop_kind')
+        stop_trigger = None
+        if stop_kind == TRIGGER_ID:
+            stop_trigger = LogTrigger(TRIGGER_ID, frame_id=parse_id(net_data.get('log_stop_id', ""), "ID dừng"))
+        elif stop_kind == TRIGGER_ERROR:
+            stop_trigger = LogTrigger(TRIGGER_ERROR)
+        return start_trigger, stop_trigger
+
     def handle_toggle_logging(self, network_id): # Cập nhật để dùng LoggingWorker
         if not network_id or network_id not in self.networks_data: return
         net_data = self.networks_data[network_id]
@@ -1641,7 +1917,26 @@ class MultiCanManagerApp(QMainWindow):
                  self.workers[worker_id].stop()
                  self.workers[worker_id].wait(500)
 
-             log_worker = LoggingWorker(network_id, log_path)
+             start_trigger = stop_trigger = None
+             if net_data.get('log_trigger_enabled'):
+                 try:
+                     start_trigger, stop_trigger = self._build_log_triggers(net_data)
+                     if stop_trigger is None and not net_data.get('log_post_trigger_s'):
+                         raise ValueError("Cần điều kiện dừng hoặc cửa sổ post-trigger > 0")
+                     start_trigger.bind(net_data.get('decoder_table')) # Kiểm tra tín hiệu có trong DBC
+                 except ValueError as e:
+                     QMessageBox.warning(self, "Trigger không hợp lệ", str(e))
+                     self.networkDataUpdated.emit(network_id)
+                     return
+
+             log_worker = LoggingWorker(network_id, log_path, net_data.get('log_format'),
+                                        rotate_bytes=net_data.get('log_rotate_mb', 0) * 1024 * 1024 or None,
+                                        rotate_interval=net_data.get('log_rotate_minutes', 0) * 60 or None,
+                                        compression=net_data.get('log_compression'),
+                                        start_trigger=start_trigger, stop_trigger=stop_trigger,
+                                        pre_trigger=net_data.get('log_pre_trigger_s', 5.0),
+                                        post_trigger=net_data.get('log_post_trigger_s', 10.0),
+                                        decoder_table=net_data.get('decoder_table'))
              log_worker.status.connect(self.update_network_status)
              log_worker.error.connect(self.show_network_error)
              log_worker.message_count.connect(self._update_log_count) # Update counter display
@@ -1650,8 +1945,10 @@ class MultiCanManagerApp(QMainWindow):
              net_data['log_message_count'] = 0 # Reset count on start
              self.workers[worker_id] = log_worker
              log_worker.start()
+             self._attach_logger(network_id)
              self.statusLabel.setText(f"Net {net_data['name']}: Logging Started.")
         else: # Stop Logging
+            self._detach_logger(network_id)
             log_worker = net_data.get('logging_worker')
             if log_worker and log_worker.isRunning():
                 log_worker.stop() # Worker signals status when stopped
@@ -1662,6 +1959,32 @@ class MultiCanManagerApp(QMainWindow):
 
         self.networkDataUpdated.emit(network_id) # Update UI (button state)
 
+    def _attach_logger(self, network_id):
+        """Nối logger thẳng vào luồng listener (DirectConnection).
+
+        Frame đi từ luồng listener vào hàng đợi của LoggingWorker mà không qua
+        event loop của GUI, nên việc ghi log không phụ thuộc tải/treo của UI.
+        """
+        net_data = self.networks_data.get(network_id, {})
+        listener = net_data.get('listener_thread')
+        log_worker = net_data.get('logging_worker')
+        if listener is None or log_worker is None or net_data.get('logger_listener') is listener:
+            return
+        listener.messages_received.connect(log_worker.on_messages_received, Qt.DirectConnection)
+        net_data['logger_listener'] = listener
+
+    def _detach_logger(self, network_id):
+        net_data = self.networks_data.get(network_id, {})
+        listener = net_data.get('logger_listener')
+        net_data['logger_listener'] = None
+        log_worker = net_data.get('logging_worker')
+        if listener is None or log_worker is None:
+            return
+        try:
+            listener.messages_received.disconnect(log_worker.on_messages_received)
+        except TypeError:
+            pass # Đã ngắt kết nối
+
 
     # --- Slots xử lý kết quả từ Worker (DBC, Trace) ---
     def on_dbc_loaded(self, network_id, db_or_none, path_or_error): # Cập nhật nhỏ
@@ -1671,15 +1994,13 @@ class MultiCanManagerApp(QMainWindow):
 
         net_data = self.networks_data[network_id]
         if db_or_none:
-            net_data['db'] = db_or_none
-            net_data['dbc_path'] = path_or_error
-            # Reset dependent data
-            net_data['latest_signal_values'] = {}
-            net_data['signal_time_series'] = {}
+            set_dbc(net_data, db_or_none, path_or_error) # Biên dịch bộ giải mã một lần, xóa dữ liệu giải mã cũ
+            if net_data.get('decode_worker'):
+                 net_data['decode_worker'].set_decoder_table(net_data['decoder_table'])
             # Cần re-decode live data hoặc re-populate file data nếu offline
             if net_data['connection_status'] == 'online':
                  self.statusLabel.setText(f"Net {net_data['name']}: DBC loaded. Live decoding active.")
-                 # Re-decoding implicitly happens in handle_live_message
+                 # Re-decoding happens in the network's LiveDecodeWorker
             else:
                  # If offline and trace data exists, repopulate trace table
                  self.statusLabel.setText(f"Net {net_data['name']}: DBC loaded.")
@@ -1688,10 +2009,9 @@ class MultiCanManagerApp(QMainWindow):
                       self.networkDataUpdated.emit(network_id)
 
         else: # Error loading DBC
-            net_data['db'] = None
-            net_data['dbc_path'] = None
-            net_data['latest_signal_values'] = {}
-            net_data['signal_time_series'] = {}
+            set_dbc(net_data, None, None)
+            if net_data.get('decode_worker'):
+                 net_data['decode_worker'].set_decoder_table(None)
             self.show_network_error(network_id, f"Failed to load DBC:\n{path_or_error}")
 
         self.networkDataUpdated.emit(network_id) # Update UI regardless
@@ -1703,30 +2023,40 @@ class MultiCanManagerApp(QMainWindow):
 
         net_data = self.networks_data[network_id]
         if trace_data_or_none is not None:
-            net_data['trace_data'] = trace_data_or_none
-            net_data['trace_path'] = path_or_error
-            net_data['signal_time_series'] = signal_timeseries
-            net_data['latest_signal_values'] = self._get_latest_values_from_timeseries(signal_timeseries)
+            set_trace(net_data, trace_data_or_none, path_or_error, signal_timeseries) # Tính lại giá trị mới nhất
             self.statusLabel.setText(f"Net {net_data['name']}: Trace file loaded.")
+            self._start_lod_build(network_id, signal_timeseries)
         else:
-            net_data['trace_data'] = []
-            net_data['trace_path'] = None
-            net_data['signal_time_series'] = {}
-            net_data['latest_signal_values'] = {}
+            clear_trace(net_data)
             self.show_network_error(network_id, f"Failed to load Trace file:\n{path_or_error}")
 
         self.networkDataUpdated.emit(network_id) # Update relevant tabs
 
-    def _get_latest_values_from_timeseries(self, signal_timeseries): # Giống bản trước
-         latest_values = {}
-         # ... (code similar to previous version) ...
-         for sig_name, (timestamps, values) in signal_timeseries.items():
-             if timestamps and values:
-                  try:
-                       # Assuming already sorted (worker should sort if needed)
-                       latest_values[sig_name] = (values[-1], timestamps[-1])
-                  except IndexError: pass # Handle empty lists edge case
-         return latest_values
+    def _start_lod_build(self, network_id, signal_timeseries):
+        """Tạo kim tự tháp LOD cho các chuỗi dài trên luồng nền (đồ thị dùng mẫu gốc trong lúc chờ)."""
+        if not any(series_length(series) >= LOD_MIN_SAMPLES for series in signal_timeseries.values()):
+            return
+        worker_id = f"{network_id}_lod"
+        previous = self.workers.get(worker_id)
+        if previous is not None and previous.isRunning():
+            previous.stop() # Chuỗi cũ đã bị thay thế
+            previous.wait()
+        worker = LodBuildWorker(network_id, signal_timeseries)
+        worker.finished.connect(self.on_lod_built)
+        self.workers[worker_id] = worker
+        worker.start()
+
+    def on_lod_built(self, network_id, signal_timeseries, pyramids):
+        worker_id = f"{network_id}_lod"
+        if self.workers.get(worker_id) is self.sender():
+            del self.workers[worker_id]
+        if network_id not in self.networks_data: return
+        net_data = self.networks_data[network_id]
+        if not set_signal_lod(net_data, signal_timeseries, pyramids):
+            return # Trace khác đã được tải trong lúc tạo
+        self.statusLabel.setText(f"Net {net_data['name']}: Đã tạo LOD đồ thị cho {len(pyramids)} tín hiệu.")
+        if network_id == self.current_selected_network_id:
+            self.graphTab.set_signal_lod(pyramids)
 
     def _update_log_count(self, network_id, count):
         """Slot to update log message count in the data and UI."""
@@ -1773,8 +2103,9 @@ class MultiCanManagerApp(QMainWindow):
                  disconnect_tasks.append(net_id)
 
         # Identify running non-listener workers (DBC, Trace, Log)
+        # (decode workers are stopped together with their listener on disconnect)
         other_workers = {wid: w for wid, w in self.workers.items()
-                          if "_listener" not in wid and w.isRunning()}
+                          if "_listener" not in wid and "_decoder" not in wid and w.isRunning()}
 
         if disconnect_tasks or other_workers:
              tasks_running = []
@@ -1825,4 +2156,11 @@ if __name__ == '__main__':
 
     app = QApplication(sys.argv)
     manager = MultiCanManagerApp()
+
+    def report_startup_time():
+        # Chạy ở vòng lặp sự kiện đầu tiên, sau khi cửa sổ chính đã hiển thị
+        message = f"Cửa sổ chính hiển thị sau {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms (module đã nạp: {format_import_times()})"
+        print(message)
+        manager.statusLabel.setText(message)
+    QTimer.singleShot(0, report_startup_time)
     sys.exit(app.exec_())
@@ -1,61 +1,69 @@
 import sys
 import os
 import csv
+import io
+import multiprocessing
 import traceback
-import uuid # Để tạo ID mạng duy nhất
-from datetime import datetime
+import time
+from collections import deque
+
+STARTUP_TIME = time.perf_counter() # Mốc đo thời gian hiển thị cửa sổ chính
 
 # --- Kiểm tra và Nhập Thư viện ---
-try:
-    import cantools
-except ImportError:
+# Thư viện nặng (cantools, odxtools, pyqtgraph, isotp) chỉ được kiểm tra có cài
+# đặt hay không; chúng được import ở lần dùng đầu tiên qua module_loader.
+from module_loader import load_module, module_available, format_import_times
+if not module_available('cantools'):
     print("Lỗi: Thư viện 'cantools' chưa được cài đặt.")
     print("Vui lòng cài đặt bằng lệnh: pip install cantools")
     sys.exit(1)
+from can_decoder import load_dbc # Đọc DBC (thử nhiều encoding)
+from can_network import new_network, set_dbc, set_trace, clear_trace, set_signal_lod # Dữ liệu mạng (không phụ thuộc Qt)
 
 try:
     from PyQt5.QtWidgets import (
         QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,QGridLayout,
-        QAction, QFileDialog, QTreeWidget, QTreeWidgetItem, QTableWidget, QTableWidgetItem,
+        QAction, QFileDialog, QTreeWidget, QTreeWidgetItem,
         QStatusBar, QMessageBox, QSplitter, QHeaderView, QLabel, QMenuBar,QMenu,
-        QTabWidget, QPushButton, QLineEdit, QStackedWidget, QComboBox, QGroupBox,
-        QScrollArea, QTextEdit, QListWidget, QToolBar # Thêm các widget cần thiết
+        QTabWidget, QPushButton, QLineEdit, QComboBox, QGroupBox,
+        QScrollArea, QTextEdit, QListWidget, QToolBar, # Thêm các widget cần thiết
+        QTableView
     )
-    from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QTimer, QMutex # Thêm QMutex nếu cần thread-safety kỹ hơn
+    from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QSize, QTimer, QMutex, QMutexLocker, QWaitCondition
     from PyQt5.QtGui import QIcon, QFont
 except ImportError:
     print("Lỗi: Thư viện 'PyQt5' chưa được cài đặt.")
     print("Vui lòng cài đặt bằng lệnh: pip install PyQt5")
     sys.exit(1)
 
-# Tùy chọn: Thư viện đồ thị
-try:
-    import pyqtgraph as pg
-    PYQTGRAPH_AVAILABLE = True
-except ImportError:
-    PYQTGRAPH_AVAILABLE = False
+from trace_loader import load_trace # Đọc trace CSV/ASC/BLF + cache + giải mã (không phụ thuộc Qt)
+from trace_model import TraceTableModel, FILE_TRACE_COLUMNS # Model Qt cho bảng Trace
+from signal_model import SignalTableModel # Model Qt cho bảng Tín hiệu
+from diag_client import DiagnosticSession, load_diag_file # Chẩn đoán UDS qua ISO-TP (không phụ thuộc Qt)
+from signal_export import export_signals, default_export_format, EXPORT_FORMAT_PARQUET # Xuất tín hiệu dạng cột
+from signal_series import (series_length, decimate_series, build_signal_pyramids,
+                           MIN_PLOT_BUCKETS, LOD_MIN_SAMPLES) # Giảm điểm min/max / LOD cho đồ thị
+
+# Tùy chọn: Thư viện đồ thị (nạp khi tab Đồ thị được mở lần đầu)
+pg = None
+PYQTGRAPH_AVAILABLE = module_available('pyqtgraph')
+if not PYQTGRAPH_AVAILABLE:
     print("Cảnh báo: Thư viện 'pyqtgraph' không có sẵn. Tab đồ thị sẽ bị vô hiệu hóa.")
     print("Cài đặt bằng: pip install pyqtgraph")
 
-# Thư viện cho Chẩn đoán
-try:
-    import odxtools
-except ImportError:
+# Thư viện cho Chẩn đoán (odxtools: khi tải PDX/ODX, isotp: khi gửi yêu cầu)
+if not module_available('odxtools'):
     print("Lỗi: Thư viện 'odxtools' chưa được cài đặt.")
     print("Vui lòng cài đặt bằng lệnh: pip install odxtools")
     sys.exit(1)
 
-try:
-    import can
-except ImportError:
+if not module_available('can'): # python-can: nạp khi kết nối mạng
     print("Lỗi: Thư viện 'python-can' chưa được cài đặt.")
     print("Vui lòng cài đặt bằng lệnh: pip install python-can")
     # print("Bạn cũng cần cài đặt backend phù hợp, ví dụ: pip install python-can[vector]")
     sys.exit(1)
 
-try:
-    import isotp
-except ImportError:
+if not module_available('isotp'):
      print("Lỗi: Thư viện 'isotp' chưa được cài đặt (cho ISO 15765-2).")
      print("Vui lòng cài đặt bằng lệnh: pip install isotp")
      #sys.exit(1)
@@ -86,24 +94,7 @@ class DbcLoadingWorker(QThread):
     def run(self):
         try:
             self.progress.emit(self.network_id, f"Phân tích DBC: {os.path.basename(self.file_path)}...")
-            db = None
-            encodings_to_try = ['utf-8', 'latin-1', 'cp1252']
-            for enc in encodings_to_try:
-                try:
-                    db = cantools.db.load_file(self.file_path, strict=False, encoding=enc)
-                    self.progress.emit(self.network_id, f"Đọc DBC thành công với encoding '{enc}'.")
-                    break # Thoát vòng lặp nếu thành công
-                except UnicodeDecodeError:
-                    continue # Thử encoding tiếp theo
-                except Exception as inner_e: # Bắt lỗi khác từ cantools.load_file
-                     # Nếu lỗi không phải do encoding, ném ra ngoài
-                     if "encoding" not in str(inner_e).lower():
-                          raise inner_e
-                     continue # Thử encoding tiếp theo nếu liên quan đến encoding
-
-            if db is None:
-                 raise ValueError(f"Không thể đọc file DBC bằng các encoding đã thử: {', '.join(encodings_to_try)}")
-
+            db = load_dbc(self.file_path, progress=lambda message: self.progress.emit(self.network_id, message))
             self.finished.emit(self.network_id, db, self.file_path)
         except FileNotFoundError:
             self.finished.emit(self.network_id, None, f"Lỗi: Không tìm thấy file DBC '{self.file_path}'")
@@ -112,142 +103,94 @@ class DbcLoadingWorker(QThread):
             self.finished.emit(self.network_id, None, f"Lỗi đọc DBC:\n{e}\n\nChi tiết:\n{error_details}")
 
 class TraceLoadingWorker(QThread):
-    finished = pyqtSignal(str, list, dict, str) # network_id, trace_data, signal_timeseries, file_path / or error
+    finished = pyqtSignal(str, object, dict, str) # network_id, TraceStore, signal_timeseries, file_path / or error
     progress = pyqtSignal(str, str)          # network_id, message
     progress_percent = pyqtSignal(str, int)  # network_id, percent
 
-    def __init__(self, network_id, file_path, db=None): # Nhận cả db để giải mã nếu có
+    def __init__(self, network_id, file_path, decoder_table=None, dbc_path=None): # Nhận bảng giải mã nếu đã tải DBC
         super().__init__()
         self.network_id = network_id
         self.file_path = file_path
-        self.db = db # Database object để giải mã
+        self.decoder_table = decoder_table # DecoderTable để giải mã
+        self.dbc_path = dbc_path if decoder_table is not None else None # Khóa cache theo DBC
 
     def run(self):
-        trace_data = []
-        signal_timeseries = {} # { 'SignalName': ([timestamps], [values]) }
-        message_counter = 0
-        decoded_counter = 0
-        error_counter = 0
-        start_time = datetime.now()
-
         try:
-            # Ước tính số dòng
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f_count:
-                    total_lines = sum(1 for _ in f_count)
-            except Exception:
-                total_lines = 0
-
-            self.progress.emit(self.network_id, f"Đọc Trace: {os.path.basename(self.file_path)}...")
-            with open(self.file_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile) # Dùng csv.reader để xử lý tốt hơn
-                # Bỏ qua header nếu muốn: next(reader, None)
-                line_num = 0
-                for row in reader:
-                    line_num += 1
-                    if line_num % 5000 == 0: # Cập nhật tiến trình
-                        elapsed = (datetime.now() - start_time).total_seconds()
-                        rate = int(line_num / elapsed) if elapsed > 0 else 0
-                        self.progress.emit(self.network_id, f"Đọc dòng {line_num} ({rate} dòng/s)...")
-                        if total_lines > 0:
-                            percent = int((line_num / total_lines) * 100)
-                            self.progress_percent.emit(self.network_id, percent)
-
-                    if len(row) < 4:
-                        if any(field.strip() for field in row): # Bỏ qua nếu không phải dòng trống
-                            # print(f"Cảnh báo (NetID: {self.network_id}): Bỏ qua dòng {line_num}, thiếu cột: {row}")
-                            error_counter += 1
-                        continue
-
-                    timestamp_str, id_str, dlc_str, data_str = [field.strip() for field in row[:4]]
-
-                    # Xử lý ID
-                    try:
-                        can_id = int(id_str, 16) if id_str.lower().startswith('0x') else int(id_str)
-                        id_hex = f"{can_id:X}"
-                    except ValueError:
-                        # print(f"Cảnh báo (NetID: {self.network_id}): Dòng {line_num}, ID không hợp lệ: '{id_str}'")
-                        error_counter += 1
-                        continue
-
-                    # Xử lý DLC
-                    try:
-                        dlc = int(dlc_str)
-                        if not (0 <= dlc <= 64): # Cho phép CAN FD
-                           raise ValueError("DLC ngoài khoảng hợp lệ (0-64)")
-                    except ValueError:
-                        # print(f"Cảnh báo (NetID: {self.network_id}): Dòng {line_num}, DLC không hợp lệ: '{dlc_str}'")
-                        error_counter += 1
-                        continue
-
-                    # Xử lý Data
-                    data_hex = "".join(data_str.split()).upper()
-                    try:
-                        data_bytes = bytes.fromhex(data_hex)
-                        # Kiểm tra DLC và độ dài data (tùy chọn, có thể linh hoạt)
-                        # expected_len = cantools.database.can.message.Message.dlc_to_length(dlc) # Cần import Message
-                        # if len(data_bytes) != expected_len:
-                        #      print(f"Cảnh báo (NetID: {self.network_id}): Dòng {line_num}, Data length {len(data_bytes)} không khớp DLC {dlc} (expected {expected_len})")
-                        #      pass # Vẫn xử lý nếu muốn
-                    except ValueError:
-                        # print(f"Cảnh báo (NetID: {self.network_id}): Dòng {line_num}, Data hex không hợp lệ: '{data_str}'")
-                        error_counter += 1
-                        continue
-
-                    trace_data.append([timestamp_str, id_hex, str(dlc), data_hex])
-                    message_counter += 1
-
-                    # --- Giải mã và tạo timeseries nếu có DBC ---
-                    if self.db:
-                        try:
-                            message = self.db.get_message_by_frame_id(can_id)
-                            decoded_signals = message.decode(data_bytes, decode_choices=False, allow_truncated=True)
-                            decoded_counter += 1
-                            # Giả sử timestamp là số float hoặc có thể chuyển đổi
-                            try:
-                                ts_float = float(timestamp_str)
-                            except ValueError:
-                                # Nếu timestamp không phải số, dùng index hoặc bỏ qua cho timeseries
-                                ts_float = line_num # Dùng số dòng làm "thời gian" tạm thời
-
-                            for sig_name, sig_value in decoded_signals.items():
-                                if sig_name not in signal_timeseries:
-                                    signal_timeseries[sig_name] = ([], []) # ([timestamps], [values])
-                                signal_timeseries[sig_name][0].append(ts_float)
-                                signal_timeseries[sig_name][1].append(sig_value)
-
-                        except KeyError:
-                            pass # ID không có trong DBC, không giải mã được
-                        except Exception as decode_err:
-                            # print(f"Lỗi giải mã dòng {line_num} (ID: {id_hex}): {decode_err}")
-                            error_counter += 1 # Tăng lỗi nếu giải mã thất bại
-
-            self.progress.emit(self.network_id, f"Đọc Trace hoàn tất ({message_counter} msgs). Giải mã: {decoded_counter}. Lỗi: {error_counter}")
-            self.progress_percent.emit(self.network_id, 100)
+            trace_data, signal_timeseries, _decoded, _errors = load_trace(
+                self.file_path, self.decoder_table, self.dbc_path,
+                status=lambda message: self.progress.emit(self.network_id, message),
+                percent=lambda value: self.progress_percent.emit(self.network_id, value))
             self.finished.emit(self.network_id, trace_data, signal_timeseries, self.file_path)
-
         except FileNotFoundError:
             self.finished.emit(self.network_id, None, {}, f"Lỗi: Không tìm thấy file trace '{self.file_path}'")
         except Exception as e:
             error_details = traceback.format_exc()
             self.finished.emit(self.network_id, None, {}, f"Lỗi đọc Trace:\n{e}\n\nChi tiết:\n{error_details}")
 
+class LodBuildWorker(QThread):
+    """Tạo kim tự tháp min/max (LOD) cho các chuỗi tín hiệu dài sau khi tải trace."""
+    finished = pyqtSignal(str, object, object) # network_id, signal_timeseries đã dùng, {tên: MinMaxPyramid}
+
+    def __init__(self, network_id, signal_timeseries):
+        super().__init__()
+        self.network_id = network_id
+        self.signal_timeseries = signal_timeseries
+        self._stop_requested = False
+
+    def run(self):
+        pyramids = build_signal_pyramids(self.signal_timeseries, should_stop=lambda: self._stop_requested)
+        self.finished.emit(self.network_id, self.signal_timeseries, pyramids)
+
+    def stop(self):
+        self._stop_requested = True
+
+class SignalExportWorker(QThread):
+    """Giải mã trace và xuất bảng tín hiệu dạng cột (Parquet/npz) theo row-group."""
+    finished = pyqtSignal(str, bool, str) # network_id, success, output_path_or_error
+    progress = pyqtSignal(str, str)
+    progress_percent = pyqtSignal(str, int)
+
+    def __init__(self, network_id, trace_data, decoder_table, file_path):
+        super().__init__()
+        self.network_id = network_id
+        self.trace_data = trace_data
+        self.decoder_table = decoder_table
+        self.file_path = file_path
+
+    def run(self):
+        def report_progress(done, total):
+            self.progress_percent.emit(self.network_id, int(done * 100 / total) if total else 100)
+
+        try:
+            output_path, _fmt, row_count = export_signals(self.trace_data, self.decoder_table, self.file_path,
+                                                          progress=report_progress)
+            self.progress.emit(self.network_id, f"Đã xuất {row_count} dòng tín hiệu: {os.path.basename(output_path)}")
+            self.finished.emit(self.network_id, True, output_path)
+        except Exception as e:
+            error_details = traceback.format_exc()
+            self.finished.emit(self.network_id, False, f"Lỗi xuất tín hiệu:\n{e}\n\nChi tiết:\n{error_details}")
+
 class LoggingWorker(QThread):
     error = pyqtSignal(str, str) # network_id, error_message
     status = pyqtSignal(str, str) # network_id, status_message
 
-    def __init__(self, network_id, log_file_path):
+    FLUSH_BYTES = 1024 * 1024 # Flush xuống đĩa khi đã ghi chừng này byte...
+    FLUSH_INTERVAL_S = 1.0    # ... hoặc sau chừng này giây
+
+    def __init__(self, network_id, log_file_path, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S):
         super().__init__()
         self.network_id = network_id
         self.log_file_path = log_file_path
-        self._is_running = False
-        self.message_queue = [] # Đơn giản hóa: dùng list thay vì Queue thực sự
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._stop_requested = False # Dòng được thêm trước khi run() bắt đầu vẫn được giữ lại
+        self.message_queue = deque() # append/popleft của deque an toàn giữa các thread
+        self.queue_mutex = QMutex()
+        self.queue_not_empty = QWaitCondition() # Đánh thức thread ghi, không cần polling
         self.writer = None
         self.file = None
-        # self.queue_mutex = QMutex() # Optional: for thread-safe queue access
 
     def run(self):
-        self._is_running = True
         try:
             self.status.emit(self.network_id, f"Bắt đầu ghi log vào: {os.path.basename(self.log_file_path)}")
             # Mở file và tạo CSV writer
@@ -255,27 +198,31 @@ class LoggingWorker(QThread):
             self.writer = csv.writer(self.file)
             self.writer.writerow(['Timestamp', 'ID_Hex', 'DLC', 'Data_Hex']) # Viết header
 
-            while self._is_running:
-                # Xử lý message trong queue
-                messages_to_write = []
-                # self.queue_mutex.lock() # Lock if using mutex
-                while self.message_queue:
-                    messages_to_write.append(self.message_queue.pop(0))
-                # self.queue_mutex.unlock() # Unlock if using mutex
-
+            unflushed_bytes = 0
+            last_flush = time.monotonic()
+            wait_ms = int(self.flush_interval * 1000)
+            while True:
+                with QMutexLocker(self.queue_mutex):
+                    if not self.message_queue and not self._stop_requested:
+                        self.queue_not_empty.wait(self.queue_mutex, wait_ms)
+                    stop_requested = self._stop_requested
+
+                # Lấy hết hàng đợi rồi ghi cả khối bằng một lần write
+                queue = self.message_queue
+                messages_to_write = [queue.popleft() for _ in range(len(queue))]
                 if messages_to_write:
-                    self.writer.writerows(messages_to_write) # Ghi nhiều dòng một lúc
-                    self.file.flush() # Ghi xuống disk thường xuyên hơn?
-
-                self.msleep(50) # Ngủ một chút để tránh CPU load cao
-
-            # Ghi nốt những gì còn sót lại trong queue khi dừng
-            # self.queue_mutex.lock()
-            messages_to_write = self.message_queue[:]
-            self.message_queue.clear()
-            # self.queue_mutex.unlock()
-            if messages_to_write:
-                 self.writer.writerows(messages_to_write)
+                    block = io.StringIO()
+                    csv.writer(block).writerows(messages_to_write)
+                    unflushed_bytes += self.file.write(block.getvalue())
+
+                now = time.monotonic()
+                if unflushed_bytes and (unflushed_bytes >= self.flush_bytes or now - last_flush >= self.flush_interval):
+                    self.file.flush()
+                    unflushed_bytes = 0
+                    last_flush = now
+
+                if stop_requested and not self.message_queue:
+                    break # Đã dừng và ghi hết hàng đợi
             self.file.flush() # Đảm bảo dữ liệu được ghi hết
 
             self.status.emit(self.network_id, "Ghi log đã dừng.")
@@ -288,18 +235,25 @@ class LoggingWorker(QThread):
                 self.file.close()
                 self.file = None
                 self.writer = None
-            self._is_running = False # Đảm bảo cờ được đặt lại
 
     def stop(self):
         self.status.emit(self.network_id, "Đang dừng ghi log...")
-        self._is_running = False
+        with QMutexLocker(self.queue_mutex):
+            self._stop_requested = True
+            self.queue_not_empty.wakeAll()
 
     def add_message_to_queue(self, message_list):
-         # Cần cơ chế thread-safe nếu nhiều luồng cùng add (dùng QMutex hoặc collections.deque)
-         if self._is_running and self.writer:
-              # self.queue_mutex.lock()
-              self.message_queue.append(message_list)
-              # self.queue_mutex.unlock()
+        """Thêm một dòng log (list các trường CSV), thread-safe."""
+        self.add_messages_to_queue([message_list])
+
+    def add_messages_to_queue(self, rows):
+        """Thêm nhiều dòng log một lần (một lần đánh thức thread ghi)."""
+        if self._stop_requested:
+            return
+        self.message_queue.extend(rows)
+        # Khóa chỉ để không mất tín hiệu đánh thức giữa lúc kiểm tra và wait()
+        with QMutexLocker(self.queue_mutex):
+            self.queue_not_empty.wakeOne()
 
 # --- DIAGNOSTIC WORKERS ---
 
@@ -315,16 +269,7 @@ class DiagFileLoadingWorker(QThread):
     def run(self):
         try:
             print(f"Attempting to load diagnostic file: {self.file_path}")
-            db = None
-            if self.file_path.lower().endswith(".pdx"):
-                db = odxtools.load_pdx_file(self.file_path)
-            elif self.file_path.lower().endswith((".odx", ".odx-d")): # Basic ODX file types
-                 db = odxtools.load_odx_file(self.file_path)
-            # Thêm hỗ trợ CDD nếu có thư viện (hiện tại không có thư viện chuẩn)
-            # elif self.file_path.lower().endswith(".cdd"):
-            #     raise NotImplementedError("Phân tích cú pháp CDD chưa được hỗ trợ.")
-            else:
-                raise ValueError("Loại file không được hỗ trợ. Vui lòng chọn file .pdx hoặc .odx/.odx-d.")
+            db = load_diag_file(self.file_path)
 
             print(f"Successfully loaded diagnostic file for network {self.network_id}")
             self.finished.emit(self.network_id, db, self.file_path)
@@ -360,233 +305,38 @@ class DiagnosticWorker(QThread):
         self._is_running = True
 
     def run(self):
-        raw_request = b''
-        raw_response = b''
-        ecu: odxtools.DiagLayer = None # Type hint
-        isotp_stack = None
-        can_bus = None
-
+        session = None
         try:
             if not self.network_id or self.network_id not in self.main_app.networks_data:
                 raise ValueError("Network ID không hợp lệ hoặc không tìm thấy.")
 
             network_data = self.main_app.networks_data[self.network_id]
-            ecu = network_data.get('selected_ecu_diag_layer')
-            odx_db = network_data.get('odx_database')
-
-            if not ecu or not isinstance(ecu, odxtools.DiagLayer):
-                 raise ValueError("Chưa chọn ECU hợp lệ từ file ODX/PDX.")
-
-            # --- 1. Get CAN Bus and Check Connection ---
             can_bus = get_can_bus_for_network(self.network_id, self.main_app)
-            if can_bus is None:
-                 raise ConnectionError("Mạng CAN chưa được kết nối (bus không tồn tại).")
-
-            # --- 2. Get Addressing Info from ODX ---
-            # !!! PLACEHOLDER - Needs real ODX parsing logic !!!
-            tx_id = None
-            rx_id = None
-            try:
-                 # Versuche, IDs aus den ODX Kommunikationsparametern zu extrahieren
-                 # This is complex and requires navigating odxtools based on your ODX file structure
-                 # Example using get_can_receive_id/get_can_send_id (may not work for all ODX)
-                 tx_id = ecu.get_can_receive_id() # ECU receives requests on this ID
-                 rx_id = ecu.get_can_send_id()    # ECU sends responses from this ID
-
-                 if tx_id is None or rx_id is None:
-                      self.progress.emit(self.network_id, "Cảnh báo: Không tìm thấy ID req/resp trực tiếp, thử tìm trong CommParams...")
-                      # Add more sophisticated logic here to parse ecu.communication_parameters
-                      # This might involve finding the correct PhysConn, Protocol, etc.
-
-                      # --- Fallback / Hardcode (Remove in production) ---
-                      if tx_id is None: tx_id = 0x7E0 # Example PhysReq ID
-                      if rx_id is None: rx_id = 0x7E8 # Example PhysResp ID
-                      self.progress.emit(self.network_id, f"Cảnh báo: Sử dụng ID chẩn đoán mặc định/dự phòng ({tx_id:X}/{rx_id:X}). Nên định nghĩa rõ trong ODX.")
-                 else:
-                     self.progress.emit(self.network_id, f"Sử dụng ID từ ODX: Tx={tx_id:X}, Rx={rx_id:X}")
-
-            except Exception as e:
-                 self.progress.emit(self.network_id, f"Lỗi khi lấy ID từ ODX: {e}. Sử dụng dự phòng.")
-                 tx_id = 0x7E0
-                 rx_id = 0x7E8
-
-            if tx_id is None or rx_id is None:
-                 raise ValueError("Không thể xác định ID Request/Response chẩn đoán.")
-
-
-            # --- 3. Encode Request using odxtools ---
-            service_name = None
-            params = {} # Use dict for named parameters
-            req_type = self.request_details['type']
-            self.progress.emit(self.network_id, f"Chuẩn bị yêu cầu: {req_type}...")
-
-            # Find the service object
-            # ODX lookup can be by short_name or OID. Using get() is safer.
-            service = ecu.services.get(req_type) # Try matching type to service short name directly
-            if not service:
-                # Add lookups for common UDS service names if type doesn't match short_name
-                service_mapping = {
-                    'read_did': 'ReadDataByIdentifier',
-                    'read_dtc': 'ReadDTCInformation',
-                    'clear_dtc': 'ClearDiagnosticInformation',
-                    'ecu_reset': 'ECUReset',
-                    'security_access': 'SecurityAccess',
-                    'write_did': 'WriteDataByIdentifier',
-                    # Add other mappings as needed
-                }
-                service_name_lookup = service_mapping.get(req_type)
-                if service_name_lookup:
-                    service = ecu.services.get(service_name_lookup)
-
-            if not service:
-                 raise ValueError(f"Dịch vụ tương ứng với loại '{req_type}' không được định nghĩa trong ODX cho ECU này.")
-
-            service_name = service.short_name # Get the actual short name from the found service
-
-            # --- Populate parameters based on request_details ---
-            # !!! Parameter names MUST match those defined in the ODX for the service request !!!
-            if req_type == 'read_did':
-                did_value = self.request_details['did']
-                # Assume the first parameter is the identifier (Risky! Check ODX)
-                if not service.request or not service.request.parameters:
-                    raise ValueError(f"Service {service_name} không có tham số request được định nghĩa trong ODX.")
-                did_param_name = service.request.parameters[0].short_name
-                params = {did_param_name: did_value}
-
-            elif req_type == 'read_dtc':
-                subfunc = self.request_details['subfunction']
-                if not service.request or not service.request.parameters:
-                    raise ValueError(f"Service {service_name} không có tham số request được định nghĩa trong ODX.")
-                subfunc_param_name = service.request.parameters[0].short_name
-                params = {subfunc_param_name: subfunc}
-                # Handle optional DTCStatusMask (assuming it's the second param if present)
-                if len(service.request.parameters) > 1 and 'mask' in self.request_details:
-                     mask_param_name = service.request.parameters[1].short_name
-                     params[mask_param_name] = self.request_details['mask']
-
-            elif req_type == 'clear_dtc':
-                 group_of_dtc = self.request_details['group']
-                 if not service.request or not service.request.parameters:
-                     raise ValueError(f"Service {service_name} không có tham số request được định nghĩa trong ODX.")
-                 group_param_name = service.request.parameters[0].short_name
-                 params = {group_param_name: group_of_dtc}
-
-            elif req_type == 'ecu_reset':
-                 reset_type = self.request_details['subfunction']
-                 if not service.request or not service.request.parameters:
-                     raise ValueError(f"Service {service_name} không có tham số request được định nghĩa trong ODX.")
-                 reset_param_name = service.request.parameters[0].short_name
-                 params = {reset_param_name: reset_type}
-
-            # --- Add Security Access, Write DID, etc. here ---
-            # These require more complex parameter handling and possibly multi-step logic
-
-            else:
-                 raise NotImplementedError(f"Mã hóa cho loại yêu cầu '{req_type}' chưa được triển khai.")
-
-            # --- Encode the request ---
-            raw_request = service.encode_request(**params)
-
-            if not raw_request:
-                 raise ValueError(f"Không thể mã hóa yêu cầu {service_name} (kiểm tra định nghĩa ODX và tham số: {params}).")
-
-            self.progress.emit(self.network_id, f"Đã mã hóa yêu cầu {service_name}: {raw_request.hex()}")
-
-            # --- 4. Setup ISO-TP ---
-            addr = isotp.Address(isotp.AddressingMode.Normal_11bit, txid=tx_id, rxid=rx_id)
-            # Timeout needs tuning (STmin, Blocksize can also be set if needed)
-            isotp_stack = isotp.CanStack(bus=can_bus, address=addr, error_handler=self.isotp_error_handler)
-            isotp_stack.set_fc_opts(stmin=5, bs=10) # Example Flow Control options
-
-            # --- 5. Send Request and Receive Response ---
-            self.progress.emit(self.network_id, f"Gửi yêu cầu đến ID 0x{tx_id:X}...")
-            isotp_stack.send(raw_request)
-
-            self.progress.emit(self.network_id, f"Đang chờ phản hồi từ ID 0x{rx_id:X}...")
-            timeout = 5.0 # Adjust timeout as needed (seconds)
-            raw_response = isotp_stack.recv(timeout=timeout)
-
-            if raw_response is None:
-                raise TimeoutError(f"Không nhận được phản hồi chẩn đoán trong {timeout} giây.")
-
-            self.progress.emit(self.network_id, f"Đã nhận phản hồi: {raw_response.hex()}")
-
-            # --- 6. Decode Response using odxtools ---
-            decoded_response = ecu.decode(raw_response)
-
-            self.progress.emit(self.network_id, "Giải mã phản hồi...")
-
-            if decoded_response is None:
-                 # Handle cases where decode fails but it might be a valid (unknown) response
-                 if raw_response:
-                     resp_sid = raw_response[0]
-                     if resp_sid == 0x7F: # Negative response SID
-                          nrc = raw_response[2] if len(raw_response) > 2 else 0xFF
-                          nrc_obj = ecu.negative_responses.get(nrc)
-                          nrc_desc = nrc_obj.short_name if nrc_obj else f"Unknown NRC (0x{nrc:02X})"
-                          result_data = {
-                              'service_name': f"Unknown Service (Req SID: 0x{raw_request[0]:02X})" if raw_request else "Unknown",
-                              'response_type': 'Negative',
-                              'parameters': {},
-                              'nrc': {'code': nrc, 'description': nrc_desc}
-                          }
-                          error_msg = f"NRC 0x{nrc:02X}: {nrc_desc}"
-                          self.progress.emit(self.network_id, error_msg)
-                          self.finished.emit(self.network_id, False, result_data, raw_request, raw_response)
-                          return # Finished handling this specific case
-                     else: # Positive response SID but decode failed
-                          raise ValueError(f"Không thể giải mã phản hồi dương hợp lệ (SID: 0x{resp_sid:02X}). Kiểm tra định nghĩa ODX.")
-                 else: # No raw response
-                    raise ValueError("Không thể giải mã phản hồi rỗng.")
-
-
-            # Process successfully decoded response
-            result_data = {
-                'service_name': decoded_response.service.short_name if decoded_response.service else "Unknown",
-                'response_type': 'Positive' if decoded_response.positive else 'Negative',
-                'parameters': {},
-                'nrc': None
-            }
-
-            if decoded_response.positive:
-                for param_name, param_value in decoded_response.parameters.items():
-                    result_data['parameters'][param_name] = param_value # odxtools provides computed value
-                self.finished.emit(self.network_id, True, result_data, raw_request, raw_response)
-            else: # Negative Response
-                nrc_val = decoded_response.parameters.get('ResponseCode', raw_response[2] if len(raw_response) > 2 else 0xFF)
-                nrc_obj = ecu.negative_responses.get(nrc_val)
-                nrc_desc = nrc_obj.short_name if nrc_obj else f"Unknown NRC (0x{nrc_val:02X})"
-                result_data['nrc'] = {'code': nrc_val, 'description': nrc_desc}
-                error_msg = f"NRC 0x{nrc_val:02X}: {nrc_desc}"
-                self.progress.emit(self.network_id, error_msg)
-                self.finished.emit(self.network_id, False, result_data, raw_request, raw_response)
-
-
+            session = DiagnosticSession(can_bus, network_data.get('selected_ecu_diag_layer'),
+                                        status=self.report_status)
+            success, result_data = session.execute(self.request_details)
+            self.finished.emit(self.network_id, success, result_data, session.raw_request, session.raw_response)
         except Exception as e:
             error_details = traceback.format_exc()
             error_msg = f"Lỗi thực thi chẩn đoán:\n{e}\n\nChi tiết:\n{error_details}"
             self.progress.emit(self.network_id, "Lỗi chẩn đoán.")
             # Emit finished with success=False for general errors, pass the error string
+            raw_request = session.raw_request if session else b''
+            raw_response = session.raw_response if session else b''
             self.finished.emit(self.network_id, False, error_msg, raw_request, raw_response)
         finally:
             self._is_running = False
-            if isotp_stack:
-                try:
-                    isotp_stack.stop()
-                except Exception as cleanup_e:
-                    print(f"Lỗi khi dừng isotp stack: {cleanup_e}")
 
     def stop(self):
         self.progress.emit(self.network_id, "Đang yêu cầu dừng tác vụ chẩn đoán...")
         self._is_running = False
         # Stopping isotp.recv() might be tricky, rely on timeout for now
 
-    def isotp_error_handler(self, error):
-        """Callback for errors detected by the isotp layer."""
-        error_msg = f"Lỗi ISO-TP: {error}"
-        self.progress.emit(self.network_id, error_msg)
-        print(f"ISO-TP Error (Net: {self.network_id}): {error}")
-        # Consider terminating the operation or signaling the main thread
+    def report_status(self, message):
+        """Chuyển thông báo tiến trình / lỗi ISO-TP từ DiagnosticSession thành tín hiệu."""
+        self.progress.emit(self.network_id, message)
+        if message.startswith("Lỗi ISO-TP"):
+            print(f"ISO-TP Error (Net: {self.network_id}): {message}")
 
 
 # --- BASE TAB CLASS ---
@@ -597,6 +347,7 @@ class BaseNetworkTab(QWidget):
     loadTraceRequested = pyqtSignal(str) # network_id
     selectLogFileRequested = pyqtSignal(str) # network_id
     toggleLoggingRequested = pyqtSignal(str) # network_id
+    exportSignalsRequested = pyqtSignal(str) # network_id
     # Add signals for diagnostics if needed here, or handle via main window
 
     def __init__(self, parent=None):
@@ -743,225 +494,133 @@ class TraceMessagesTab(BaseNetworkTab):
         self.loadTraceButton.clicked.connect(self._request_load_trace)
         self.tracePathLabel = QLabel("Trace: Chưa tải") # Để hiển thị tóm tắt trace
         self.tracePathLabel.setWordWrap(True)
+        self.exportSignalsButton = QPushButton(QIcon.fromTheme("document-save-as"), "Xuất Tín hiệu...")
+        self.exportSignalsButton.setToolTip("Xuất tín hiệu đã giải mã dạng cột (Parquet, hoặc npz nếu chưa có pyarrow)")
+        self.exportSignalsButton.clicked.connect(self._request_export_signals)
+        self.exportSignalsButton.setEnabled(False)
         control_layout.addWidget(self.loadTraceButton)
         control_layout.addWidget(self.tracePathLabel, 1) # Cho label co giãn
+        control_layout.addWidget(self.exportSignalsButton)
         layout.addLayout(control_layout)
 
-        # Bảng hiển thị trace
-        self.traceTable = QTableWidget()
+        # Bảng hiển thị trace (model đọc thẳng từ TraceStore, text chỉ tạo cho dòng đang hiển thị)
+        self.traceModel = TraceTableModel(FILE_TRACE_COLUMNS, self)
+        self.traceTable = QTableView()
+        self.traceTable.setModel(self.traceModel)
         self._setup_trace_table()
         layout.addWidget(self.traceTable)
 
     def _setup_trace_table(self):
-        self.traceTable.setColumnCount(5)
-        headers = ["Timestamp", "ID (Hex)", "DLC", "Data (Hex)", "Decoded Signals"]
-        self.traceTable.setHorizontalHeaderLabels(headers)
         self.traceTable.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.traceTable.horizontalHeader().setStretchLastSection(True)
-        self.traceTable.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.traceTable.setSelectionBehavior(QTableWidget.SelectRows)
+        # Chiều cao dòng cố định: view không phải đo từng dòng khi có hàng triệu dòng
+        self.traceTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.traceTable.verticalHeader().setDefaultSectionSize(self.traceTable.fontMetrics().height() + 6)
+        self.traceTable.setEditTriggers(QTableView.NoEditTriggers)
+        self.traceTable.setSelectionBehavior(QTableView.SelectRows)
         self.traceTable.setAlternatingRowColors(True)
         self.traceTable.setWordWrap(False) # Performance for large tables
-        self.traceTable.setVerticalScrollMode(QTableWidget.ScrollPerPixel)
-        self.traceTable.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
+        self.traceTable.setVerticalScrollMode(QTableView.ScrollPerPixel)
+        self.traceTable.setHorizontalScrollMode(QTableView.ScrollPerPixel)
         # self.traceTable.setFont(QFont("Consolas", 9)) # Optional: Monospace font
 
     def _request_load_trace(self):
         if self.current_network_id:
             self.loadTraceRequested.emit(self.current_network_id)
 
+    def _request_export_signals(self):
+        if self.current_network_id:
+            self.exportSignalsRequested.emit(self.current_network_id)
+
     def update_content(self, network_id, network_data):
         super().update_content(network_id, network_data)
         trace_path = network_data.get('trace_path', None)
-        trace_data = network_data.get('trace_data', [])
-        db = network_data.get('db', None) # Lấy db để giải mã
+        trace_data = network_data.get('trace_data', None)
+        decoder_table = network_data.get('decoder_table', None) # Lấy bảng giải mã
+        self.exportSignalsButton.setEnabled(bool(trace_data) and decoder_table is not None)
 
-        if trace_path:
+        if trace_path and trace_data is not None:
              self.tracePathLabel.setText(f"Trace: {os.path.basename(trace_path)} ({len(trace_data)} msgs)")
              self.tracePathLabel.setToolTip(trace_path)
         else:
              self.tracePathLabel.setText("Trace: Chưa tải")
              self.tracePathLabel.setToolTip("")
 
-        self.populate_trace_table(trace_data, db)
+        self.populate_trace_table(trace_data, decoder_table)
 
-    def populate_trace_table(self, trace_data, db):
-        self.traceTable.setUpdatesEnabled(False) # Tắt update để tăng tốc
-        self.traceTable.setRowCount(0) # Xóa bảng cũ
+    def populate_trace_table(self, trace_data, decoder_table):
+        """Hiển thị TraceStore trong bảng; cột giải mã được tính khi dòng hiển thị."""
         if not trace_data:
-            self.traceTable.setUpdatesEnabled(True)
+            self.traceModel.set_source(None)
             return
-
-        self.traceTable.setRowCount(len(trace_data))
-
-        try:
-            for row_idx, row_data in enumerate(trace_data):
-                if len(row_data) < 4: continue # Skip invalid rows
-                timestamp, id_hex, dlc, data_hex = row_data
-
-                item_ts = QTableWidgetItem(timestamp)
-                item_id = QTableWidgetItem(id_hex)
-                item_dlc = QTableWidgetItem(dlc)
-                item_data = QTableWidgetItem(data_hex)
-                item_decoded = QTableWidgetItem("") # Reset cột giải mã
-
-                item_id.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                item_dlc.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-
-                self.traceTable.setItem(row_idx, 0, item_ts)
-                self.traceTable.setItem(row_idx, 1, item_id)
-                self.traceTable.setItem(row_idx, 2, item_dlc)
-                self.traceTable.setItem(row_idx, 3, item_data)
-                self.traceTable.setItem(row_idx, 4, item_decoded)
-
-                # --- Giải mã nếu có DBC ---
-                decoded_str_list = []
-                if db:
-                    try:
-                        can_id = int(id_hex, 16)
-                        message = db.get_message_by_frame_id(can_id)
-                        data_bytes = bytes.fromhex(data_hex)
-                        decoded_signals = message.decode(data_bytes, decode_choices=False, allow_truncated=True)
-
-                        for name, val in decoded_signals.items():
-                             # Format value nicely
-                             if isinstance(val, float): val_str = f"{val:.4g}"
-                             elif isinstance(val, (int, bool)): val_str = str(val)
-                             else: val_str = repr(val) # Handle strings, enums etc.
-                             decoded_str_list.append(f"{name}={val_str}")
-
-                        # Phát tín hiệu cập nhật giá trị signal cho tab khác
-                        ts_obj = timestamp # Giữ nguyên dạng string hoặc parse nếu cần
-                        for sig_name, sig_value in decoded_signals.items():
-                            self.signalValueUpdate.emit(self.current_network_id, sig_name, sig_value, ts_obj)
-                            # Don't store latest values here, main app should do it
-
-                    except KeyError:
-                        decoded_str_list.append("(ID không có trong DBC)")
-                    except ValueError:
-                        decoded_str_list.append("(Lỗi data hex)")
-                    except Exception as e:
-                        decoded_str_list.append(f"(Lỗi decode: {type(e).__name__})")
-
-                decoded_full_str = "; ".join(decoded_str_list)
-                if decoded_full_str:
-                    item_decoded.setText(decoded_full_str)
-                    item_decoded.setToolTip(decoded_full_str) # Tooltip hữu ích
-
-        finally:
-            self.traceTable.setUpdatesEnabled(True)
-            # Tự động resize cột lần đầu (optional)
-            # if not hasattr(self, '_trace_columns_resized'):
-            #      self.traceTable.resizeColumnsToContents()
-            #      self._trace_columns_resized = True
+        # CSV không có thông tin Xtd/RTR/ERR
+        self.traceModel.set_source(trace_data, decoder_table, show_flags=False)
 
 class SignalDataTab(BaseNetworkTab):
+    REFRESH_INTERVAL_MS = 66 # Cập nhật giá trị trên bảng tối đa ~15 lần/giây
+    COLUMN_HEADERS = ("Tên Tín hiệu", "Giá trị Hiện tại", "Đơn vị", "Timestamp Giá trị")
+
     def __init__(self, parent=None):
         super().__init__(parent)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(5, 5, 5, 5)
 
-        # Optional Filter
-        # ...
+        # Filter theo tên (SignalIndex có sẵn tên chữ thường)
+        self.filterEdit = QLineEdit()
+        self.filterEdit.setPlaceholderText("Lọc theo tên tín hiệu...")
+        self.filterEdit.setClearButtonEnabled(True)
+        layout.addWidget(self.filterEdit)
 
-        self.signalTable = QTableWidget()
+        # Một model cho mọi mạng: đổi mạng chỉ đổi SignalIndex / giá trị của model
+        self.signalModel = SignalTableModel(self.COLUMN_HEADERS, self)
+        self.signalTable = QTableView()
+        self.signalTable.setModel(self.signalModel)
         self._setup_signal_table()
         layout.addWidget(self.signalTable)
+        self.filterEdit.textChanged.connect(self.signalModel.set_filter)
 
-        # Local cache of row mapping for faster updates
-        self._signal_row_map = {}
+        self._latest_signal_values = {}
+        # Giá trị mới chỉ được ghi nhận; timer báo cho view các tín hiệu đã đổi
+        # (view chỉ vẽ lại các hàng đang hiển thị, text được tạo trong model.data())
+        self._pending_signals = set()
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True) # Bật lại khi có giá trị mới
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self._refresh_timer.timeout.connect(self._flush_pending_values)
 
     def _setup_signal_table(self):
-        self.signalTable.setColumnCount(4)
-        headers = ["Tên Tín hiệu", "Giá trị Hiện tại", "Đơn vị", "Timestamp Giá trị"]
-        self.signalTable.setHorizontalHeaderLabels(headers)
         self.signalTable.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.signalTable.horizontalHeader().setStretchLastSection(False) # Timestamp ko cần quá rộng
         self.signalTable.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch) # Kéo giãn cột tên
-        self.signalTable.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.signalTable.setSelectionBehavior(QTableWidget.SelectRows)
+        self.signalTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed) # Không đo chiều cao từng dòng
+        self.signalTable.setEditTriggers(QTableView.NoEditTriggers)
+        self.signalTable.setSelectionBehavior(QTableView.SelectRows)
         self.signalTable.setAlternatingRowColors(True)
         self.signalTable.setWordWrap(False)
 
     def update_content(self, network_id, network_data):
         super().update_content(network_id, network_data)
-        db = network_data.get('db', None)
         # Get latest values from the main data structure passed in
-        latest_signal_values = network_data.get('latest_signal_values', {})
-
-        self.populate_signal_list(db, latest_signal_values)
-
-    def populate_signal_list(self, db, latest_signal_values):
-        self.signalTable.setUpdatesEnabled(False)
-        self.signalTable.setRowCount(0)
-        self._signal_row_map.clear() # Clear local cache
-
-        if not db:
-            self.signalTable.setUpdatesEnabled(True)
-            return
-
-        signals_to_display = []
-        try:
-            for msg in db.messages:
-                for sig in msg.signals:
-                    signals_to_display.append(sig)
-
-            signals_to_display.sort(key=lambda s: s.name) # Sắp xếp theo tên
-
-            self.signalTable.setRowCount(len(signals_to_display))
-
-            for row_idx, sig in enumerate(signals_to_display):
-                sig_name = sig.name
-                self._signal_row_map[sig_name] = row_idx # Update cache
-
-                item_name = QTableWidgetItem(sig_name)
-                item_value = QTableWidgetItem("") # Giá trị ban đầu trống
-                item_unit = QTableWidgetItem(sig.unit if sig.unit else "")
-                item_ts = QTableWidgetItem("")
-
-                # Lấy giá trị mới nhất nếu có
-                if sig_name in latest_signal_values:
-                    value, timestamp = latest_signal_values[sig_name]
-                    value_str = f"{value:.4g}" if isinstance(value, (float, int)) else str(value)
-                    item_value.setText(value_str)
-                    item_ts.setText(str(timestamp))
-
-                self.signalTable.setItem(row_idx, 0, item_name)
-                self.signalTable.setItem(row_idx, 1, item_value)
-                self.signalTable.setItem(row_idx, 2, item_unit)
-                self.signalTable.setItem(row_idx, 3, item_ts)
-
-        finally:
-            self.signalTable.setUpdatesEnabled(True)
-            # Optional: Resize columns
-            # self.signalTable.resizeColumnsToContents()
+        self._latest_signal_values = network_data.get('latest_signal_values', {})
+        self._pending_signals.clear() # Model đọc thẳng từ latest_signal_values
+        self.signalModel.set_source(network_data.get('signal_index'), self._latest_signal_values)
 
     def update_signal_value(self, signal_name, value, timestamp):
-        """Slot để cập nhật một giá trị signal trong bảng."""
-        if signal_name in self._signal_row_map:
-            row_idx = self._signal_row_map[signal_name]
-
-            # Check if row index is still valid (table might have changed)
-            if row_idx >= self.signalTable.rowCount():
-                 # print(f"Warning: Row index {row_idx} for signal {signal_name} out of bounds.")
-                 # Optionally rebuild map or ignore update
-                 return
-
-            value_str = f"{value:.4g}" if isinstance(value, (float, int)) else str(value)
-            ts_str = str(timestamp)
-
-            # Cập nhật item nếu nó tồn tại, tạo mới nếu không (ít xảy ra)
-            value_item = self.signalTable.item(row_idx, 1)
-            if value_item: value_item.setText(value_str)
-            else: self.signalTable.setItem(row_idx, 1, QTableWidgetItem(value_str))
-
-            ts_item = self.signalTable.item(row_idx, 3)
-            if ts_item: ts_item.setText(ts_str)
-            else: self.signalTable.setItem(row_idx, 3, QTableWidgetItem(ts_str))
-        # else:
-            # print(f"Signal {signal_name} not found in table map for update") # Debug
+        """Slot ghi nhận giá trị mới của một signal; bảng được cập nhật theo nhịp timer."""
+        self._latest_signal_values[signal_name] = (value, timestamp)
+        self._pending_signals.add(signal_name)
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def _flush_pending_values(self):
+        pending_signals = self._pending_signals
+        self._pending_signals = set()
+        if self.isVisible(): # Tab ẩn: view đọc giá trị mới nhất khi hiện lại
+            self.signalModel.signals_updated(pending_signals)
 
 class GraphingTab(BaseNetworkTab):
+     VIEW_UPDATE_DELAY_MS = 30 # Gom các thay đổi zoom/pan liên tiếp trước khi giảm điểm lại
+
      def __init__(self, parent=None):
           super().__init__(parent)
           layout = QVBoxLayout(self)
@@ -982,40 +641,72 @@ class GraphingTab(BaseNetworkTab):
                 control_layout.addWidget(self.signalListWidget)
                 control_widget.setMaximumWidth(300)
 
-                # Plot Panel
-                pg.setConfigOption('background', 'w') # Set background before creating plot
-                pg.setConfigOption('foreground', 'k')
-                self.plotWidget = pg.PlotWidget(name="Signal Plot") # Give it a name
-                self.plotWidget.showGrid(x=True, y=True, alpha=0.3)
-                self.plotWidget.addLegend(offset=(-10, 10)) # Adjust legend position
+                # Plot Panel: PlotWidget được tạo khi tab hiển thị lần đầu (_ensure_plot_widget)
+                self._plotPlaceholder = QLabel("Đang khởi tạo đồ thị...")
+                self._plotPlaceholder.setAlignment(Qt.AlignCenter)
 
                 graph_splitter.addWidget(control_widget)
-                graph_splitter.addWidget(self.plotWidget)
+                graph_splitter.addWidget(self._plotPlaceholder)
                 graph_splitter.setSizes([200, 600])
+                self._graph_splitter = graph_splitter
 
                 layout.addWidget(graph_splitter)
 
           else:
                 layout.addWidget(QLabel("Thư viện 'pyqtgraph' không có sẵn. Không thể hiển thị đồ thị."))
+          self.plotWidget = None
 
           # Local cache of time series data for performance
           self._local_signal_time_series = {}
+          self._signal_lod = {} # {tên: MinMaxPyramid} của mạng đang xem
+          # Zoom/pan/resize: giảm điểm lại từ dữ liệu đầy đủ cho khoảng đang xem
+          self._view_timer = QTimer(self)
+          self._view_timer.setSingleShot(True)
+          self._view_timer.setInterval(self.VIEW_UPDATE_DELAY_MS)
+          self._view_timer.timeout.connect(self._update_plots_for_view)
+
+     def _ensure_plot_widget(self):
+          """Import pyqtgraph và tạo PlotWidget ở lần đầu tab được hiển thị."""
+          if self.plotWidget is not None or not PYQTGRAPH_AVAILABLE:
+                return False
+          global pg
+          pg = load_module('pyqtgraph')
+          print(f"Đã nạp pyqtgraph cho tab Đồ thị ({format_import_times()})")
+          pg.setConfigOption('background', 'w') # Set background before creating plot
+          pg.setConfigOption('foreground', 'k')
+          self.plotWidget = pg.PlotWidget(name="Signal Plot") # Give it a name
+          self.plotWidget.showGrid(x=True, y=True, alpha=0.3)
+          self.plotWidget.addLegend(offset=(-10, 10)) # Adjust legend position
+          view_box = self.plotWidget.getViewBox()
+          view_box.sigXRangeChanged.connect(self._view_timer.start)
+          view_box.sigResized.connect(self._view_timer.start)
+          self._graph_splitter.replaceWidget(1, self.plotWidget)
+          self._plotPlaceholder.deleteLater()
+          self._plotPlaceholder = None
+          return True
+
+     def showEvent(self, event):
+          super().showEvent(event)
+          if self._ensure_plot_widget():
+                self._plot_selected_signals() # Vẽ các tín hiệu đã chọn trước khi có đồ thị
 
      def update_content(self, network_id, network_data):
           super().update_content(network_id, network_data)
           # Make a shallow copy to avoid modifying the original if we filter/process locally
           self._local_signal_time_series = network_data.get('signal_time_series', {}).copy()
+          self._signal_lod = network_data.get('signal_lod', {})
           db = network_data.get('db', None)
 
           if PYQTGRAPH_AVAILABLE:
-                # Clear existing plots and legend
-                self.plotWidget.clear()
+                # Clear existing plots and legend (đồ thị chưa tạo khi tab chưa mở)
                 self.plot_items.clear()
-                # Check if legend exists before removing
-                if self.plotWidget.plotItem.legend:
-                    self.plotWidget.plotItem.legend.scene().removeItem(self.plotWidget.plotItem.legend)
-                    # Create a fresh legend
-                    self.plotWidget.addLegend(offset=(-10, 10))
+                if self.plotWidget is not None:
+                    self.plotWidget.clear()
+                    # Check if legend exists before removing
+                    if self.plotWidget.plotItem.legend:
+                        self.plotWidget.plotItem.legend.scene().removeItem(self.plotWidget.plotItem.legend)
+                        # Create a fresh legend
+                        self.plotWidget.addLegend(offset=(-10, 10))
 
 
                 # Clear and repopulate the signal list
@@ -1026,7 +717,7 @@ class GraphingTab(BaseNetworkTab):
                 if db:
                      all_signal_names = sorted([sig.name for msg in db.messages for sig in msg.signals])
                      # Only list signals that actually have timeseries data
-                     signals_with_data = [name for name in all_signal_names if name in self._local_signal_time_series and self._local_signal_time_series[name][0]]
+                     signals_with_data = [name for name in all_signal_names if name in self._local_signal_time_series and len(self._local_signal_time_series[name][0]) > 0]
                      self.signalListWidget.addItems(signals_with_data)
 
                      # Restore selection
@@ -1044,7 +735,7 @@ class GraphingTab(BaseNetworkTab):
           # else: handle case where pyqtgraph is not available
 
      def _plot_selected_signals(self):
-          if not PYQTGRAPH_AVAILABLE: return
+          if self.plotWidget is None: return # pyqtgraph không có hoặc tab chưa mở
 
           # Clear plots but keep legend items associated with self.plot_items
           for item in self.plot_items.values():
@@ -1060,55 +751,53 @@ class GraphingTab(BaseNetworkTab):
 
 
           plot_count = 0
-          max_points_display = 50000 # Limit points for performance
+          # Vẽ lại luôn hiển thị toàn bộ dữ liệu (autoRange bên dưới): giảm điểm trên toàn chuỗi
+          self.plotWidget.enableAutoRange()
 
           for idx, item in enumerate(selected_items):
                 sig_name = item.text()
                 if sig_name in self._local_signal_time_series:
+                     # Timeseries are float64 arrays (numeric only) built by TraceLoadingWorker
                      timestamps, values = self._local_signal_time_series[sig_name]
 
-                     if timestamps and values and len(timestamps) == len(values):
-                          # Filter numeric data for plotting
-                          numeric_timestamps = []
-                          numeric_values = []
-                          valid_data = False
-                          for t, v in zip(timestamps, values):
-                              # Ensure timestamp is numeric
-                              if isinstance(t, (int, float)):
-                                  # Ensure value is numeric (or can be converted, e.g., boolean to 0/1)
-                                   if isinstance(v, (int, float)):
-                                        numeric_timestamps.append(t)
-                                        numeric_values.append(v)
-                                        valid_data = True
-                                   elif isinstance(v, bool):
-                                        numeric_timestamps.append(t)
-                                        numeric_values.append(int(v)) # Plot bools as 0 or 1
-                                        valid_data = True
-                                   # Add handling for other types if needed (e.g., enums mapped to ints)
-
-                          if valid_data:
-                               pen = pens[plot_count % len(pens)]
-                               plot_name = sig_name
-                               # Sample data if too large
-                               if len(numeric_timestamps) > max_points_display:
-                                    step = len(numeric_timestamps) // max_points_display
-                                    sampled_ts = numeric_timestamps[::step]
-                                    sampled_val = numeric_values[::step]
-                                    plot_data_item = self.plotWidget.plot(sampled_ts, sampled_val, pen=pen, name=plot_name)
-                                    # print(f"Plotting {sig_name} (Sampled {len(sampled_ts)} points)")
-                               else:
-                                    plot_data_item = self.plotWidget.plot(numeric_timestamps, numeric_values, pen=pen, name=plot_name)
-                                    # print(f"Plotting {sig_name} ({len(numeric_timestamps)} points)")
-
-                               self.plot_items[sig_name] = plot_data_item # Store reference to the plot item
-                               plot_count += 1
-                          # else: print(f"Signal '{sig_name}' has no numeric data to plot.")
+                     if len(timestamps) > 0 and len(timestamps) == len(values):
+                          pen = pens[plot_count % len(pens)]
+                          # Limit points for performance: min/max mỗi cột pixel của khoảng đang xem
+                          plot_ts, plot_val = self._plot_arrays(sig_name)
+                          plot_data_item = self.plotWidget.plot(plot_ts, plot_val, pen=pen, name=sig_name)
+
+                          self.plot_items[sig_name] = plot_data_item # Store reference to the plot item
+                          plot_count += 1
                      # else: print(f"Timeseries data for '{sig_name}' is invalid or empty.")
                 # else: print(f"Timeseries data for '{sig_name}' not found in local cache.")
 
           # Auto-range axes after plotting
           self.plotWidget.autoRange()
 
+     def _plot_arrays(self, sig_name):
+          """Điểm cần vẽ: min/max mỗi cột pixel trong khoảng thời gian đang xem (giữ đỉnh/gai).
+
+          Đọc từ mức LOD phù hợp nếu tín hiệu đã có kim tự tháp.
+          """
+          view_box = self.plotWidget.getViewBox()
+          # Đang tự co giãn (chưa zoom/pan): khoảng xem đi theo dữ liệu, giảm điểm trên toàn chuỗi
+          x_range = None if view_box.autoRangeEnabled()[0] else view_box.viewRange()[0]
+          buckets = int(view_box.width()) or MIN_PLOT_BUCKETS
+          return decimate_series(self._local_signal_time_series[sig_name], self._signal_lod.get(sig_name), x_range, buckets)
+
+     def set_signal_lod(self, pyramids):
+          """Kim tự tháp LOD vừa tạo xong cho mạng đang xem: vẽ lại từ LOD."""
+          self._signal_lod = pyramids
+          self._update_plots_for_view()
+
+     def _update_plots_for_view(self):
+          """Giảm điểm lại tất cả đường đang vẽ sau khi zoom/pan/đổi kích thước."""
+          if self.plotWidget is None:
+                return
+          for sig_name, plot_data_item in self.plot_items.items():
+                if sig_name in self._local_signal_time_series:
+                     plot_data_item.setData(*self._plot_arrays(sig_name))
+
 class LoggingTab(BaseNetworkTab):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -1431,7 +1120,7 @@ class DiagnosticsTab(BaseNetworkTab):
         self.rawLogTextEdit.clear()
 
         # --- Enable/Disable based on ODX loaded state ---
-        if self.odx_database and isinstance(self.odx_database, odxtools.Database):
+        if self.odx_database and isinstance(self.odx_database, load_module('odxtools').Database):
             self.ecuSelectComboBox.setEnabled(True)
 
             # --- Populate ECU ComboBox ---
@@ -1996,6 +1685,7 @@ class MultiCanManagerApp(QMainWindow):
         self.dbcTab.loadDbcRequested.connect(self.handle_load_dbc)
         # Trace Tab
         self.traceTab.loadTraceRequested.connect(self.handle_load_trace)
+        self.traceTab.exportSignalsRequested.connect(self.handle_export_signals)
         self.traceTab.signalValueUpdate.connect(self.handle_signal_value_update) # Connect to main handler
         # Log Tab
         self.logTab.selectLogFileRequested.connect(self.handle_select_log_file)
@@ -2041,28 +1731,11 @@ class MultiCanManagerApp(QMainWindow):
 
     # --- Network Management Methods ---
     def add_new_network(self):
-        network_id = str(uuid.uuid4()) # Tạo ID duy nhất
         network_name = f"CAN Network {self.next_network_id_counter}"
         self.next_network_id_counter += 1
 
         # --- Initialize Network Data Structure ---
-        self.networks_data[network_id] = {
-            "name": network_name,
-            # DBC/Trace/Log Data
-            "dbc_path": None,
-            "db": None, # cantools db object
-            "trace_path": None,
-            "trace_data": [],
-            "signal_time_series": {},
-            "latest_signal_values": {},
-            "log_path": None,
-            "is_logging": False,
-            "logging_worker": None,
-            # Diagnostics Data
-            "diag_file_path": None,
-            "odx_database": None, # odxtools database object
-            "selected_ecu_diag_layer": None, # Selected odxtools DiagLayer object
-            "diag_worker": None, # Reference to active diagnostic worker
+        network_id, network_info = new_network(network_name, extra={ # ID duy nhất (uuid)
             # Connection Data (Crucial!)
             "can_interface": "vector", # Default or get from settings
             "can_channel": "0",        # Default or get from settings
@@ -2070,7 +1743,8 @@ class MultiCanManagerApp(QMainWindow):
             "can_bus": None,           # The python-can bus instance
             "is_connected": False,     # Connection status flag
             # Add other settings like FDCAN, filters if needed
-        }
+        })
+        self.networks_data[network_id] = network_info
 
         # Add item to the network tree
         root = self.networkTreeWidget.topLevelItem(0)
@@ -2261,6 +1935,7 @@ class MultiCanManagerApp(QMainWindow):
                 bus_args['app_name'] = 'MultiCANApp' # Recommended for Vector
 
             print(f"Attempting connection with args: {bus_args}")
+            can = load_module('can')
             bus = can.interface.Bus(**bus_args)
 
             network_info['can_bus'] = bus
@@ -2364,17 +2039,54 @@ class MultiCanManagerApp(QMainWindow):
         current_path = self.networks_data[network_id].get('trace_path', None)
         dir_path = os.path.dirname(current_path) if current_path else ""
 
-        file_path, _ = QFileDialog.getOpenFileName(self, f"Chọn File Trace CSV cho Mạng {self.networks_data[network_id]['name']}", dir_path, "CSV Files (*.csv);;Log Files (*.log);;All Files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, f"Chọn File Trace cho Mạng {self.networks_data[network_id]['name']}", dir_path, "Trace Files (*.csv *.asc *.blf);;CSV Files (*.csv);;Vector Log (*.asc *.blf);;Log Files (*.log);;All Files (*)")
         if file_path:
             self.update_network_status(network_id, f"Bắt đầu tải Trace: {os.path.basename(file_path)}...")
-            db_obj = self.networks_data[network_id].get('db', None)
-            worker = TraceLoadingWorker(network_id, file_path, db_obj)
+            decoder_table = self.networks_data[network_id].get('decoder_table', None)
+            dbc_path = self.networks_data[network_id].get('dbc_path', None)
+            worker = TraceLoadingWorker(network_id, file_path, decoder_table, dbc_path)
             worker.finished.connect(self.on_trace_loaded)
             worker.progress.connect(self.update_network_status)
             worker.progress_percent.connect(self.update_network_progress_percent)
             self.workers[worker_id] = worker
             worker.start()
 
+    def handle_export_signals(self, network_id):
+        if not network_id or network_id not in self.networks_data: return
+        network_info = self.networks_data[network_id]
+        trace_data = network_info.get('trace_data', None)
+        decoder_table = network_info.get('decoder_table', None)
+        if not trace_data or decoder_table is None:
+            QMessageBox.information(self, "Xuất Tín hiệu", "Cần tải DBC và file Trace trước khi xuất tín hiệu.")
+            return
+        worker_id = f"{network_id}_export"
+        if worker_id in self.workers and self.workers[worker_id].isRunning():
+            QMessageBox.information(self, "Đang xử lý", f"Đang xuất tín hiệu cho mạng {network_info['name']}...")
+            return
+
+        trace_path = network_info.get('trace_path', None) or ""
+        if default_export_format() == EXPORT_FORMAT_PARQUET:
+            file_filter = "Parquet Files (*.parquet);;All Files (*)"
+        else: # Không có pyarrow: ghi thư mục "<tên>.signals" chứa các file .npz
+            file_filter = "NumPy npz (*.signals);;All Files (*)"
+        suggested_path = os.path.splitext(trace_path)[0] + "_signals" if trace_path else ""
+        file_path, _ = QFileDialog.getSaveFileName(self, f"Xuất Tín hiệu cho Mạng {network_info['name']}", suggested_path, file_filter)
+        if file_path:
+            self.update_network_status(network_id, f"Bắt đầu xuất tín hiệu: {os.path.basename(file_path)}...")
+            worker = SignalExportWorker(network_id, trace_data, decoder_table, file_path)
+            worker.finished.connect(self.on_signals_exported)
+            worker.progress.connect(self.update_network_status)
+            worker.progress_percent.connect(self.update_network_progress_percent)
+            self.workers[worker_id] = worker
+            worker.start()
+
+    def on_signals_exported(self, network_id, success, path_or_error):
+        worker_id = f"{network_id}_export"
+        if worker_id in self.workers: del self.workers[worker_id]
+        if network_id not in self.networks_data: return
+        if not success:
+            self.show_network_error(network_id, path_or_error)
+
     def handle_select_log_file(self, network_id):
         if not network_id or network_id not in self.networks_data: return
         current_path = self.networks_data[network_id].get('log_path', None)
@@ -2423,12 +2135,14 @@ class MultiCanManagerApp(QMainWindow):
             # if network_info['is_logging'] and network_info['logging_worker']:
             #    network_info['logging_worker'].add_message_to_queue([timestamp, id_hex, dlc, data_hex])
             # For now, just log existing trace data when starting (not live)
-            if network_info.get('trace_data'):
-                 count = 0
-                 for msg_row in network_info['trace_data']:
-                      log_worker.add_message_to_queue(msg_row[:4]) # Ensure only needed columns
-                      count += 1
-                 self.update_network_status(network_id, f"Đã thêm {count} tin nhắn từ trace vào hàng đợi log.")
+            trace_data = network_info.get('trace_data')
+            if trace_data:
+                 rows = []
+                 for row in range(len(trace_data)):
+                      timestamp, frame_id, dlc, _flags, data = trace_data.frame(row)
+                      rows.append([f"{timestamp:.6f}", f"{frame_id:X}", str(dlc), data.hex().upper()])
+                 log_worker.add_messages_to_queue(rows)
+                 self.update_network_status(network_id, f"Đã thêm {len(rows)} tin nhắn từ trace vào hàng đợi log.")
 
 
             network_info['is_logging'] = True
@@ -2526,12 +2240,8 @@ class MultiCanManagerApp(QMainWindow):
 
         network_info = self.networks_data[network_id]
         if db_or_none is not None:
-            network_info['db'] = db_or_none
-            network_info['dbc_path'] = path_or_error
+            set_dbc(network_info, db_or_none, path_or_error) # Biên dịch bộ giải mã một lần, xóa dữ liệu giải mã cũ
             self.update_network_status(network_id, f"Đã tải DBC thành công: {os.path.basename(path_or_error)}")
-            # Clear derived data
-            network_info['latest_signal_values'] = {}
-            network_info['signal_time_series'] = {}
              # Update relevant tabs if current
             if network_id == self.current_selected_network_id:
                 self.dbcTab.update_content(network_id, network_info)
@@ -2539,14 +2249,11 @@ class MultiCanManagerApp(QMainWindow):
                 self.graphTab.update_content(network_id, network_info)
                 # Re-populate trace tab with new decoding (or prompt user)
                 if network_info.get('trace_data'):
-                     self.traceTab.populate_trace_table(network_info['trace_data'], db_or_none)
+                     self.traceTab.populate_trace_table(network_info['trace_data'], network_info['decoder_table'])
                      self.update_network_status(network_id, "Đã làm mới bảng trace với DBC mới.")
 
         else:
-            network_info['db'] = None
-            network_info['dbc_path'] = None
-            network_info['latest_signal_values'] = {}
-            network_info['signal_time_series'] = {}
+            set_dbc(network_info, None, None)
             self.show_network_error(network_id, f"Lỗi tải DBC:\n{path_or_error}")
             if network_id == self.current_selected_network_id:
                 self.dbcTab.update_content(network_id, network_info)
@@ -2563,13 +2270,10 @@ class MultiCanManagerApp(QMainWindow):
 
         network_info = self.networks_data[network_id]
         if trace_data_or_none is not None:
-            network_info['trace_data'] = trace_data_or_none
-            network_info['trace_path'] = path_or_error
-            network_info['signal_time_series'] = signal_timeseries
-            # Recalculate latest values
-            network_info['latest_signal_values'] = self._get_latest_values_from_timeseries(signal_timeseries)
+            set_trace(network_info, trace_data_or_none, path_or_error, signal_timeseries) # Tính lại giá trị mới nhất
 
             self.update_network_status(network_id, f"Đã tải Trace ({len(trace_data_or_none)} msgs): {os.path.basename(path_or_error)}")
+            self._start_lod_build(network_id, signal_timeseries)
 
             # Update tabs if current
             if network_id == self.current_selected_network_id:
@@ -2587,24 +2291,38 @@ class MultiCanManagerApp(QMainWindow):
             #      self.update_network_status(network_id, f"Đã thêm {count} tin nhắn từ trace mới vào log.")
 
         else:
-            network_info['trace_data'] = []
-            network_info['trace_path'] = None
-            network_info['signal_time_series'] = {}
-            network_info['latest_signal_values'] = {}
+            clear_trace(network_info)
             self.show_network_error(network_id, f"Lỗi tải Trace:\n{path_or_error}")
             if network_id == self.current_selected_network_id:
                 self.traceTab.update_content(network_id, network_info)
                 self.signalsTab.update_content(network_id, network_info)
                 self.graphTab.update_content(network_id, network_info)
 
-    def _get_latest_values_from_timeseries(self, signal_timeseries):
-        """Helper to get the last value for each signal from timeseries data."""
-        latest_values = {}
-        for sig_name, (timestamps, values) in signal_timeseries.items():
-             if timestamps and values:
-                  # Assuming timestamps are sorted, the last element is the latest
-                  latest_values[sig_name] = (values[-1], timestamps[-1])
-        return latest_values
+    def _start_lod_build(self, network_id, signal_timeseries):
+        """Tạo kim tự tháp LOD cho các chuỗi dài trên luồng nền (đồ thị dùng mẫu gốc trong lúc chờ)."""
+        if not any(series_length(series) >= LOD_MIN_SAMPLES for series in signal_timeseries.values()):
+            return
+        worker_id = f"{network_id}_lod"
+        previous = self.workers.get(worker_id)
+        if previous is not None and previous.isRunning():
+            previous.stop() # Chuỗi cũ đã bị thay thế
+            previous.wait()
+        worker = LodBuildWorker(network_id, signal_timeseries)
+        worker.finished.connect(self.on_lod_built)
+        self.workers[worker_id] = worker
+        worker.start()
+
+    def on_lod_built(self, network_id, signal_timeseries, pyramids):
+        worker_id = f"{network_id}_lod"
+        if self.workers.get(worker_id) is self.sender():
+            del self.workers[worker_id]
+        if network_id not in self.networks_data: return
+        network_info = self.networks_data[network_id]
+        if not set_signal_lod(network_info, signal_timeseries, pyramids):
+            return # Trace khác đã được tải trong lúc tạo
+        self.update_network_status(network_id, f"Đã tạo LOD đồ thị cho {len(pyramids)} tín hiệu.")
+        if network_id == self.current_selected_network_id:
+            self.graphTab.set_signal_lod(pyramids)
 
     def on_diag_file_loaded(self, network_id, odx_database_or_none, path_or_error):
         """Handles result from DiagFileLoadingWorker."""
@@ -2614,7 +2332,7 @@ class MultiCanManagerApp(QMainWindow):
         if network_id not in self.networks_data: return
 
         network_info = self.networks_data[network_id]
-        if odx_database_or_none is not None and isinstance(odx_database_or_none, odxtools.Database):
+        if odx_database_or_none is not None and isinstance(odx_database_or_none, load_module('odxtools').Database):
             network_info['odx_database'] = odx_database_or_none
             network_info['diag_file_path'] = path_or_error
             network_info['selected_ecu_diag_layer'] = None # Reset ECU selection
@@ -2800,6 +2518,7 @@ class MultiCanManagerApp(QMainWindow):
 
 # --- Main Execution ---
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # Cần cho tiến trình con khi đóng gói (Windows)
     # Setup for high-DPI displays (optional but recommended)
     if hasattr(Qt, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -2812,4 +2531,11 @@ if __name__ == '__main__':
 
     manager = MultiCanManagerApp()
     manager.show()
+
+    def report_startup_time():
+        # Chạy ở vòng lặp sự kiện đầu tiên, sau khi cửa sổ chính đã hiển thị
+        message = f"Cửa sổ chính hiển thị sau {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms (module đã nạp: {format_import_times()})"
+        print(message)
+        manager.statusLabel.setText(message)
+    QTimer.singleShot(0, report_startup_time)
     sys.exit(app.exec_())
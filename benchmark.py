@@ -0,0 +1,517 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+# --- Bộ đo hiệu năng (benchmark) với lưu lượng CAN tổng hợp ---
+# Sinh DBC và trace tổng hợp có tính tất định (cùng tham số + seed cho cùng dữ
+# liệu) rồi đo các đường nóng không cần giao diện:
+#   startup        thời gian hiển thị cửa sổ chính của từng GUI (tiến trình con, Qt offscreen)
+#   dbc_load       đọc DBC (can_decoder.load_dbc) và biên dịch DecoderTable
+#   trace_import   đọc trace CSV / BLF, load_trace (lần đầu và từ cache)
+#   decode         giải mã cả trace theo cột (decode_trace) và theo batch live
+#   live_pipeline  frame/s qua bus python-can 'virtual': nhận theo batch như
+#                  CanListenerThread, ghi FrameRingBuffer và decode_live_batch
+#   logging        ghi log CSV / BLF bằng LogFileWriter như LoggingWorker
+# Mỗi phép đo lấy thời gian tốt nhất trong --repeat lần; bộ nhớ đỉnh đo bằng
+# tracemalloc trong một lần chạy riêng. Kết quả ghi ra JSON để so sánh giữa các commit.
+#
+# Ví dụ:
+#   python benchmark.py -o bench.json
+#   python benchmark.py --fd --messages 200 --signals 32 --frames 500000 --only decode trace_import
+
+BENCHMARKS = ("startup", "dbc_load", "trace_import", "decode", "live_pipeline", "logging")
+GUI_SCRIPTS = ("Vector_diagnose_tool_v1.1.py", "Vector_diag_guid.py")
+HEAVY_MODULES = ("cantools", "odxtools", "pyqtgraph", "isotp", "can") # Báo cáo module đã nạp khi khởi động
+
+BENCH_NODE = "BENCH"
+FIRST_STANDARD_ID = 0x100
+MAX_STANDARD_MESSAGES = 0x800 - FIRST_STANDARD_ID # Quá số này: dùng ID mở rộng (29 bit)
+FIRST_EXTENDED_ID = 0x18000000
+DBC_EXTENDED_FLAG = 0x80000000 # Bit 31 của ID trong file DBC đánh dấu ID mở rộng
+SIGNAL_SCALES = (1.0, 0.5, 0.1, 0.01)
+SIGNAL_OFFSETS = (0.0, -40.0, 100.0)
+
+LIVE_BATCH_FRAMES = 256       # Giống CanListenerThread.BATCH_MAX_FRAMES
+LIVE_BATCH_INTERVAL_S = 0.020 # Giống CanListenerThread.BATCH_MAX_INTERVAL_S
+LIVE_RING_CAPACITY = 100000
+LOG_BATCH_FRAMES = 256
+
+
+# --- Dữ liệu tổng hợp ---
+
+def synthetic_frame_ids(messages):
+    """Danh sách (frame_id, is_extended) cho các message tổng hợp."""
+    if messages <= MAX_STANDARD_MESSAGES:
+        return [(FIRST_STANDARD_ID + index, False) for index in range(messages)]
+    return [(FIRST_EXTENDED_ID + index, True) for index in range(messages)]
+
+
+def synthetic_dbc_text(messages, signals, fd=False, seed=0):
+    """Nội dung file DBC tổng hợp: messages message, mỗi message tối đa signals tín hiệu.
+
+    Tín hiệu căn theo byte (1 hoặc 2 byte), xen kẽ Intel / Motorola, một phần có dấu;
+    hệ số / offset chọn ngẫu nhiên theo seed. fd=True: message 64 byte CAN FD.
+    """
+    rng = np.random.default_rng(seed)
+    payload_bytes = 64 if fd else 8
+    signal_count = max(1, min(signals, payload_bytes))
+    width = max(1, min(2, payload_bytes // signal_count)) # Số byte mỗi tín hiệu
+    lines = ['VERSION ""', "", "NS_ :", "", "BS_:", "", f"BU_: {BENCH_NODE}", ""]
+    frame_ids = synthetic_frame_ids(messages)
+    for index, (frame_id, is_extended) in enumerate(frame_ids):
+        dbc_id = frame_id | DBC_EXTENDED_FLAG if is_extended else frame_id
+        lines.append(f"BO_ {dbc_id} MSG_{index}: {payload_bytes} {BENCH_NODE}")
+        for sig_index in range(signal_count):
+            byte = sig_index * width
+            intel = sig_index % 2 == 0
+            start_bit = byte * 8 if intel else byte * 8 + 7 # Motorola: bit cao nhất của byte đầu
+            sign = "-" if sig_index % 3 == 2 else "+"
+            scale = SIGNAL_SCALES[rng.integers(len(SIGNAL_SCALES))]
+            offset = SIGNAL_OFFSETS[rng.integers(len(SIGNAL_OFFSETS))]
+            lines.append(f' SG_ S{index}_{sig_index} : {start_bit}|{width * 8}@{1 if intel else 0}{sign} '
+                         f'({scale:g},{offset:g}) [0|0] "" Vector__XXX')
+        lines.append("")
+    if fd:
+        lines.append('BA_DEF_ BO_  "VFrameFormat" ENUM  "StandardCAN","ExtendedCAN","reserved","J1939PG",'
+                     '"reserved","reserved","reserved","reserved","reserved","reserved","reserved","reserved",'
+                     '"reserved","reserved","StandardCAN_FD","ExtendedCAN_FD";')
+        lines.append('BA_DEF_DEF_  "VFrameFormat" "StandardCAN";')
+        for frame_id, is_extended in frame_ids:
+            dbc_id = frame_id | DBC_EXTENDED_FLAG if is_extended else frame_id
+            lines.append(f'BA_ "VFrameFormat" BO_ {dbc_id} {15 if is_extended else 14};')
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_trace(messages, frames, rate, fd=False, seed=0):
+    """TraceStore tổng hợp: frames frame với chu kỳ đều rate frame/s.
+
+    Mỗi frame thuộc một message chọn ngẫu nhiên (theo seed), payload ngẫu nhiên đủ độ dài.
+    """
+    from trace_buffer import TraceStore, FLAG_EXTENDED, FLAG_FD
+    rng = np.random.default_rng(seed)
+    payload_bytes = 64 if fd else 8
+    frame_ids = synthetic_frame_ids(messages)
+    ids = np.array([frame_id for frame_id, _ in frame_ids], dtype=np.uint32)
+    id_flags = np.array([FLAG_EXTENDED if is_extended else 0 for _, is_extended in frame_ids], dtype=np.uint8)
+    message_index = rng.integers(0, messages, frames)
+    flags = id_flags[message_index]
+    if fd:
+        flags = flags | FLAG_FD
+    return TraceStore(np.arange(frames, dtype=np.float64) / rate, ids[message_index],
+                      np.full(frames, payload_bytes, dtype=np.uint8), flags,
+                      rng.integers(0, 256, (frames, payload_bytes), dtype=np.uint8))
+
+
+def write_synthetic_files(directory, args):
+    """Ghi DBC, trace CSV và BLF tổng hợp vào directory. Trả về (dict đường dẫn, TraceStore)."""
+    from can_logger import LogFileWriter, messages_from_store, LOG_FORMAT_BLF
+    from trace_csv import TRACE_CSV_HEADER, format_csv_trace
+    paths = {name: os.path.join(directory, f"synthetic.{name}") for name in ("dbc", "csv", "blf")}
+    with open(paths["dbc"], "w", encoding="utf-8") as dbc_file:
+        dbc_file.write(synthetic_dbc_text(args.messages, args.signals, args.fd, args.seed))
+    store = synthetic_trace(args.messages, args.frames, args.rate, args.fd, args.seed)
+    with open(paths["csv"], "w", newline="", encoding="utf-8") as csv_file:
+        csv_file.write(TRACE_CSV_HEADER)
+        csv_file.write(format_csv_trace(store))
+    writer = LogFileWriter(paths["blf"], LOG_FORMAT_BLF, flush_bytes=None, flush_interval=None)
+    try:
+        writer.write(messages_from_store(store))
+    finally:
+        writer.close()
+    return paths, store
+
+
+# --- Đo ---
+
+def measure(func, repeat=3, memory=True, setup=None):
+    """Chạy func() repeat lần (setup() trước mỗi lần, không tính giờ).
+
+    Trả về (giây tốt nhất, kết quả lần cuối, bộ nhớ đỉnh tracemalloc (byte) hoặc None).
+    """
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        # Lần chạy riêng: tracemalloc làm chậm mã Python nên không dùng để tính giờ
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, result, peak
+
+
+def _rate_result(seconds, frames, peak, **extra):
+    result = {"seconds": seconds, "frames": frames,
+              "frames_per_s": frames / seconds if seconds > 0 else None,
+              "peak_memory_bytes": peak}
+    result.update(extra)
+    return result
+
+
+def bench_startup(args, context):
+    """Thời gian tới khi cửa sổ chính hiển thị, mỗi GUI trong một tiến trình con mới."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        "import importlib.util, json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "spec = importlib.util.spec_from_file_location('bench_gui', sys.argv[1])\n"
+        "module = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(module)\n"
+        "app = module.QApplication.instance() or module.QApplication([])\n"
+        "window = module.MultiCanManagerApp()\n"
+        "window.show()\n"
+        "app.processEvents()\n"
+        "seconds = time.perf_counter() - started\n"
+        f"loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print('BENCH_RESULT ' + json.dumps({'seconds': seconds, 'loaded_modules': loaded}))\n")
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = {}
+    for script in GUI_SCRIPTS:
+        script_path = os.path.join(script_dir, script)
+        timings = []
+        outcome = None
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            try:
+                completed = subprocess.run([sys.executable, "-c", code, script_path], cwd=script_dir, env=env,
+                                           capture_output=True, text=True, encoding="utf-8", errors="replace",
+                                           timeout=120)
+            except subprocess.TimeoutExpired:
+                outcome = {"skipped": "timeout"}
+                break
+            process_seconds = time.perf_counter() - started
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+            if completed.returncode != 0 or not lines:
+                error_lines = completed.stderr.strip().splitlines()
+                outcome = {"skipped": error_lines[-1] if error_lines else f"exit code {completed.returncode}"}
+                break
+            outcome = json.loads(lines[-1][len("BENCH_RESULT "):])
+            timings.append((outcome["seconds"], process_seconds))
+        if timings:
+            outcome["seconds"] = min(window for window, _ in timings)
+            outcome["process_seconds"] = min(process for _, process in timings) # Kể cả khởi động Python
+        results[script] = outcome
+    return results
+
+
+def bench_dbc_load(args, context):
+    from can_decoder import DecoderTable, load_dbc
+    dbc_path = context["paths"]["dbc"]
+    load_dbc(dbc_path) # Nạp cantools trước để không tính thời gian import vào lần đo đầu
+    seconds, db, peak = measure(lambda: load_dbc(dbc_path), args.repeat, args.memory)
+    compile_seconds, table, compile_peak = measure(lambda: DecoderTable(db), args.repeat, args.memory)
+    context["decoder_table"] = table
+    return {
+        "load": {"seconds": seconds, "messages": len(db.messages),
+                 "signals": sum(len(message.signals) for message in db.messages), "peak_memory_bytes": peak},
+        "compile": {"seconds": compile_seconds, "peak_memory_bytes": compile_peak},
+    }
+
+
+def bench_trace_import(args, context):
+    from trace_cache import cache_path_for
+    from trace_csv import read_csv_trace
+    from trace_loader import load_trace
+    from trace_vector import read_vector_trace
+    paths = context["paths"]
+    table = _decoder_table(context)
+    results = {}
+    for name, reader in (("csv", read_csv_trace), ("blf", read_vector_trace)):
+        path = paths[name]
+        seconds, (store, _errors), peak = measure(lambda: reader(path), args.repeat, args.memory)
+        results[name] = _rate_result(seconds, len(store), peak, bytes_per_s=os.path.getsize(path) / seconds)
+
+    csv_path = paths["csv"]
+    cache_path = cache_path_for(csv_path)
+
+    def remove_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+    # load_trace: đọc + giải mã + ghi cache (workers=1: không tính khởi tạo tiến trình con)
+    load = lambda: load_trace(csv_path, table, paths["dbc"], workers=1)
+    seconds, (store, _series, decoded, _errors), peak = measure(load, args.repeat, args.memory, setup=remove_cache)
+    results["load_trace"] = _rate_result(seconds, len(store), peak, decoded=decoded)
+    seconds, (store, _series, decoded, _errors), peak = measure(load, args.repeat, args.memory)
+    results["load_trace_cached"] = _rate_result(seconds, len(store), peak, decoded=decoded)
+    remove_cache()
+    return results
+
+
+def bench_decode(args, context):
+    from can_logger import messages_from_store
+    from live_decode import decode_live_batch
+    table = _decoder_table(context)
+    store = context["store"]
+    seconds, (series, decoded, _errors), peak = measure(lambda: table.decode_trace(store), args.repeat, args.memory)
+    results = {"trace": _rate_result(seconds, len(store), peak, decoded=decoded, signals=len(series))}
+
+    messages = context.setdefault("messages", messages_from_store(store))[:args.live_frames]
+
+    def decode_batches():
+        for start in range(0, len(messages), LIVE_BATCH_FRAMES):
+            decode_live_batch(messages[start:start + LIVE_BATCH_FRAMES], table)
+    seconds, _result, peak = measure(decode_batches, args.repeat, args.memory)
+    results["live_batches"] = _rate_result(seconds, len(messages), peak)
+    return results
+
+
+def _run_live_pipeline(messages, table, channel):
+    """Gửi messages qua bus 'virtual' trên một luồng, nhận và xử lý như luồng listener.
+
+    Trả về (số frame đã nhận, giây từ frame gửi đầu tiên tới khi xử lý xong frame cuối).
+    """
+    import can
+    from live_decode import decode_live_batch
+    from trace_buffer import FrameRingBuffer
+    receiver = can.Bus(interface="virtual", channel=channel, receive_own_messages=False)
+    sender = can.Bus(interface="virtual", channel=channel, receive_own_messages=False)
+    ring = FrameRingBuffer(LIVE_RING_CAPACITY)
+    try:
+        def send_all():
+            for msg in messages:
+                sender.send(msg)
+        sender_thread = threading.Thread(target=send_all, daemon=True)
+        received = 0
+        batch = []
+        batch_deadline = 0.0
+        started = time.perf_counter()
+        sender_thread.start()
+        while received < len(messages):
+            timeout = max(0.0, batch_deadline - time.monotonic()) if batch else 1.0
+            msg = receiver.recv(timeout=timeout)
+            if msg is None and not batch:
+                break # Không còn frame nào tới (không nên xảy ra)
+            if msg is not None:
+                if not batch:
+                    batch_deadline = time.monotonic() + LIVE_BATCH_INTERVAL_S
+                batch.append(msg)
+            if batch and (len(batch) >= LIVE_BATCH_FRAMES or time.monotonic() >= batch_deadline
+                          or received + len(batch) >= len(messages)):
+                ring.append_messages(batch)
+                decode_live_batch(batch, table)
+                received += len(batch)
+                batch = []
+        elapsed = time.perf_counter() - started
+        sender_thread.join()
+        return received, elapsed
+    finally:
+        receiver.shutdown()
+        sender.shutdown()
+
+
+def bench_live_pipeline(args, context):
+    from can_logger import messages_from_store
+    table = _decoder_table(context)
+    messages = context.setdefault("messages", messages_from_store(context["store"]))[:args.live_frames]
+    runs = []
+    peak = None
+    for run in range(max(1, args.repeat) + (1 if args.memory else 0)):
+        with_memory = args.memory and run == max(1, args.repeat)
+        if with_memory:
+            tracemalloc.start()
+        try:
+            received, seconds = _run_live_pipeline(messages, table, f"benchmark-{os.getpid()}-{run}")
+            if with_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if with_memory:
+                tracemalloc.stop()
+        if not with_memory:
+            runs.append((seconds, received))
+    seconds, received = min(runs)
+    return _rate_result(seconds, received, peak, sent=len(messages))
+
+
+def bench_logging(args, context):
+    from can_logger import LogFileWriter, messages_from_store, LOG_FORMAT_BLF, LOG_FORMAT_CSV
+    messages = context.setdefault("messages", messages_from_store(context["store"]))[:args.live_frames]
+    results = {}
+    for log_format in (LOG_FORMAT_CSV, LOG_FORMAT_BLF):
+        path = os.path.join(context["directory"], f"log.{log_format}")
+
+        def write_log():
+            writer = LogFileWriter(path, log_format) # Ngưỡng flush mặc định như LoggingWorker
+            try:
+                for start in range(0, len(messages), LOG_BATCH_FRAMES):
+                    writer.write(messages[start:start + LOG_BATCH_FRAMES])
+            finally:
+                writer.close()
+        seconds, _result, peak = measure(write_log, args.repeat, args.memory)
+        size = os.path.getsize(path)
+        results[log_format] = _rate_result(seconds, len(messages), peak, file_bytes=size,
+                                           bytes_per_s=size / seconds if seconds > 0 else None)
+    return results
+
+
+def _decoder_table(context):
+    if context.get("decoder_table") is None:
+        from can_decoder import DecoderTable, load_dbc
+        context["decoder_table"] = DecoderTable(load_dbc(context["paths"]["dbc"]))
+    return context["decoder_table"]
+
+
+BENCHMARK_FUNCTIONS = {
+    "startup": bench_startup,
+    "dbc_load": bench_dbc_load,
+    "trace_import": bench_trace_import,
+    "decode": bench_decode,
+    "live_pipeline": bench_live_pipeline,
+    "logging": bench_logging,
+}
+
+
+# --- Kết quả ---
+
+def _git_revision():
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def _package_version(name):
+    from importlib import metadata
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "python-can": _package_version("python-can"),
+        "cantools": _package_version("cantools"),
+        "PyQt5": _package_version("PyQt5"),
+    }
+
+
+def _peak_rss_bytes():
+    try:
+        import resource # Không có trên Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Linux: KiB
+
+
+def _format_summary(name, result, indent=""):
+    if not isinstance(result, dict):
+        return [f"{indent}{name}: {result}"]
+    if "skipped" in result:
+        return [f"{indent}{name}: bỏ qua ({result['skipped']})"]
+    if "seconds" not in result:
+        lines = [f"{indent}{name}:"]
+        for sub_name, sub_result in result.items():
+            lines.extend(_format_summary(sub_name, sub_result, indent + "  "))
+        return lines
+    text = f"{indent}{name}: {result['seconds'] * 1000:.1f} ms"
+    if result.get("frames_per_s"):
+        text += f", {result['frames_per_s']:,.0f} frame/s"
+    if result.get("peak_memory_bytes") is not None:
+        text += f", đỉnh {result['peak_memory_bytes'] / 1e6:.1f} MB"
+    if result.get("loaded_modules") is not None:
+        text += f", module đã nạp: {', '.join(result['loaded_modules']) or 'không'}"
+    return [text]
+
+
+def run_benchmarks(args):
+    """Chạy các benchmark đã chọn. Trả về dict kết quả (ghi ra JSON)."""
+    directory = tempfile.mkdtemp(prefix="dbc_reader_bench_")
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "environment": environment_info(),
+        "config": {"messages": args.messages, "signals": args.signals, "frames": args.frames,
+                   "rate": args.rate, "fd": args.fd, "seed": args.seed, "repeat": args.repeat,
+                   "live_frames": args.live_frames, "memory": args.memory},
+        "results": {},
+    }
+    try:
+        started = time.perf_counter()
+        paths, store = write_synthetic_files(directory, args)
+        report["config"]["generate_seconds"] = time.perf_counter() - started
+        context = {"directory": directory, "paths": paths, "store": store}
+        for name in args.only or BENCHMARKS:
+            if not args.quiet:
+                print(f"Đo {name}...", file=sys.stderr)
+            try:
+                report["results"][name] = BENCHMARK_FUNCTIONS[name](args, context)
+            except Exception as e:
+                report["results"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+            if not args.quiet:
+                print("\n".join(_format_summary(name, report["results"][name], "  ")), file=sys.stderr)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    report["peak_rss_bytes"] = _peak_rss_bytes()
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="benchmark.py",
+        description="Đo hiệu năng DBC / trace / giải mã / live / log với dữ liệu CAN tổng hợp, ghi kết quả JSON.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json",
+                        help="File JSON kết quả (mặc định: benchmark_results.json, '-' để in ra stdout)")
+    parser.add_argument("--messages", type=int, default=50, help="Số message trong DBC tổng hợp (mặc định 50)")
+    parser.add_argument("--signals", type=int, default=8, help="Số tín hiệu mỗi message (mặc định 8)")
+    parser.add_argument("--frames", type=int, default=200000, help="Số frame của trace tổng hợp (mặc định 200000)")
+    parser.add_argument("--rate", type=float, default=2000.0, help="Tần số frame trên bus, frame/s (mặc định 2000)")
+    parser.add_argument("--fd", action="store_true", help="Message CAN FD 64 byte")
+    parser.add_argument("--seed", type=int, default=0, help="Seed sinh dữ liệu (mặc định 0)")
+    parser.add_argument("--live-frames", type=int, default=50000,
+                        help="Số frame cho live_pipeline / decode live / logging (mặc định 50000)")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="Số lần đo, lấy lần nhanh nhất (mặc định 3)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Không đo bộ nhớ đỉnh")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Chỉ chạy các benchmark này")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Không in tóm tắt")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.messages < 1 or args.signals < 1 or args.frames < 1 or args.rate <= 0:
+        print("Lỗi: --messages, --signals, --frames và --rate phải lớn hơn 0", file=sys.stderr)
+        return 2
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+        if not args.quiet:
+            print(f"Đã ghi kết quả: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
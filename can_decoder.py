@@ -0,0 +1,365 @@
+import struct
+
+import numpy as np
+
+from module_loader import load_module
+
+# --- Bộ giải mã DBC biên dịch sẵn theo Frame ID ---
+# cantools.Message.decode() chạy bitstruct và tạo lại các dict trung gian cho
+# mỗi frame. Ở đây mỗi message được "biên dịch" một lần khi tải DBC thành danh
+# sách tuple (vị trí bit, mask, scale, offset...) để giải mã một frame chỉ bằng
+# int.from_bytes, dịch bit và AND.
+
+# Encoding thử lần lượt khi đọc file DBC
+DBC_ENCODINGS = ('utf-8', 'latin-1', 'cp1252')
+
+# Kiểu giá trị thô của tín hiệu
+RAW_INT = 0
+RAW_FLOAT32 = 1
+RAW_FLOAT64 = 2
+
+# Cờ frame không mang dữ liệu tín hiệu (giống trace_buffer.FLAG_REMOTE | FLAG_ERROR)
+_NO_SIGNAL_FLAGS = 0x02 | 0x04
+
+# Chỉ số các trường trong tuple tín hiệu đã biên dịch
+SIG_NAME = 0
+SIG_IS_LITTLE = 1 # True: Intel (little endian), False: Motorola (big endian)
+SIG_SHIFT = 2     # Số bit dịch phải trên số nguyên little/big endian của payload
+SIG_LENGTH = 3
+SIG_MASK = 4
+SIG_SIGN_BIT = 5  # 0 nếu unsigned
+SIG_SCALE = 6
+SIG_OFFSET = 7
+SIG_RAW_TYPE = 8
+SIG_END_BIT = 9   # Bit tuần tự cuối cùng (loại bỏ tín hiệu khi frame bị cắt ngắn)
+
+
+def _is_integer(value):
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def compile_signal(signal, message_length):
+    """Biên dịch một cantools Signal thành tuple theo bố cục SIG_*."""
+    total_bits = 8 * message_length
+    length = signal.length
+    if signal.byte_order == 'little_endian':
+        is_little = True
+        first_bit = signal.start
+        shift = first_bit
+    else:
+        is_little = False
+        # Đánh số bit tuần tự (MSB của byte 0 là bit 0), giống cantools.utils.start_bit
+        first_bit = 8 * (signal.start // 8) + (7 - (signal.start % 8))
+        shift = total_bits - (first_bit + length)
+
+    if signal.is_float:
+        raw_type = RAW_FLOAT32 if length == 32 else RAW_FLOAT64
+        sign_bit = 0
+    else:
+        raw_type = RAW_INT
+        sign_bit = (1 << (length - 1)) if signal.is_signed else 0
+
+    # Giữ đúng kiểu kết quả của cantools: scale/offset nguyên -> giá trị int
+    scale = signal.scale
+    offset = signal.offset
+    if not signal.is_float and _is_integer(scale) and _is_integer(offset):
+        scale = int(scale)
+        offset = int(offset)
+
+    return (signal.name, is_little, shift, length, (1 << length) - 1, sign_bit,
+            scale, offset, raw_type, first_bit + length)
+
+
+class MessageDecoder:
+    """Bộ giải mã biên dịch sẵn cho một message DBC.
+
+    Kết quả giống message.decode(data, decode_choices=False, allow_truncated=True).
+    Message multiplexed hoặc container vẫn dùng bộ giải mã của cantools.
+    """
+    __slots__ = ('message', 'name', 'frame_id', 'length', 'signals',
+                 '_need_little', '_need_big', '_use_cantools')
+
+    def __init__(self, message):
+        self.message = message
+        self.name = message.name
+        self.frame_id = message.frame_id
+        self.length = message.length
+        self._use_cantools = bool(message.is_multiplexed() or getattr(message, 'is_container', False))
+        self.signals = tuple(compile_signal(sig, message.length) for sig in message.signals)
+        self._need_little = any(sig[SIG_IS_LITTLE] for sig in self.signals)
+        self._need_big = any(not sig[SIG_IS_LITTLE] for sig in self.signals)
+
+    def decode(self, data):
+        """Giải mã payload (bytes) thành dict {tên tín hiệu: giá trị}."""
+        if self._use_cantools:
+            return self.message.decode(data, decode_choices=False, allow_truncated=True)
+
+        length = self.length
+        available_bits = 8 * len(data)
+        if len(data) != length:
+            # Cùng quy tắc với cantools: đệm 0xFF khi thiếu (tín hiệu nằm ngoài
+            # dữ liệu thực bị bỏ qua bên dưới), cắt bớt khi thừa
+            data = data[:length] if len(data) > length else data.ljust(length, b"\xFF")
+        value_little = int.from_bytes(data, 'little') if self._need_little else 0
+        value_big = int.from_bytes(data, 'big') if self._need_big else 0
+
+        decoded = {}
+        for name, is_little, shift, sig_len, mask, sign_bit, scale, offset, raw_type, end_bit in self.signals:
+            if end_bit > available_bits:
+                continue # Tín hiệu bị cắt ngắn (allow_truncated)
+            raw = ((value_little if is_little else value_big) >> shift) & mask
+            if raw_type == RAW_INT:
+                if sign_bit and raw & sign_bit:
+                    raw -= sign_bit << 1
+            elif raw_type == RAW_FLOAT32:
+                raw = struct.unpack('<f', raw.to_bytes(4, 'little'))[0]
+            else:
+                raw = struct.unpack('<d', raw.to_bytes(8, 'little'))[0]
+            if scale == 1 and offset == 0:
+                decoded[name] = raw
+            else:
+                decoded[name] = raw * scale + offset
+        return decoded
+
+    def decode_columns(self, payloads, lengths):
+        """Giải mã nhiều frame cùng ID một lần bằng phép toán bit NumPy.
+
+        payloads là ma trận uint8 (n x width), lengths là số byte data thực
+        của mỗi frame. Trả về {tên tín hiệu: (mask hợp lệ hoặc None, giá trị float64)};
+        mask loại bỏ các frame quá ngắn chứa tín hiệu (như allow_truncated).
+        Không dùng cho message multiplexed/container (xem use_cantools).
+        """
+        available_bits = lengths.astype(np.int64) * 8
+        columns = {}
+        for name, is_little, _shift, length, mask, sign_bit, scale, offset, raw_type, end_bit in self.signals:
+            if is_little:
+                raw = _extract_little(payloads, end_bit - length, length)
+            else:
+                raw = _extract_big(payloads, end_bit - length, length)
+            raw &= np.uint64(mask)
+            if raw_type == RAW_FLOAT32:
+                with np.errstate(invalid='ignore'): # Mẫu bit NaN vẫn giữ là NaN
+                    values = raw.astype(np.uint32).view(np.float32).astype(np.float64)
+            elif raw_type == RAW_FLOAT64:
+                values = raw.view(np.float64).copy()
+            elif sign_bit:
+                if length < 64:
+                    # (raw ^ sign_bit) - sign_bit: mọi số hạng vừa trong int64 (1 << 63 thì không)
+                    signed = (raw ^ np.uint64(sign_bit)).astype(np.int64) - np.int64(sign_bit)
+                else:
+                    signed = raw.astype(np.int64)
+                values = signed.astype(np.float64)
+            else:
+                values = raw.astype(np.float64)
+            if not (scale == 1 and offset == 0):
+                values = values * scale + offset
+            valid = available_bits >= end_bit
+            columns[name] = (None if valid.all() else valid, values)
+        return columns
+
+    @property
+    def use_cantools(self):
+        return self._use_cantools
+
+
+def _payload_column(payloads, byte_index):
+    """Cột byte byte_index dạng uint64 (0 nếu nằm ngoài độ rộng payload)."""
+    if byte_index >= payloads.shape[1]:
+        return np.zeros(payloads.shape[0], dtype=np.uint64)
+    return payloads[:, byte_index].astype(np.uint64)
+
+
+def _extract_little(payloads, start, length):
+    """Lấy length bit bắt đầu từ bit start của payload little endian (chưa mask)."""
+    first_byte = start // 8
+    bit_offset = start % 8
+    byte_count = (bit_offset + length + 7) // 8 # Tối đa 9 byte với tín hiệu 64 bit lệch
+    raw = np.zeros(payloads.shape[0], dtype=np.uint64)
+    for k in range(min(byte_count, 8)):
+        raw |= _payload_column(payloads, first_byte + k) << np.uint64(8 * k)
+    raw >>= np.uint64(bit_offset)
+    if byte_count > 8:
+        raw |= _payload_column(payloads, first_byte + 8) << np.uint64(64 - bit_offset)
+    return raw
+
+
+def _extract_big(payloads, first_bit, length):
+    """Lấy length bit bắt đầu từ bit tuần tự first_bit (MSB byte 0 = bit 0), Motorola."""
+    first_byte = first_bit // 8
+    last_byte = (first_bit + length - 1) // 8
+    right_shift = 8 * (last_byte + 1) - (first_bit + length)
+    low_first = max(first_byte, last_byte - 7) # 8 byte thấp nhất nằm vừa trong uint64
+    raw = np.zeros(payloads.shape[0], dtype=np.uint64)
+    for byte_index in range(low_first, last_byte + 1):
+        raw |= _payload_column(payloads, byte_index) << np.uint64(8 * (last_byte - byte_index))
+    raw >>= np.uint64(right_shift)
+    if low_first > first_byte: # Tín hiệu 64 bit trải trên 9 byte
+        raw |= _payload_column(payloads, first_byte) << np.uint64(64 - right_shift)
+    return raw
+
+
+class DecoderTable:
+    """Bảng bộ giải mã theo Frame ID (int), xây dựng một lần khi tải DBC."""
+
+    def __init__(self, db):
+        self.db = db
+        self._decoders = {msg.frame_id: MessageDecoder(msg) for msg in db.messages}
+
+    def __len__(self):
+        return len(self._decoders)
+
+    def __contains__(self, frame_id):
+        return frame_id in self._decoders
+
+    def get(self, frame_id):
+        """Trả về MessageDecoder cho frame_id, hoặc None nếu ID không có trong DBC."""
+        return self._decoders.get(frame_id)
+
+    def frame_ids_for_signal(self, signal_name):
+        """Các Frame ID có chứa tín hiệu signal_name."""
+        return [msg.frame_id for msg in self.db.messages
+                if any(sig.name == signal_name for sig in msg.signals)]
+
+    def decode(self, frame_id, data):
+        """Giải mã một frame. Trả về None nếu ID không có trong DBC."""
+        decoder = self._decoders.get(frame_id)
+        if decoder is None:
+            return None
+        return decoder.decode(data)
+
+    def signal_names(self):
+        """Tên các tín hiệu trong DBC (không trùng, theo thứ tự message/tín hiệu)."""
+        return list(dict.fromkeys(sig.name for msg in self.db.messages for sig in msg.signals))
+
+    def decode_trace(self, store):
+        """Giải mã toàn bộ một TraceStore theo từng Frame ID.
+
+        Trả về ({tên tín hiệu: (timestamps float64, values float64)}, số frame
+        đã giải mã, số frame lỗi). Các tín hiệu giữ thứ tự frame trong trace.
+        """
+        signal_rows, decoded_count, error_count = self.decode_rows(store)
+        signal_timeseries = {sig_name: (store.timestamps[sig_rows], values)
+                             for sig_name, (sig_rows, values) in signal_rows.items()}
+        return signal_timeseries, decoded_count, error_count
+
+    def decode_rows(self, store):
+        """Như decode_trace nhưng trả về chỉ số dòng thay cho timestamp.
+
+        Trả về ({tên tín hiệu: (dòng intp, values float64)}, số frame đã giải
+        mã, số frame lỗi), các dòng tăng dần.
+        """
+        ids = store.ids
+        usable = (store.flags & _NO_SIGNAL_FLAGS) == 0
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(ids) else []
+
+        parts = {} # tên tín hiệu -> [(chỉ số dòng, giá trị), ...]
+        decoded_count = 0
+        error_count = 0
+        for group_index, group_start in enumerate(group_starts):
+            group_end = group_starts[group_index + 1] if group_index + 1 < len(group_starts) else len(order)
+            decoder = self._decoders.get(int(sorted_ids[group_start]))
+            if decoder is None:
+                continue # ID không có trong DBC
+            rows = order[group_start:group_end]
+            rows = rows[usable[rows] & (store.dlcs[rows] > 0)]
+            if len(rows) == 0:
+                continue
+
+            if decoder.use_cantools:
+                # Multiplexed/container: giải mã từng frame như trước
+                frame_series = {} # tên tín hiệu -> ([dòng], [giá trị])
+                for row in rows.tolist():
+                    _ts, _fid, _dlc, _flags, data = store.frame(row)
+                    try:
+                        decoded_signals = decoder.decode(data)
+                    except Exception:
+                        error_count += 1
+                        continue
+                    decoded_count += 1
+                    for sig_name, sig_value in decoded_signals.items():
+                        try:
+                            value_float = float(sig_value)
+                        except (TypeError, ValueError):
+                            continue
+                        sig_rows, sig_values = frame_series.setdefault(sig_name, ([], []))
+                        sig_rows.append(row)
+                        sig_values.append(value_float)
+                for sig_name, (sig_rows, sig_values) in frame_series.items():
+                    parts.setdefault(sig_name, []).append(
+                        (np.array(sig_rows, dtype=np.intp), np.array(sig_values, dtype=np.float64)))
+                continue
+
+            decoded_count += len(rows)
+            columns = decoder.decode_columns(store.payloads[rows], store.dlcs[rows])
+            for sig_name, (valid, values) in columns.items():
+                sig_rows = rows
+                if valid is not None:
+                    sig_rows = rows[valid]
+                    values = values[valid]
+                if len(sig_rows):
+                    parts.setdefault(sig_name, []).append((sig_rows, values))
+
+        signal_rows = {}
+        for sig_name, sig_parts in parts.items():
+            sig_rows = np.concatenate([part[0] for part in sig_parts])
+            values = np.concatenate([part[1] for part in sig_parts])
+            if len(sig_parts) > 1: # Tín hiệu cùng tên trong nhiều message: trả về theo thứ tự trace
+                by_row = np.argsort(sig_rows, kind='stable')
+                sig_rows = sig_rows[by_row]
+                values = values[by_row]
+            signal_rows[sig_name] = (sig_rows, values)
+        return signal_rows, decoded_count, error_count
+
+
+class SignalIndex:
+    """Danh sách tín hiệu của DBC sắp theo tên, xây dựng một lần khi tải DBC.
+
+    Tên chữ thường được tạo sẵn: lọc theo tên chỉ là phép "in" trên chuỗi có sẵn,
+    không gọi lower() cho từng tín hiệu ở mỗi lần gõ phím.
+    """
+
+    def __init__(self, db):
+        signals = sorted(((sig.name, sig.unit or "") for msg in db.messages for sig in msg.signals),
+                         key=lambda item: item[0])
+        self.names = [name for name, _ in signals]
+        self.units = [unit for _, unit in signals]
+        self._lower_names = [name.lower() for name in self.names]
+        self.rows = {} # tên -> [hàng] (tín hiệu cùng tên trong nhiều message)
+        for row, name in enumerate(self.names):
+            self.rows.setdefault(name, []).append(row)
+
+    def __len__(self):
+        return len(self.names)
+
+    def filter_rows(self, text, rows=None):
+        """Các hàng có tên chứa text (không phân biệt hoa thường), chỉ xét rows nếu có."""
+        needle = text.strip().lower()
+        if rows is None:
+            rows = range(len(self.names))
+        if not needle:
+            return list(rows)
+        lower_names = self._lower_names
+        return [row for row in rows if needle in lower_names[row]]
+
+
+def load_dbc(file_path, progress=None, encodings=DBC_ENCODINGS):
+    """Đọc file DBC bằng cantools, thử lần lượt các encoding.
+
+    progress(message) được gọi khi đọc thành công. Trả về cantools Database.
+    """
+    cantools = load_module("cantools") # Nạp ở lần tải DBC đầu tiên
+    for encoding in encodings:
+        try:
+            db = cantools.database.load_file(file_path, strict=False, encoding=encoding)
+        except UnicodeDecodeError:
+            continue # Thử encoding tiếp theo
+        except Exception as e: # Lỗi khác từ cantools.load_file
+            if "encoding" not in str(e).lower():
+                raise
+            continue # Thử encoding tiếp theo nếu liên quan đến encoding
+        if progress is not None:
+            progress(f"Đọc DBC thành công với encoding '{encoding}'.")
+        return db
+    raise ValueError(f"Không thể đọc file DBC bằng các encoding đã thử: {', '.join(encodings)}")
@@ -0,0 +1,536 @@
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+
+try:
+    import can
+except ImportError:
+    can = None # Chỉ cần cho định dạng BLF
+
+# Nén zstd (tùy chọn): module chuẩn compression.zstd (Python 3.14+) hoặc gói 'zstandard'
+try:
+    from compression import zstd as _zstd_std
+except ImportError:
+    _zstd_std = None
+try:
+    import zstandard as _zstandard
+except ImportError:
+    _zstandard = None
+
+from trace_buffer import FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR, FLAG_FD
+
+# --- Ghi log frame CAN (không phụ thuộc Qt) ---
+# LogFileWriter ghi cả một batch can.Message mỗi lần (group commit): CSV được
+# định dạng thành một chuỗi rồi ghi một lần, BLF đi qua can.BLFWriter.
+# Việc flush xuống đĩa theo ngưỡng byte hoặc thời gian, không theo từng batch.
+
+LOG_FORMAT_CSV = "csv"
+LOG_FORMAT_BLF = "blf" # Vector BLF nhị phân, nén bằng can.BLFWriter
+BLF_COMPRESSION_LEVEL = 1 # zlib mức 1: nhỏ hơn CSV ~5 lần, ít CPU nhất khi bus đầy tải
+
+FLUSH_BYTES = 1024 * 1024 # Flush khi đã ghi chừng này byte kể từ lần flush trước
+FLUSH_INTERVAL_S = 1.0    # ... hoặc khi đã quá chừng này giây
+
+# Dòng kết thúc bằng \r\n như csv.writer trước đây
+CSV_HEADER = "Timestamp,ID_Hex,DLC,Data_Hex,IsExtended,IsRemote,IsError\r\n"
+
+
+def log_format_for_path(file_path):
+    """Định dạng log theo phần mở rộng file."""
+    return LOG_FORMAT_BLF if file_path.lower().endswith(".blf") else LOG_FORMAT_CSV
+
+
+def format_csv_rows(msgs):
+    """Định dạng một batch can.Message thành các dòng CSV (một chuỗi)."""
+    return "".join(
+        f"{msg.timestamp:.6f},{msg.arbitration_id:X},{msg.dlc},{msg.data.hex().upper()},"
+        f"{msg.is_extended_id},{msg.is_remote_frame},{msg.is_error_frame}\r\n"
+        for msg in msgs)
+
+
+def messages_from_store(store):
+    """Chuyển một TraceStore (trace_buffer) thành danh sách can.Message để ghi log."""
+    messages = []
+    for row in range(len(store)):
+        timestamp, frame_id, dlc, flags, data = store.frame(row)
+        is_remote = bool(flags & FLAG_REMOTE)
+        messages.append(can.Message(timestamp=timestamp, arbitration_id=frame_id,
+                                    is_extended_id=bool(flags & FLAG_EXTENDED), is_remote_frame=is_remote,
+                                    is_error_frame=bool(flags & FLAG_ERROR), is_fd=bool(flags & FLAG_FD),
+                                    dlc=dlc if is_remote else None, data=None if is_remote else data,
+                                    check=False))
+    return messages
+
+
+class LogFileWriter:
+    """Ghi frame vào một file log CSV/BLF với chính sách flush theo byte/thời gian.
+
+    flush_bytes / flush_interval: ngưỡng flush (None = bỏ qua tiêu chí đó).
+    """
+
+    def __init__(self, file_path, log_format=None, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S):
+        self.file_path = file_path
+        self.log_format = log_format or log_format_for_path(file_path)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.message_count = 0
+        self._csv_bytes = 0
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
+        if self.log_format == LOG_FORMAT_BLF:
+            if can is None:
+                raise RuntimeError("Ghi log BLF cần thư viện 'python-can'")
+            # BLF: frame ghi nhị phân, writer tự gom và nén theo container
+            self._writer = can.BLFWriter(file_path, compression_level=BLF_COMPRESSION_LEVEL)
+            self._file = self._writer.file
+        else:
+            self._writer = None
+            self._file = open(file_path, 'w', newline='', encoding='utf-8')
+            self._csv_bytes = self._file.write(CSV_HEADER)
+
+    def write(self, msgs):
+        """Ghi một batch can.Message."""
+        if not msgs:
+            return
+        if self._writer is not None:
+            for msg in msgs:
+                self._writer.on_message_received(msg)
+        else:
+            written = self._file.write(format_csv_rows(msgs))
+            self._csv_bytes += written
+            self._unflushed_bytes += written
+        self.message_count += len(msgs)
+        self.maybe_flush()
+
+    @property
+    def size(self):
+        """Số byte đã ghi vào file (BLF: phần đã nén ra đĩa)."""
+        return self._file.tell() if self._writer is not None else self._csv_bytes
+
+    def flush_due(self, now=None):
+        if self.flush_bytes is not None and self._unflushed_bytes >= self.flush_bytes:
+            return True
+        if self.flush_interval is not None:
+            now = time.monotonic() if now is None else now
+            return now - self._last_flush >= self.flush_interval
+        return False
+
+    def maybe_flush(self, now=None):
+        if self.flush_due(now):
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.stop() # Ghi container cuối + header, đóng file
+        elif not self._file.closed:
+            self._file.close()
+
+
+# --- Tách file log (rotation) và nén file đã đóng ---
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_SUFFIXES = {COMPRESSION_GZIP: ".gz", COMPRESSION_ZSTD: ".zst"}
+
+
+def available_compressions():
+    """Các kiểu nén dùng được trong môi trường hiện tại."""
+    methods = [COMPRESSION_GZIP]
+    if _zstd_std is not None or _zstandard is not None:
+        methods.append(COMPRESSION_ZSTD)
+    return methods
+
+
+def compress_file(path, method):
+    """Nén path thành path + .gz/.zst rồi xóa file gốc. Trả về đường dẫn mới."""
+    target = path + COMPRESSION_SUFFIXES[method]
+    temp_target = target + ".tmp"
+    with open(path, 'rb') as source:
+        if method == COMPRESSION_GZIP:
+            with gzip.open(temp_target, 'wb', compresslevel=6) as dest:
+                shutil.copyfileobj(source, dest, 1024 * 1024)
+        elif _zstd_std is not None:
+            with _zstd_std.open(temp_target, 'wb') as dest:
+                shutil.copyfileobj(source, dest, 1024 * 1024)
+        elif _zstandard is not None:
+            with open(temp_target, 'wb') as dest:
+                _zstandard.ZstdCompressor().copy_stream(source, dest)
+        else:
+            raise RuntimeError("Nén zstd cần Python 3.14+ hoặc gói 'zstandard'")
+    os.replace(temp_target, target)
+    os.remove(path)
+    return target
+
+
+class SegmentCompressor:
+    """Nén các file log đã đóng trên một thread nền (thread ghi không phải chờ)."""
+
+    def __init__(self, method, on_error=None):
+        if method not in available_compressions():
+            raise ValueError(f"Kiểu nén không hỗ trợ: {method}")
+        self.method = method
+        self.on_error = on_error # on_error(message), gọi từ thread nén
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path):
+        self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            try:
+                compress_file(path, self.method)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(f"Lỗi nén {os.path.basename(path)}: {e}")
+
+    def close(self):
+        """Chờ nén xong các file còn trong hàng đợi."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def segment_path(file_path, index):
+    """log.csv -> log_0001.csv, log_0002.csv, ..."""
+    base, extension = os.path.splitext(file_path)
+    return f"{base}_{index:04d}{extension}"
+
+
+class RotatingLogWriter:
+    """Ghi log thành nhiều file nối tiếp, tách theo dung lượng và/hoặc thời gian.
+
+    rotate_bytes / rotate_interval: ngưỡng tách (None = bỏ qua tiêu chí đó).
+    compression: None, "gzip" hoặc "zstd"; file CSV đã đóng được nén ở thread
+    nền (BLF vốn đã nén nên giữ nguyên).
+    Cùng giao diện với LogFileWriter (write, maybe_flush, flush, close).
+    """
+
+    def __init__(self, file_path, log_format=None, rotate_bytes=None, rotate_interval=None,
+                 compression=None, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S,
+                 on_error=None):
+        self.file_path = file_path
+        self.log_format = log_format or log_format_for_path(file_path)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.segment_paths = []
+        self._closed_count = 0 # Số frame trong các file đã đóng
+        self._compressor = None
+        if compression and self.log_format != LOG_FORMAT_BLF:
+            self._compressor = SegmentCompressor(compression, on_error)
+        self._segment = None # File hiện tại; mở khi có frame đầu tiên sau mỗi lần tách
+        self._segment_start = 0.0
+        self._open_segment()
+
+    @property
+    def message_count(self):
+        return self._closed_count + (self._segment.message_count if self._segment is not None else 0)
+
+    def _open_segment(self):
+        if self.rotate_bytes is None and self.rotate_interval is None:
+            path = self.file_path # Chỉ nén, không tách: một file duy nhất, giữ tên người dùng chọn
+        else:
+            path = segment_path(self.file_path, len(self.segment_paths) + 1)
+        self._segment = LogFileWriter(path, self.log_format, self.flush_bytes, self.flush_interval)
+        self._segment_start = time.monotonic()
+        self.segment_paths.append(path)
+
+    def rotation_due(self, now=None):
+        if self._segment is None or self._segment.message_count == 0:
+            return False # Không tạo file rỗng
+        if self.rotate_bytes is not None and self._segment.size >= self.rotate_bytes:
+            return True
+        if self.rotate_interval is not None:
+            now = time.monotonic() if now is None else now
+            return now - self._segment_start >= self.rotate_interval
+        return False
+
+    def rotate(self):
+        """Đóng file hiện tại (đưa đi nén nếu cần); file kế tiếp mở khi có frame mới."""
+        if self._segment is None:
+            return
+        segment, self._segment = self._segment, None
+        self._closed_count += segment.message_count
+        segment.close()
+        if self._compressor is not None:
+            self._compressor.submit(segment.file_path)
+
+    def write(self, msgs):
+        if not msgs:
+            return
+        if self.rotation_due():
+            self.rotate()
+        if self._segment is None:
+            self._open_segment()
+        self._segment.write(msgs)
+
+    def maybe_flush(self, now=None):
+        # Gọi định kỳ cả khi không có frame: tách file đúng hạn theo thời gian
+        if self.rotation_due(now):
+            self.rotate()
+        elif self._segment is not None:
+            self._segment.maybe_flush(now)
+
+    def flush(self):
+        if self._segment is not None:
+            self._segment.flush()
+
+    def close(self):
+        self.rotate()
+        if self._compressor is not None:
+            self._compressor.close()
+
+
+def open_log_writer(file_path, log_format=None, rotate_bytes=None, rotate_interval=None,
+                    compression=None, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S,
+                    on_error=None):
+    """Tạo LogFileWriter, hoặc RotatingLogWriter khi có ngưỡng tách file / nén."""
+    if rotate_bytes or rotate_interval or compression:
+        return RotatingLogWriter(file_path, log_format, rotate_bytes or None, rotate_interval or None,
+                                 compression, flush_bytes, flush_interval, on_error)
+    return LogFileWriter(file_path, log_format, flush_bytes, flush_interval)
+
+
+# --- Ghi log theo trigger ---
+# Khi chờ trigger, các frame của pre_trigger giây gần nhất được giữ trong một
+# deque (theo timestamp frame). Khi trigger xảy ra, lịch sử đó được ghi ra một
+# file mới rồi tiếp tục ghi cho tới khi gặp điều kiện dừng hoặc hết cửa sổ
+# post_trigger giây kể từ lần trigger cuối. Mỗi lần bắt được ghi ra một file
+# riêng (log_0001.csv, log_0002.csv, ...).
+
+TRIGGER_ID = "id"         # Frame ID xuất hiện
+TRIGGER_SIGNAL = "signal" # Tín hiệu giải mã vượt ngưỡng
+TRIGGER_ERROR = "error"   # Error frame
+
+
+class LogTrigger:
+    """Điều kiện trigger trên luồng frame.
+
+    kind: TRIGGER_ID (frame_id), TRIGGER_SIGNAL (signal_name, threshold,
+    rising: True = cắt lên qua ngưỡng, False = cắt xuống) hoặc TRIGGER_ERROR.
+    """
+
+    def __init__(self, kind, frame_id=None, signal_name=None, threshold=0.0, rising=True):
+        if kind not in (TRIGGER_ID, TRIGGER_SIGNAL, TRIGGER_ERROR):
+            raise ValueError(f"Kiểu trigger không hợp lệ: {kind}")
+        if kind == TRIGGER_ID and frame_id is None:
+            raise ValueError("Trigger theo ID cần frame_id")
+        if kind == TRIGGER_SIGNAL and not signal_name:
+            raise ValueError("Trigger theo tín hiệu cần tên tín hiệu")
+        self.kind = kind
+        self.frame_id = frame_id
+        self.signal_name = signal_name
+        self.threshold = threshold
+        self.rising = rising
+        self._signal_frame_ids = frozenset()
+        self._decoder_table = None
+        self._last_value = None
+
+    def bind(self, decoder_table):
+        """Gắn bảng giải mã (cần cho trigger theo tín hiệu)."""
+        self._decoder_table = decoder_table
+        self.reset()
+        if self.kind == TRIGGER_SIGNAL:
+            if decoder_table is None:
+                raise ValueError("Trigger theo tín hiệu cần DBC đã tải")
+            self._signal_frame_ids = frozenset(decoder_table.frame_ids_for_signal(self.signal_name))
+            if not self._signal_frame_ids:
+                raise ValueError(f"Không tìm thấy tín hiệu '{self.signal_name}' trong DBC")
+
+    def reset(self):
+        """Quên giá trị trước của tín hiệu (khi trigger được bật lại sau thời gian không xét frame)."""
+        self._last_value = None
+
+    def matches(self, msg):
+        """Frame msg có thỏa điều kiện không (trigger tín hiệu: có cắt qua ngưỡng không)."""
+        if self.kind == TRIGGER_ERROR:
+            return msg.is_error_frame
+        if msg.is_error_frame:
+            return False
+        if self.kind == TRIGGER_ID:
+            return msg.arbitration_id == self.frame_id
+        if msg.arbitration_id not in self._signal_frame_ids or msg.is_remote_frame:
+            return False
+        try:
+            value = float(self._decoder_table.decode(msg.arbitration_id, bytes(msg.data))[self.signal_name])
+        except Exception:
+            return False # Không giải mã được / tín hiệu không có trong frame (mux)
+        previous, self._last_value = self._last_value, value
+        if previous is None:
+            return False
+        if self.rising:
+            return previous < self.threshold <= value
+        return previous > self.threshold >= value
+
+    def find(self, msgs, start=0):
+        """Vị trí frame đầu tiên (từ start) thỏa điều kiện, hoặc None."""
+        for index in range(start, len(msgs)):
+            if self.matches(msgs[index]):
+                return index
+        return None
+
+    def describe(self):
+        if self.kind == TRIGGER_ERROR:
+            return "Error frame"
+        if self.kind == TRIGGER_ID:
+            return f"ID 0x{self.frame_id:X}"
+        return f"{self.signal_name} {'↑' if self.rising else '↓'} {self.threshold:g}"
+
+
+class TriggeredLogWriter:
+    """Ghi log theo trigger với bộ đệm pre-trigger.
+
+    pre_trigger / post_trigger: giây (theo timestamp frame). post_trigger None
+    hoặc 0 = ghi tới khi gặp stop_trigger. on_capture(message) báo trạng thái.
+    Cùng giao diện với LogFileWriter (write, maybe_flush, flush, close).
+    """
+
+    def __init__(self, file_path, start_trigger, stop_trigger=None, pre_trigger=5.0, post_trigger=10.0,
+                 decoder_table=None, log_format=None, compression=None,
+                 flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL_S, on_capture=None, on_error=None):
+        if stop_trigger is None and not post_trigger:
+            raise ValueError("Cần điều kiện dừng hoặc cửa sổ post-trigger")
+        self.file_path = file_path
+        self.log_format = log_format or log_format_for_path(file_path)
+        self.start_trigger = start_trigger
+        self.stop_trigger = stop_trigger
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger or None
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.on_capture = on_capture
+        self.capture_paths = []
+        start_trigger.bind(decoder_table)
+        if stop_trigger is not None:
+            stop_trigger.bind(decoder_table)
+        self._compressor = None
+        if compression and self.log_format != LOG_FORMAT_BLF:
+            self._compressor = SegmentCompressor(compression, on_error)
+        self._history = deque() # Frame chờ trigger (pre-trigger)
+        self._capture = None    # LogFileWriter khi đang ghi
+        self._capture_end = None # Timestamp frame kết thúc cửa sổ post-trigger
+        self._last_trigger_time = 0.0 # time.monotonic() của lần trigger cuối
+        self._closed_count = 0
+
+    @property
+    def message_count(self):
+        return self._closed_count + (self._capture.message_count if self._capture is not None else 0)
+
+    @property
+    def capturing(self):
+        return self._capture is not None
+
+    def _notify(self, message):
+        if self.on_capture is not None:
+            self.on_capture(message)
+
+    def _start_capture(self, msgs, trigger_index):
+        path = segment_path(self.file_path, len(self.capture_paths) + 1)
+        self._capture = LogFileWriter(path, self.log_format, self.flush_bytes, self.flush_interval)
+        self.capture_paths.append(path)
+        trigger_msg = msgs[trigger_index]
+        # Lịch sử pre-trigger + các frame trong batch trước frame trigger
+        oldest_kept = trigger_msg.timestamp - self.pre_trigger
+        self._history.extend(msgs[:trigger_index])
+        history = [msg for msg in self._history if msg.timestamp >= oldest_kept]
+        self._history.clear()
+        if history:
+            self._capture.write(history)
+        if self.stop_trigger is not None:
+            self.stop_trigger.reset() # Không xét frame trong lúc chờ trigger: giá trị cũ đã lỗi thời
+        self._retrigger(trigger_msg)
+        self._notify(f"Trigger ({self.start_trigger.describe()}) -> {os.path.basename(path)}")
+
+    def _retrigger(self, trigger_msg):
+        self._last_trigger_time = time.monotonic()
+        if self.post_trigger is not None:
+            self._capture_end = trigger_msg.timestamp + self.post_trigger
+
+    def _end_capture(self):
+        capture, self._capture = self._capture, None
+        self._capture_end = None
+        self.start_trigger.reset() # Chỉ có stop_trigger: start_trigger không xét frame trong lúc ghi
+        self._closed_count += capture.message_count
+        capture.close()
+        if self._compressor is not None:
+            self._compressor.submit(capture.file_path)
+        self._notify(f"Kết thúc ghi {os.path.basename(capture.file_path)} ({capture.message_count} frames), chờ trigger...")
+
+    def write(self, msgs):
+        position = 0
+        while position < len(msgs):
+            if self._capture is None:
+                trigger_index = self.start_trigger.find(msgs, position)
+                if trigger_index is None:
+                    self._remember(msgs[position:])
+                    return
+                self._start_capture(msgs[position:], trigger_index - position)
+                position = self._write_capturing(msgs, trigger_index, trigger_at_start=True)
+            else:
+                position = self._write_capturing(msgs, position)
+
+    def _write_capturing(self, msgs, position, trigger_at_start=False):
+        """Ghi từ position tới khi hết batch hoặc hết lần bắt. Trả về vị trí tiếp theo."""
+        end = len(msgs)
+        stop_index = self.stop_trigger.find(msgs, position) if self.stop_trigger is not None else None
+        if stop_index is not None:
+            end = stop_index + 1 # Frame dừng được ghi vào file
+        if self._capture_end is not None:
+            # Trigger lặp lại trong cửa sổ sẽ kéo dài cửa sổ
+            index = position
+            while index < end:
+                msg = msgs[index]
+                if msg.timestamp > self._capture_end:
+                    end, stop_index = index, index
+                    break
+                if (index > position or not trigger_at_start) and self.start_trigger.matches(msg):
+                    self._retrigger(msg)
+                index += 1
+        self._capture.write(msgs[position:end])
+        if stop_index is not None:
+            self._end_capture()
+        return end
+
+    def _remember(self, msgs):
+        history = self._history
+        history.extend(msgs)
+        if not history:
+            return
+        oldest_kept = history[-1].timestamp - self.pre_trigger
+        while history and history[0].timestamp < oldest_kept:
+            history.popleft()
+
+    def maybe_flush(self, now=None):
+        if self._capture is None:
+            return
+        # Bus im lặng: kết thúc khi hết cửa sổ post-trigger theo đồng hồ
+        now = time.monotonic() if now is None else now
+        if self.post_trigger is not None and now - self._last_trigger_time >= self.post_trigger + 1.0:
+            self._end_capture()
+        else:
+            self._capture.maybe_flush(now)
+
+    def flush(self):
+        if self._capture is not None:
+            self._capture.flush()
+
+    def close(self):
+        if self._capture is not None:
+            self._end_capture()
+        self._history.clear()
+        if self._compressor is not None:
+            self._compressor.close()
@@ -0,0 +1,90 @@
+import uuid
+
+from can_decoder import DecoderTable, SignalIndex
+
+# --- Mô hình dữ liệu mạng CAN (không phụ thuộc Qt) ---
+# Mỗi mạng là một dict (networks_data[network_id]) chứa cấu hình và dữ liệu
+# đã tải: DBC, trace, log, chẩn đoán. Các trường chung được khởi tạo ở đây; giao
+# diện bổ sung các trường riêng (phần cứng, luồng, widget) qua tham số extra.
+# Các hàm set_* cập nhật các trường phụ thuộc nhau cùng một lúc.
+
+
+def network_defaults():
+    """Các trường chung của một mạng (DBC / trace / log / chẩn đoán)."""
+    return {
+        # DBC / Trace
+        "dbc_path": None,
+        "db": None,            # cantools Database
+        "decoder_table": None, # DecoderTable biên dịch từ db
+        "signal_index": None,  # SignalIndex (danh sách tín hiệu đã sắp xếp) cho bảng tín hiệu
+        "trace_path": None,
+        "trace_data": None,    # TraceStore (cột NumPy) khi đã tải file
+        "signal_time_series": {},
+        "signal_lod": {},      # {tên: MinMaxPyramid} cho đồ thị (tạo nền sau khi tải trace / khi live)
+        "latest_signal_values": {},
+        # Log
+        "log_path": None,
+        "is_logging": False,
+        "logging_worker": None,
+        # Chẩn đoán
+        "diag_file_path": None,
+        "odx_database": None,            # odxtools database
+        "selected_ecu_diag_layer": None, # odxtools DiagLayer đang chọn
+        "diag_worker": None,
+    }
+
+
+def new_network(name, extra=None, network_id=None):
+    """Tạo một mạng mới. Trả về (network_id, dict dữ liệu mạng)."""
+    network_id = network_id or str(uuid.uuid4())
+    network = {"id": network_id, "name": name}
+    network.update(network_defaults())
+    if extra:
+        network.update(extra)
+    return network_id, network
+
+
+def latest_values_from_timeseries(signal_timeseries):
+    """{tên: (giá trị cuối, timestamp cuối)} từ các chuỗi thời gian đã sắp xếp."""
+    latest_values = {}
+    for sig_name, (timestamps, values) in signal_timeseries.items():
+        if len(timestamps) > 0 and len(values) > 0:
+            latest_values[sig_name] = (float(values[-1]), float(timestamps[-1]))
+    return latest_values
+
+
+def set_dbc(network, db, dbc_path):
+    """Gắn DBC đã tải (biên dịch DecoderTable / SignalIndex một lần) hoặc gỡ DBC nếu db là None."""
+    network["db"] = db
+    network["dbc_path"] = dbc_path if db is not None else None
+    network["decoder_table"] = DecoderTable(db) if db is not None else None
+    network["signal_index"] = SignalIndex(db) if db is not None else None
+    # Giá trị giải mã theo DBC cũ không còn đúng
+    network["signal_time_series"] = {}
+    network["signal_lod"] = {}
+    network["latest_signal_values"] = {}
+    return network["decoder_table"]
+
+
+def set_trace(network, trace_data, trace_path, signal_timeseries):
+    """Gắn trace đã tải và các chuỗi tín hiệu giải mã từ trace."""
+    network["trace_data"] = trace_data
+    network["trace_path"] = trace_path
+    network["signal_time_series"] = signal_timeseries
+    network["signal_lod"] = {} # Kim tự tháp của chuỗi mới được tạo sau (set_signal_lod)
+    network["latest_signal_values"] = latest_values_from_timeseries(signal_timeseries)
+
+
+def clear_trace(network):
+    set_trace(network, None, None, {})
+
+
+def set_signal_lod(network, signal_timeseries, pyramids):
+    """Gắn kim tự tháp LOD đã tạo từ signal_timeseries.
+
+    Bỏ qua (trả về False) nếu mạng đã tải chuỗi khác trong lúc tạo.
+    """
+    if network.get("signal_time_series") is not signal_timeseries:
+        return False
+    network["signal_lod"] = pyramids
+    return True
@@ -0,0 +1,201 @@
+from module_loader import load_module
+
+# --- Client chẩn đoán UDS qua ISO-TP (không phụ thuộc Qt) ---
+# Yêu cầu được mã hóa theo định nghĩa dịch vụ trong ODX (odxtools), gửi/nhận
+# qua isotp.CanStack trên bus python-can đã kết nối, phản hồi được giải mã lại
+# bằng odxtools. DiagnosticWorker trong giao diện chỉ chạy
+# DiagnosticSession.execute() trong luồng riêng và chuyển kết quả thành tín hiệu Qt.
+# odxtools được nạp ở lần tải PDX/ODX đầu tiên, isotp ở yêu cầu đầu tiên.
+
+DEFAULT_TX_ID = 0x7E0 # ID request vật lý dự phòng khi ODX không định nghĩa
+DEFAULT_RX_ID = 0x7E8 # ID response vật lý dự phòng
+RESPONSE_TIMEOUT_S = 5.0
+FC_STMIN = 5  # Flow control: STmin (ms)
+FC_BLOCKSIZE = 10
+
+# Tên dịch vụ UDS thường gặp cho từng loại yêu cầu (khi short_name không khớp loại)
+SERVICE_MAPPING = {
+    'read_did': 'ReadDataByIdentifier',
+    'read_dtc': 'ReadDTCInformation',
+    'clear_dtc': 'ClearDiagnosticInformation',
+    'ecu_reset': 'ECUReset',
+    'security_access': 'SecurityAccess',
+    'write_did': 'WriteDataByIdentifier',
+}
+
+# Loại yêu cầu -> khóa trong request_details của tham số request đầu tiên
+_FIRST_PARAM_KEYS = {
+    'read_did': 'did',
+    'read_dtc': 'subfunction',
+    'clear_dtc': 'group',
+    'ecu_reset': 'subfunction',
+}
+
+
+def _require(package):
+    try:
+        return load_module(package)
+    except ImportError:
+        raise RuntimeError(f"Thư viện '{package}' chưa được cài đặt (pip install {package})")
+
+
+def load_diag_file(file_path):
+    """Đọc file PDX hoặc ODX. Trả về odxtools Database."""
+    odxtools = _require("odxtools")
+    lower_path = file_path.lower()
+    if lower_path.endswith(".pdx"):
+        return odxtools.load_pdx_file(file_path)
+    if lower_path.endswith((".odx", ".odx-d")): # Basic ODX file types
+        return odxtools.load_odx_file(file_path)
+    # Thêm hỗ trợ CDD nếu có thư viện (hiện tại không có thư viện chuẩn)
+    raise ValueError("Loại file không được hỗ trợ. Vui lòng chọn file .pdx hoặc .odx/.odx-d.")
+
+
+def resolve_diag_ids(ecu, status):
+    """ID request/response của ECU từ ODX, dùng ID dự phòng nếu không tìm thấy."""
+    # !!! PLACEHOLDER - Needs real ODX parsing logic !!!
+    try:
+        # get_can_receive_id/get_can_send_id có thể không hoạt động với mọi file ODX
+        tx_id = ecu.get_can_receive_id() # ECU receives requests on this ID
+        rx_id = ecu.get_can_send_id()    # ECU sends responses from this ID
+        if tx_id is None or rx_id is None:
+            status("Cảnh báo: Không tìm thấy ID req/resp trực tiếp, thử tìm trong CommParams...")
+            # Add more sophisticated logic here to parse ecu.communication_parameters
+            # --- Fallback / Hardcode (Remove in production) ---
+            if tx_id is None: tx_id = DEFAULT_TX_ID
+            if rx_id is None: rx_id = DEFAULT_RX_ID
+            status(f"Cảnh báo: Sử dụng ID chẩn đoán mặc định/dự phòng ({tx_id:X}/{rx_id:X}). Nên định nghĩa rõ trong ODX.")
+        else:
+            status(f"Sử dụng ID từ ODX: Tx={tx_id:X}, Rx={rx_id:X}")
+    except Exception as e:
+        status(f"Lỗi khi lấy ID từ ODX: {e}. Sử dụng dự phòng.")
+        tx_id, rx_id = DEFAULT_TX_ID, DEFAULT_RX_ID
+    return tx_id, rx_id
+
+
+def find_service(ecu, req_type):
+    """Dịch vụ ODX cho loại yêu cầu (theo short_name, sau đó theo tên UDS)."""
+    service = ecu.services.get(req_type)
+    if not service and req_type in SERVICE_MAPPING:
+        service = ecu.services.get(SERVICE_MAPPING[req_type])
+    if not service:
+        raise ValueError(f"Dịch vụ tương ứng với loại '{req_type}' không được định nghĩa trong ODX cho ECU này.")
+    return service
+
+
+def encode_request(ecu, request_details):
+    """Mã hóa yêu cầu theo ODX. Trả về (service, raw_request bytes)."""
+    req_type = request_details['type']
+    service = find_service(ecu, req_type)
+    service_name = service.short_name
+    if req_type not in _FIRST_PARAM_KEYS:
+        # Security Access, Write DID... cần xử lý tham số phức tạp hơn / nhiều bước
+        raise NotImplementedError(f"Mã hóa cho loại yêu cầu '{req_type}' chưa được triển khai.")
+
+    # !!! Tên tham số PHẢI khớp định nghĩa request của dịch vụ trong ODX !!!
+    # Giả định tham số đầu tiên là identifier / subfunction (cần kiểm tra ODX)
+    if not service.request or not service.request.parameters:
+        raise ValueError(f"Service {service_name} không có tham số request được định nghĩa trong ODX.")
+    parameters = service.request.parameters
+    params = {parameters[0].short_name: request_details[_FIRST_PARAM_KEYS[req_type]]}
+    if req_type == 'read_dtc' and len(parameters) > 1 and 'mask' in request_details:
+        params[parameters[1].short_name] = request_details['mask'] # DTCStatusMask (tùy chọn)
+
+    raw_request = service.encode_request(**params)
+    if not raw_request:
+        raise ValueError(f"Không thể mã hóa yêu cầu {service_name} (kiểm tra định nghĩa ODX và tham số: {params}).")
+    return service, raw_request
+
+
+def _nrc_description(ecu, nrc):
+    nrc_obj = ecu.negative_responses.get(nrc)
+    return nrc_obj.short_name if nrc_obj else f"Unknown NRC (0x{nrc:02X})"
+
+
+def decode_response(ecu, raw_request, raw_response, status):
+    """Giải mã phản hồi bằng odxtools. Trả về (success, result_data dict)."""
+    status("Giải mã phản hồi...")
+    decoded_response = ecu.decode(raw_response)
+    if decoded_response is None:
+        # Giải mã thất bại nhưng vẫn có thể là phản hồi âm hợp lệ
+        if not raw_response:
+            raise ValueError("Không thể giải mã phản hồi rỗng.")
+        resp_sid = raw_response[0]
+        if resp_sid != 0x7F: # Positive response SID but decode failed
+            raise ValueError(f"Không thể giải mã phản hồi dương hợp lệ (SID: 0x{resp_sid:02X}). Kiểm tra định nghĩa ODX.")
+        nrc = raw_response[2] if len(raw_response) > 2 else 0xFF
+        nrc_desc = _nrc_description(ecu, nrc)
+        status(f"NRC 0x{nrc:02X}: {nrc_desc}")
+        return False, {
+            'service_name': f"Unknown Service (Req SID: 0x{raw_request[0]:02X})" if raw_request else "Unknown",
+            'response_type': 'Negative',
+            'parameters': {},
+            'nrc': {'code': nrc, 'description': nrc_desc},
+        }
+
+    result_data = {
+        'service_name': decoded_response.service.short_name if decoded_response.service else "Unknown",
+        'response_type': 'Positive' if decoded_response.positive else 'Negative',
+        'parameters': {},
+        'nrc': None,
+    }
+    if decoded_response.positive:
+        for param_name, param_value in decoded_response.parameters.items():
+            result_data['parameters'][param_name] = param_value # odxtools provides computed value
+        return True, result_data
+    nrc_val = decoded_response.parameters.get('ResponseCode', raw_response[2] if len(raw_response) > 2 else 0xFF)
+    nrc_desc = _nrc_description(ecu, nrc_val)
+    result_data['nrc'] = {'code': nrc_val, 'description': nrc_desc}
+    status(f"NRC 0x{nrc_val:02X}: {nrc_desc}")
+    return False, result_data
+
+
+class DiagnosticSession:
+    """Một yêu cầu chẩn đoán trên bus đã kết nối.
+
+    raw_request / raw_response giữ các byte đã gửi/nhận kể cả khi execute() ném lỗi.
+    status(message) nhận thông báo tiến trình và lỗi ISO-TP.
+    """
+
+    def __init__(self, can_bus, ecu, status=None, timeout=RESPONSE_TIMEOUT_S):
+        self.can_bus = can_bus
+        self.ecu = ecu
+        self.status = status or (lambda message: None)
+        self.timeout = timeout
+        self.raw_request = b''
+        self.raw_response = b''
+
+    def _isotp_error(self, error):
+        self.status(f"Lỗi ISO-TP: {error}")
+
+    def execute(self, request_details):
+        """Mã hóa, gửi, chờ và giải mã một yêu cầu. Trả về (success, result_data)."""
+        isotp = _require("isotp")
+        if not self.ecu or not isinstance(self.ecu, _require("odxtools").DiagLayer):
+            raise ValueError("Chưa chọn ECU hợp lệ từ file ODX/PDX.")
+        if self.can_bus is None:
+            raise ConnectionError("Mạng CAN chưa được kết nối (bus không tồn tại).")
+
+        tx_id, rx_id = resolve_diag_ids(self.ecu, self.status)
+        self.status(f"Chuẩn bị yêu cầu: {request_details['type']}...")
+        service, self.raw_request = encode_request(self.ecu, request_details)
+        self.status(f"Đã mã hóa yêu cầu {service.short_name}: {self.raw_request.hex()}")
+
+        addr = isotp.Address(isotp.AddressingMode.Normal_11bit, txid=tx_id, rxid=rx_id)
+        isotp_stack = isotp.CanStack(bus=self.can_bus, address=addr, error_handler=self._isotp_error)
+        isotp_stack.set_fc_opts(stmin=FC_STMIN, bs=FC_BLOCKSIZE)
+        try:
+            self.status(f"Gửi yêu cầu đến ID 0x{tx_id:X}...")
+            isotp_stack.send(self.raw_request)
+            self.status(f"Đang chờ phản hồi từ ID 0x{rx_id:X}...")
+            raw_response = isotp_stack.recv(timeout=self.timeout)
+        finally:
+            try:
+                isotp_stack.stop()
+            except Exception as cleanup_e:
+                print(f"Lỗi khi dừng isotp stack: {cleanup_e}")
+        if raw_response is None:
+            raise TimeoutError(f"Không nhận được phản hồi chẩn đoán trong {self.timeout} giây.")
+        self.raw_response = raw_response
+        self.status(f"Đã nhận phản hồi: {raw_response.hex()}")
+        return decode_response(self.ecu, self.raw_request, raw_response, self.status)
@@ -0,0 +1,47 @@
+# --- Giải mã batch frame live (không phụ thuộc Qt) ---
+# LiveDecodeWorker trong giao diện nhận các batch can.Message từ luồng nghe
+# bus và gọi decode_live_batch() cho mỗi batch; kết quả (DecodedBatch) được
+# gửi nguyên khối về luồng giao diện.
+
+
+class DecodedBatch:
+    """Kết quả giải mã của một batch frame live."""
+    __slots__ = ('msgs', 'series', 'latest')
+
+    def __init__(self, msgs):
+        self.msgs = msgs      # [can.Message, ...] theo thứ tự nhận
+        self.series = {}      # {sig_name: ([timestamps], [values])} - chỉ giá trị số, cho đồ thị
+        self.latest = {}      # {sig_name: (value, timestamp)} - giá trị cuối cùng trong batch
+
+
+def decode_live_batch(msgs, decoder_table):
+    """Giải mã một batch can.Message bằng DecoderTable (None: không giải mã)."""
+    batch = DecodedBatch(msgs)
+    series = batch.series
+    latest = batch.latest
+    if decoder_table is None:
+        return batch
+    for msg in msgs:
+        if msg.is_error_frame or msg.is_remote_frame or not msg.data:
+            continue
+        decoder = decoder_table.get(msg.arbitration_id)
+        if decoder is None:
+            continue # ID không có trong DBC
+        # Sử dụng try-except vì decode có thể fail (message multiplexed với data lỗi...)
+        try:
+            decoded_signals = decoder.decode(bytes(msg.data))
+        except Exception:
+            continue
+
+        timestamp = msg.timestamp
+        for sig_name, sig_value in decoded_signals.items():
+            latest[sig_name] = (sig_value, timestamp)
+            try:
+                val_float = float(sig_value) # Graph needs numeric values
+            except (ValueError, TypeError):
+                continue
+            if sig_name not in series:
+                series[sig_name] = ([], [])
+            series[sig_name][0].append(timestamp)
+            series[sig_name][1].append(val_float)
+    return batch
@@ -0,0 +1,42 @@
+import importlib
+import importlib.util
+import sys
+import time
+
+# --- Nạp module nặng khi cần (lazy import) ---
+# odxtools, pyqtgraph, cantools, isotp... mất hàng trăm ms khi import. Lúc khởi
+# động giao diện chỉ kiểm tra module có được cài đặt không (find_spec, không
+# import); module được nạp ở lần dùng đầu tiên qua load_module(). Thời gian của
+# mỗi lần nạp được ghi lại để báo cáo (format_import_times).
+
+_import_times = {} # tên module -> thời gian import lần đầu (giây)
+
+
+def module_available(name):
+    """Module có được cài đặt không (không import module)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load_module(name):
+    """Import module ở lần gọi đầu tiên (thread-safe nhờ khóa import của Python)."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+def import_times():
+    """{tên module: giây} của các module đã nạp qua load_module()."""
+    return dict(_import_times)
+
+
+def format_import_times():
+    if not _import_times:
+        return "chưa nạp module nào"
+    return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in _import_times.items())
@@ -0,0 +1,183 @@
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from trace_buffer import TraceStore
+
+# --- Xuất tín hiệu đã giải mã dạng cột ---
+# Bảng "rộng": mỗi dòng là một frame giải mã được ít nhất một tín hiệu, gồm cột
+# timestamp, frame_id và một cột float64 cho mỗi tín hiệu trong DBC (thiếu giá
+# trị: null trong Parquet, NaN trong npz). Trace được giải mã và ghi theo từng
+# row-group nên bộ nhớ không phụ thuộc độ dài trace.
+#
+# Có pyarrow: ghi một file Parquet, mỗi row-group một lần ghi.
+# Không có pyarrow: ghi thư mục "<tên>.signals/" gồm
+#   manifest.json     {"format": "dbr-signals-npz", "version": 1,
+#                      "columns": [...], "parts": [{"file", "rows"}, ...]}
+#   part-00000.npz    một row-group: mỗi cột một mảng cùng độ dài, theo thứ
+#   part-00001.npz    tự thời gian (np.load(part)["tên cột"])
+# Tên cột là tên tín hiệu; tín hiệu trùng tên cột timestamp / frame_id được
+# đổi thành "signal.<tên>" (tên tín hiệu DBC không chứa dấu chấm).
+# read_npz_signals() ghép lại toàn bộ.
+
+from module_loader import load_module, module_available
+
+PYARROW_AVAILABLE = module_available("pyarrow") # pyarrow chỉ được import khi ghi Parquet
+
+EXPORT_FORMAT_PARQUET = "parquet"
+EXPORT_FORMAT_NPZ = "npz"
+NPZ_FORMAT_NAME = "dbr-signals-npz"
+NPZ_FORMAT_VERSION = 1
+NPZ_DIR_SUFFIX = ".signals"
+ROW_GROUP_SIZE = 65536 # Số frame giải mã mỗi lần / số dòng tối đa mỗi row-group
+TIMESTAMP_COLUMN = "timestamp"
+FRAME_ID_COLUMN = "frame_id"
+RESERVED_COLUMN_PREFIX = "signal."
+
+
+def signal_column_name(signal_name):
+    """Tên cột của một tín hiệu (không trùng cột timestamp / frame_id)."""
+    if signal_name in (TIMESTAMP_COLUMN, FRAME_ID_COLUMN):
+        return RESERVED_COLUMN_PREFIX + signal_name
+    return signal_name
+
+
+def default_export_format():
+    return EXPORT_FORMAT_PARQUET if PYARROW_AVAILABLE else EXPORT_FORMAT_NPZ
+
+
+def export_path_for(path, fmt):
+    """Đường dẫn thực tế: file .parquet, hoặc thư mục .signals cho npz."""
+    base = os.path.splitext(path)[0]
+    return base + (".parquet" if fmt == EXPORT_FORMAT_PARQUET else NPZ_DIR_SUFFIX)
+
+
+class ColumnarSignalWriter:
+    """Ghi bảng tín hiệu dạng cột theo từng row-group (Parquet hoặc npz)."""
+
+    def __init__(self, path, signal_names, fmt=None):
+        self.format = fmt or default_export_format()
+        if self.format == EXPORT_FORMAT_PARQUET and not PYARROW_AVAILABLE:
+            raise ValueError("Xuất Parquet cần thư viện 'pyarrow' (pip install pyarrow)")
+        self.path = export_path_for(path, self.format)
+        self.signal_names = list(signal_names)
+        self._signal_columns = [signal_column_name(name) for name in self.signal_names]
+        self.columns = [TIMESTAMP_COLUMN, FRAME_ID_COLUMN] + self._signal_columns
+        self.row_count = 0
+        self._parts = []
+        self._parquet = None
+        if self.format == EXPORT_FORMAT_PARQUET:
+            pa = self._pa = load_module("pyarrow")
+            pq = load_module("pyarrow.parquet")
+            fields = [pa.field(TIMESTAMP_COLUMN, pa.float64()), pa.field(FRAME_ID_COLUMN, pa.uint32())]
+            fields += [pa.field(column, pa.float64()) for column in self._signal_columns]
+            self._schema = pa.schema(fields)
+            self._parquet = pq.ParquetWriter(self.path, self._schema)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+
+    def write_group(self, timestamps, frame_ids, signal_columns):
+        """Ghi một row-group. signal_columns: {tên: float64 (NaN = thiếu)}, cùng độ dài."""
+        rows = len(timestamps)
+        if rows == 0:
+            return
+        if self._parquet is not None:
+            pa = self._pa
+            arrays = [pa.array(timestamps, type=pa.float64()), pa.array(frame_ids, type=pa.uint32())]
+            for name in self.signal_names:
+                values = signal_columns[name]
+                arrays.append(pa.array(values, type=pa.float64(), mask=np.isnan(values)))
+            self._parquet.write_table(pa.Table.from_arrays(arrays, schema=self._schema), row_group_size=rows)
+        else:
+            part_name = f"part-{len(self._parts):05d}.npz"
+            arrays = [timestamps, frame_ids] + [signal_columns[name] for name in self.signal_names]
+            _write_npz(os.path.join(self.path, part_name), zip(self.columns, arrays))
+            self._parts.append({"file": part_name, "rows": rows})
+        self.row_count += rows
+
+    def write_store(self, store, decoder_table, row_group_size=ROW_GROUP_SIZE):
+        """Giải mã một đoạn trace (TraceStore) và ghi thành một hay nhiều row-group."""
+        for start in range(0, len(store), row_group_size):
+            end = min(start + row_group_size, len(store))
+            part = TraceStore(store.timestamps[start:end], store.ids[start:end], store.dlcs[start:end],
+                              store.flags[start:end], store.payloads[start:end])
+            timestamps, frame_ids, columns = _signal_group(part, decoder_table, self.signal_names)
+            if len(timestamps):
+                self.write_group(np.ascontiguousarray(timestamps, dtype=np.float64),
+                                 np.ascontiguousarray(frame_ids, dtype=np.uint32), columns)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+            return
+        manifest = {"format": NPZ_FORMAT_NAME, "version": NPZ_FORMAT_VERSION,
+                    "columns": self.columns, "rows": self.row_count, "parts": self._parts}
+        with open(os.path.join(self.path, "manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+def _write_npz(path, named_arrays):
+    """Ghi file npz không nén (như np.savez) với tên mảng tùy ý.
+
+    np.savez(f, **columns) lỗi khi tên cột trùng tham số của savez (vd. "file").
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, array in named_arrays:
+            with archive.open(name + ".npy", 'w', force_zip64=True) as member:
+                np.lib.format.write_array(member, np.asanyarray(array), allow_pickle=False)
+
+
+def _signal_group(store, decoder_table, signal_names):
+    """Giải mã một đoạn trace thành (timestamps, frame_ids, {tên: values})."""
+    signal_rows, _decoded, _errors = decoder_table.decode_rows(store)
+    if not signal_rows:
+        return store.timestamps[:0], store.ids[:0], {}
+    rows = np.unique(np.concatenate([sig_rows for sig_rows, _values in signal_rows.values()]))
+    columns = {}
+    for name in signal_names:
+        column = np.full(len(rows), np.nan)
+        if name in signal_rows:
+            sig_rows, values = signal_rows[name]
+            column[np.searchsorted(rows, sig_rows)] = values
+        columns[name] = column
+    return store.timestamps[rows], store.ids[rows], columns
+
+
+def export_signals(store, decoder_table, path, fmt=None, progress=None, row_group_size=ROW_GROUP_SIZE):
+    """Giải mã TraceStore và ghi bảng tín hiệu dạng cột.
+
+    progress(frames_done, total_frames) được gọi sau mỗi row-group.
+    Trả về (đường dẫn đã ghi, định dạng, số dòng).
+    """
+    writer = ColumnarSignalWriter(path, decoder_table.signal_names(), fmt)
+    try:
+        total = len(store)
+        for start in range(0, total, row_group_size):
+            end = min(start + row_group_size, total)
+            part = TraceStore(store.timestamps[start:end], store.ids[start:end], store.dlcs[start:end],
+                              store.flags[start:end], store.payloads[start:end])
+            writer.write_store(part, decoder_table, row_group_size)
+            if progress is not None:
+                progress(end, total)
+    finally:
+        writer.close()
+    return writer.path, writer.format, writer.row_count
+
+
+def read_npz_signals(directory):
+    """Đọc lại thư mục npz thành {tên cột: mảng} (ghép tất cả row-group)."""
+    with open(os.path.join(directory, "manifest.json"), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format") != NPZ_FORMAT_NAME:
+        raise ValueError(f"Không phải thư mục tín hiệu npz: {directory}")
+    parts = {name: [] for name in manifest["columns"]}
+    for part in manifest["parts"]:
+        with np.load(os.path.join(directory, part["file"])) as data:
+            for name in parts:
+                parts[name].append(data[name])
+    empty_types = {FRAME_ID_COLUMN: np.uint32}
+    return {name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=empty_types.get(name, np.float64))
+            for name, arrays in parts.items()}
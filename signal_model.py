@@ -0,0 +1,111 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# --- Model Qt cho bảng Tín hiệu ---
+# Dùng chung cho các GUI: hiển thị SignalIndex của DBC (xây dựng một lần khi tải
+# DBC, xem can_network.set_dbc) và dict giá trị mới nhất của mạng trong
+# QTableView. Đổi mạng chỉ đổi nguồn của model, không tạo item cho từng ô; text
+# của giá trị / timestamp chỉ được tạo trong data(), tức là cho các dòng đang hiển thị.
+
+SIGNAL_COLUMN_HEADERS = ("Signal Name", "Current Value", "Unit", "Last Update Timestamp")
+COLUMN_NAME, COLUMN_VALUE, COLUMN_UNIT, COLUMN_TIMESTAMP = range(4)
+
+
+def format_signal_value(value):
+    return f"{value:.4g}" if isinstance(value, (float, int)) else str(value)
+
+
+def format_timestamp(timestamp):
+    return f"{timestamp:.6f}" if isinstance(timestamp, float) else str(timestamp)
+
+
+class SignalTableModel(QAbstractTableModel):
+    """Model chỉ đọc: tên / giá trị hiện tại / đơn vị / timestamp của các tín hiệu DBC.
+
+    Giá trị được đọc từ dict latest_values {tên: (value, timestamp)} của mạng khi
+    vẽ; signals_updated() chỉ báo cho view biết các hàng cần vẽ lại.
+    """
+
+    def __init__(self, headers=SIGNAL_COLUMN_HEADERS, parent=None):
+        super().__init__(parent)
+        self._headers = tuple(headers)
+        self._index = None        # SignalIndex
+        self._latest_values = {}
+        self._filter_text = ""
+        self._rows = []           # hàng hiển thị -> hàng trong SignalIndex
+        self._view_rows = None    # hàng trong SignalIndex -> hàng hiển thị (tạo khi cần)
+
+    def signal_index(self):
+        return self._index
+
+    def set_source(self, signal_index, latest_values):
+        """Hiển thị SignalIndex của một mạng. Cùng index (cùng DBC): chỉ đổi giá trị, không reset."""
+        if signal_index is self._index:
+            self._latest_values = latest_values
+            self._emit_values_changed(0, len(self._rows) - 1)
+            return
+        self.beginResetModel()
+        self._index = signal_index
+        self._latest_values = latest_values
+        self._rows = signal_index.filter_rows(self._filter_text) if signal_index is not None else []
+        self._view_rows = None
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Chỉ hiển thị tín hiệu có tên chứa text (không phân biệt hoa thường)."""
+        needle = text.strip().lower()
+        if needle == self._filter_text:
+            return
+        # Gõ thêm ký tự: kết quả mới nằm trong kết quả cũ, chỉ lọc lại các hàng đó
+        narrowing = self._filter_text and self._filter_text in needle
+        self.beginResetModel()
+        if self._index is not None:
+            self._rows = self._index.filter_rows(needle, self._rows if narrowing else None)
+        self._filter_text = needle
+        self._view_rows = None
+        self.endResetModel()
+
+    def signals_updated(self, signal_names):
+        """Báo các tín hiệu có giá trị mới trong latest_values (một dataChanged cho cả nhóm)."""
+        if self._index is None or not self._rows:
+            return
+        index_rows = self._index.rows
+        if self._filter_text:
+            if self._view_rows is None:
+                self._view_rows = {index_row: row for row, index_row in enumerate(self._rows)}
+            view_rows = self._view_rows
+            rows = [view_rows[index_row] for name in signal_names
+                    for index_row in index_rows.get(name, ()) if index_row in view_rows]
+        else:
+            rows = [index_row for name in signal_names for index_row in index_rows.get(name, ())]
+        if rows:
+            self._emit_values_changed(min(rows), max(rows))
+
+    def _emit_values_changed(self, first_row, last_row):
+        if last_row >= first_row:
+            self.dataChanged.emit(self.index(first_row, COLUMN_VALUE), self.index(last_row, COLUMN_TIMESTAMP),
+                                  [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        index_row = self._rows[index.row()]
+        column = index.column()
+        name = self._index.names[index_row]
+        if column == COLUMN_NAME: return name
+        if column == COLUMN_UNIT: return self._index.units[index_row]
+        latest = self._latest_values.get(name)
+        if latest is None:
+            return ""
+        value, timestamp = latest
+        return format_signal_value(value) if column == COLUMN_VALUE else format_timestamp(timestamp)
@@ -0,0 +1,333 @@
+import numpy as np
+
+# --- Chuỗi thời gian tín hiệu cho đồ thị (không phụ thuộc Qt) ---
+# Chuỗi tín hiệu từ file là cặp mảng float64 (timestamps, values) chỉ đọc. Khi
+# live, mỗi tín hiệu dùng một SampleRingBuffer cấp phát trước: thêm mẫu là ghi
+# vào mảng NumPy (không tạo list, không sao chép dữ liệu cũ), đồ thị đọc lại
+# dữ liệu theo timer thay vì sau mỗi mẫu.
+#
+# Đồ thị không vẽ toàn bộ mẫu: minmax_decimate() chia khoảng thời gian đang xem
+# thành một cột cho mỗi pixel và giữ điểm đầu, cuối, nhỏ nhất, lớn nhất của mỗi
+# cột (M4), nên đỉnh/gai nhiễu không bị mất như khi lấy mẫu cách đều theo chỉ số.
+# Với chuỗi rất dài, MinMaxPyramid lưu sẵn min/max theo khối ở nhiều mức (mỗi
+# mức gộp đôi khối của mức dưới); khi xem khoảng rộng đồ thị đọc mức thô phù hợp
+# thay vì mọi mẫu gốc, nên zoom/pan tốn thời gian gần như không đổi.
+
+LIVE_SERIES_CAPACITY = 100000 # Số mẫu giữ lại cho mỗi tín hiệu live (~1.6 MB)
+MIN_PLOT_BUCKETS = 512 # Số cột tối thiểu khi giảm điểm (trước khi biết độ rộng đồ thị)
+LOD_BASE_BLOCK = 64     # Số mẫu gốc mỗi khối ở mức 0 của kim tự tháp
+LOD_MIN_SAMPLES = 1 << 17 # Chuỗi từ file ngắn hơn: giảm điểm trực tiếp từ mẫu gốc đủ nhanh
+LIVE_LOD_BASE_BLOCK = 16  # Khối nhỏ hơn cho live: bộ đệm vòng ngắn nhưng vẽ lại ~30 lần/giây
+
+
+class SampleRingBuffer:
+    """Bộ đệm vòng (timestamp, giá trị) float64 cho một tín hiệu live.
+
+    Mỗi mẫu được ghi hai lần (vị trí i và i + capacity) nên các mẫu còn giữ
+    luôn nằm liên tục trong mảng: arrays() trả về view, không sao chép.
+    View chỉ đúng tới lần append() tiếp theo.
+    """
+
+    def __init__(self, capacity=LIVE_SERIES_CAPACITY):
+        self.capacity = max(1, int(capacity))
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._values = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._end = 0    # Vị trí ghi kế tiếp (0..capacity-1)
+        self._count = 0
+        self.total = 0   # Tổng số mẫu đã thêm (kể cả mẫu đã bị ghi đè)
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._end = 0
+        self._count = 0
+        self.total = 0
+
+    def append(self, timestamps, values):
+        """Thêm một batch mẫu (list hoặc mảng cùng độ dài)."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        added = len(timestamps)
+        if added == 0:
+            return
+        self.total += added
+        if added > self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            values = values[-self.capacity:]
+        n = len(timestamps)
+        capacity = self.capacity
+        pos = self._end
+        first = min(n, capacity - pos)
+        for offset in (0, capacity): # Bản chính và bản sao
+            self._timestamps[offset + pos:offset + pos + first] = timestamps[:first]
+            self._values[offset + pos:offset + pos + first] = values[:first]
+            if n > first:
+                self._timestamps[offset:offset + n - first] = timestamps[first:]
+                self._values[offset:offset + n - first] = values[first:]
+        self._end = (pos + n) % capacity
+        self._count = min(capacity, self._count + n)
+
+    def arrays(self, last=None):
+        """(timestamps, values) của các mẫu còn giữ (hoặc last mẫu mới nhất), cũ nhất trước."""
+        count = self._count if last is None else min(self._count, last)
+        start = (self._end - count) % self.capacity
+        return self._timestamps[start:start + count], self._values[start:start + count]
+
+
+def series_arrays(series):
+    """(timestamps, values) của một chuỗi tín hiệu: cặp mảng/list từ file hoặc SampleRingBuffer."""
+    if isinstance(series, SampleRingBuffer):
+        return series.arrays()
+    timestamps, values = series
+    return np.asarray(timestamps, dtype=np.float64), np.asarray(values, dtype=np.float64)
+
+
+def series_length(series):
+    return len(series) if isinstance(series, SampleRingBuffer) else len(series[0])
+
+
+def _first_in_segments(mask, starts, ends):
+    """Chỉ số đầu tiên có mask True trong mỗi đoạn [starts, ends] (-1 nếu không có)."""
+    hits = np.flatnonzero(mask)
+    if len(hits) == 0:
+        return np.full(len(starts), -1, dtype=np.intp)
+    first = hits[np.minimum(np.searchsorted(hits, starts, 'left'), len(hits) - 1)]
+    return np.where((first >= starts) & (first <= ends), first, -1)
+
+
+def minmax_decimate(timestamps, values, x_range=None, buckets=MIN_PLOT_BUCKETS):
+    """Giảm số điểm vẽ, giữ hình dạng đường trong khoảng x_range = (x_min, x_max).
+
+    timestamps tăng dần. x_range None: toàn bộ chuỗi. Mỗi cột (buckets cột) giữ
+    tối đa 4 điểm: đầu, cuối, min, max, theo thứ tự thời gian; thêm một điểm
+    ngoài mỗi biên để đường chạm mép đồ thị. Luôn trả về mảng mới (có thể
+    giữ lâu hơn dữ liệu nguồn, vd. bộ đệm vòng).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    count = len(timestamps)
+    if count == 0:
+        return timestamps.copy(), values.copy()
+    if x_range is None:
+        lo, hi = 0, count
+        x_min, x_max = timestamps[0], timestamps[-1]
+    else:
+        x_min, x_max = x_range
+        lo = max(0, int(np.searchsorted(timestamps, x_min, 'left')) - 1)
+        hi = min(count, int(np.searchsorted(timestamps, x_max, 'right')) + 1)
+    buckets = max(1, int(buckets))
+    if hi - lo <= 4 * buckets or x_max <= x_min:
+        return timestamps[lo:hi].copy(), values[lo:hi].copy()
+
+    ts = timestamps[lo:hi]
+    vals = values[lo:hi]
+    # Biên các cột pixel tìm bằng searchsorted (timestamps tăng dần); cột rỗng bị bỏ,
+    # điểm ngoài biên thuộc cột đầu/cuối
+    edges = x_min + (x_max - x_min) * (np.arange(1, buckets) / buckets)
+    starts = np.unique(np.r_[0, np.searchsorted(ts, edges, 'left')])
+    starts = starts[starts < len(ts)]
+    counts = np.diff(np.r_[starts, len(ts)])
+    ends = starts + counts - 1
+    mins = np.minimum.reduceat(vals, starts)
+    maxs = np.maximum.reduceat(vals, starts)
+    argmin = _first_in_segments(vals == np.repeat(mins, counts), starts, ends)
+    argmax = _first_in_segments(vals == np.repeat(maxs, counts), starts, ends)
+    keep = np.unique(np.concatenate((starts, ends, argmin[argmin >= 0], argmax[argmax >= 0])))
+    return ts[keep], vals[keep]
+
+
+class _LodLevel:
+    """Một mức của kim tự tháp: mỗi khối lưu (t_min, v_min, t_max, v_max).
+
+    count: số khối đã tạo (chỉ số tuyệt đối), first: khối đầu tiên còn giữ.
+    data[:, i] là khối first + i.
+    """
+    __slots__ = ('data', 'count', 'first')
+
+    def __init__(self):
+        self.data = np.zeros((4, 64), dtype=np.float64)
+        self.count = 0
+        self.first = 0
+
+    def blocks(self, start, stop):
+        """View (4, stop - start) của các khối tuyệt đối [start, stop)."""
+        return self.data[:, start - self.first:stop - self.first]
+
+    def append(self, t_min, v_min, t_max, v_max):
+        added = len(t_min)
+        stored = self.count - self.first
+        if stored + added > self.data.shape[1]:
+            grown = np.zeros((4, max(2 * self.data.shape[1], stored + added)), dtype=np.float64)
+            grown[:, :stored] = self.data[:, :stored]
+            self.data = grown
+        for row, column in enumerate((t_min, v_min, t_max, v_max)):
+            self.data[row, stored:stored + added] = column
+        self.count += added
+
+    def drop_before(self, block):
+        """Bỏ các khối trước khối tuyệt đối block (nén mảng khi đã bỏ quá nửa)."""
+        block = min(block, self.count)
+        if block <= self.first:
+            return
+        dropped = block - self.first
+        stored = self.count - self.first
+        if dropped * 2 >= self.data.shape[1]:
+            self.data[:, :stored - dropped] = self.data[:, dropped:stored].copy()
+            self.first = block
+        else:
+            self.data = self.data[:, dropped:] # View, không sao chép
+            self.first = block
+
+
+class MinMaxPyramid:
+    """Kim tự tháp min/max nhiều mức cho một chuỗi tín hiệu (timestamps tăng dần).
+
+    Mức 0 gộp mỗi base_block mẫu gốc thành một khối, mức L + 1 gộp hai khối
+    của mức L. Mỗi khối giữ giá trị nhỏ nhất / lớn nhất và thời điểm của chúng.
+    extend() chỉ xử lý các mẫu mới (dùng cả khi tải file lẫn khi live);
+    drop_before() bỏ các khối của mẫu đã bị bộ đệm vòng ghi đè. Kim tự tháp
+    không giữ mẫu gốc: decimate() nhận mảng gốc để đọc phần đầu/cuối lẻ khối.
+    """
+
+    def __init__(self, base_block=LOD_BASE_BLOCK):
+        self.base_block = max(2, int(base_block))
+        self.levels = []
+        self.samples = 0 # Số mẫu gốc đã thêm
+        self._pending_t = np.zeros(0, dtype=np.float64) # Mẫu chưa đủ một khối mức 0
+        self._pending_v = np.zeros(0, dtype=np.float64)
+
+    @property
+    def nbytes(self):
+        return sum(level.data.nbytes for level in self.levels)
+
+    def block_size(self, level):
+        return self.base_block << level
+
+    def extend(self, timestamps, values):
+        """Thêm các mẫu gốc mới (nối tiếp các mẫu đã thêm)."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        self.samples += len(timestamps)
+        if len(self._pending_t):
+            timestamps = np.concatenate((self._pending_t, timestamps))
+            values = np.concatenate((self._pending_v, values))
+        base = self.base_block
+        complete = len(timestamps) // base
+        self._pending_t = timestamps[complete * base:].copy()
+        self._pending_v = values[complete * base:].copy()
+        if complete == 0:
+            return
+
+        # Mức 0: min/max của từng khối base mẫu
+        block_t = timestamps[:complete * base].reshape(complete, base)
+        block_v = values[:complete * base].reshape(complete, base)
+        rows = np.arange(complete)
+        arg_min = block_v.argmin(axis=1)
+        arg_max = block_v.argmax(axis=1)
+        if not self.levels:
+            self.levels.append(_LodLevel())
+        self.levels[0].append(block_t[rows, arg_min], block_v[rows, arg_min],
+                              block_t[rows, arg_max], block_v[rows, arg_max])
+
+        # Các mức trên: gộp từng cặp khối mới hoàn chỉnh của mức dưới
+        level_index = 0
+        while True:
+            child = self.levels[level_index]
+            if child.count < 2:
+                break
+            if level_index + 1 == len(self.levels):
+                self.levels.append(_LodLevel())
+            parent = self.levels[level_index + 1]
+            added = child.count // 2 - parent.count
+            if added <= 0:
+                break
+            start = 2 * parent.count
+            pairs = child.blocks(start, start + 2 * added)
+            t_min_a, v_min_a, t_max_a, v_max_a = pairs[:, 0::2]
+            t_min_b, v_min_b, t_max_b, v_max_b = pairs[:, 1::2]
+            first_min = v_min_a <= v_min_b # Bằng nhau: giữ thời điểm sớm hơn
+            first_max = v_max_a >= v_max_b
+            parent.append(np.where(first_min, t_min_a, t_min_b), np.where(first_min, v_min_a, v_min_b),
+                          np.where(first_max, t_max_a, t_max_b), np.where(first_max, v_max_a, v_max_b))
+            level_index += 1
+
+    def drop_before(self, sample_index):
+        """Bỏ các khối có mẫu trước sample_index (mẫu đã bị ghi đè trong bộ đệm vòng)."""
+        for level_index, level in enumerate(self.levels):
+            size = self.block_size(level_index)
+            level.drop_before(-(-sample_index // size)) # Khối đầu tiên nằm trọn sau sample_index
+
+    def choose_level(self, sample_count, buckets):
+        """Mức thô nhất còn ít nhất 2 khối cho mỗi cột pixel (None: dùng mẫu gốc)."""
+        chosen = None
+        for level_index in range(len(self.levels)):
+            if sample_count // self.block_size(level_index) < 2 * buckets:
+                break
+            chosen = level_index
+        return chosen
+
+    def decimate(self, timestamps, values, x_range=None, buckets=MIN_PLOT_BUCKETS, first_index=0):
+        """Như minmax_decimate, đọc khối của mức phù hợp thay cho mẫu gốc.
+
+        timestamps/values: các mẫu gốc còn giữ, mẫu đầu có chỉ số tuyệt đối
+        first_index (khác 0 khi bộ đệm vòng đã ghi đè). Chỉ phần đầu/cuối của
+        khoảng xem không trọn khối được đọc từ mẫu gốc.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        count = len(timestamps)
+        if x_range is None:
+            lo, hi = 0, count
+        else:
+            lo = max(0, int(np.searchsorted(timestamps, x_range[0], 'left')) - 1)
+            hi = min(count, int(np.searchsorted(timestamps, x_range[1], 'right')) + 1)
+        level_index = self.choose_level(hi - lo, max(1, int(buckets)))
+        if level_index is None:
+            return minmax_decimate(timestamps, values, x_range, buckets)
+
+        level = self.levels[level_index]
+        size = self.block_size(level_index)
+        first_block = max(level.first, -(-(first_index + lo) // size))
+        stop_block = min(level.count, (first_index + hi) // size)
+        if stop_block <= first_block:
+            return minmax_decimate(timestamps, values, x_range, buckets)
+        head_end = first_block * size - first_index
+        tail_start = stop_block * size - first_index
+        t_min, v_min, t_max, v_max = level.blocks(first_block, stop_block)
+        # Hai điểm mỗi khối theo thứ tự thời gian
+        min_first = t_min <= t_max
+        block_t = np.empty(2 * len(t_min), dtype=np.float64)
+        block_v = np.empty(2 * len(t_min), dtype=np.float64)
+        block_t[0::2] = np.where(min_first, t_min, t_max)
+        block_v[0::2] = np.where(min_first, v_min, v_max)
+        block_t[1::2] = np.where(min_first, t_max, t_min)
+        block_v[1::2] = np.where(min_first, v_max, v_min)
+        merged_t = np.concatenate((timestamps[lo:head_end], block_t, timestamps[tail_start:hi]))
+        merged_v = np.concatenate((values[lo:head_end], block_v, values[tail_start:hi]))
+        if x_range is None:
+            x_range = (timestamps[0], timestamps[-1])
+        return minmax_decimate(merged_t, merged_v, x_range, buckets)
+
+
+def build_signal_pyramids(signal_timeseries, min_samples=LOD_MIN_SAMPLES, should_stop=None):
+    """{tên: MinMaxPyramid} cho các chuỗi dài (từ file trace); should_stop() để hủy giữa chừng."""
+    pyramids = {}
+    for sig_name, series in signal_timeseries.items():
+        if should_stop is not None and should_stop():
+            break
+        if series_length(series) < min_samples:
+            continue
+        pyramid = MinMaxPyramid()
+        pyramid.extend(*series_arrays(series))
+        pyramids[sig_name] = pyramid
+    return pyramids
+
+
+def decimate_series(series, pyramid=None, x_range=None, buckets=MIN_PLOT_BUCKETS):
+    """Điểm cần vẽ cho một chuỗi tín hiệu (mảng từ file hoặc SampleRingBuffer), dùng pyramid nếu có."""
+    timestamps, values = series_arrays(series)
+    if pyramid is None:
+        return minmax_decimate(timestamps, values, x_range, buckets)
+    first_index = series.total - len(series) if isinstance(series, SampleRingBuffer) else 0
+    return pyramid.decimate(timestamps, values, x_range, buckets, first_index)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from cantools.database.can import Message, Signal
+
+from can_decoder import MessageDecoder
+
+
+def _decode_with_both(signal, payloads):
+    message = Message(frame_id=0x100, name='M', length=8, signals=[signal])
+    decoder = MessageDecoder(message)
+    matrix = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(len(payloads), 8)
+    valid, values = decoder.decode_columns(matrix, np.full(len(payloads), 8))[signal.name]
+    expected = [message.decode(payload, decode_choices=False)[signal.name] for payload in payloads]
+    return valid, values, expected
+
+
+@pytest.mark.parametrize('byte_order', ['little_endian', 'big_endian'])
+def test_decode_columns_signed_63_bit(byte_order):
+    start = 0 if byte_order == 'little_endian' else 7
+    signal = Signal('S', start, 63, byte_order=byte_order, is_signed=True)
+    rng = np.random.default_rng(0)
+    payloads = [bytes(8), b"\xFF" * 8] + [rng.bytes(8) for _ in range(30)]
+    valid, values, expected = _decode_with_both(signal, payloads)
+    assert valid is None
+    np.testing.assert_array_equal(values, np.array(expected, dtype=np.float64))
+    assert values.min() < 0 # Có giá trị âm (bit dấu được đặt)
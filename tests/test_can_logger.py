@@ -0,0 +1,48 @@
+import os
+
+import can
+from cantools.database import Database
+from cantools.database.can import Message, Signal
+
+from can_decoder import DecoderTable
+from can_logger import (TriggeredLogWriter, LogTrigger, open_log_writer, COMPRESSION_GZIP, TRIGGER_ID,
+                        TRIGGER_SIGNAL)
+
+
+def _frame(timestamp, frame_id, value=0):
+    return can.Message(timestamp=timestamp, arbitration_id=frame_id, data=bytes([value]) + bytes(7),
+                       is_extended_id=False)
+
+
+def test_stop_trigger_ignores_values_seen_before_capture(tmp_path):
+    db = Database(messages=[Message(frame_id=0x200, name='M', length=8, signals=[Signal('S', 0, 8)])])
+    writer = TriggeredLogWriter(str(tmp_path / "log.csv"), LogTrigger(TRIGGER_ID, frame_id=0x100),
+                                stop_trigger=LogTrigger(TRIGGER_SIGNAL, signal_name='S', threshold=50),
+                                pre_trigger=0.0, post_trigger=1.0, decoder_table=DecoderTable(db))
+    # Lần 1 kết thúc theo cửa sổ post-trigger khi S = 0
+    writer.write([_frame(0.0, 0x100), _frame(0.5, 0x200, 0), _frame(2.0, 0x300)])
+    assert not writer.capturing
+    # S vượt ngưỡng lúc đang chờ trigger; lần 2 không được dừng ngay ở frame S = 100 đầu tiên
+    writer.write([_frame(3.0, 0x200, 100), _frame(10.0, 0x100), _frame(10.5, 0x200, 100)])
+    assert writer.capturing and len(writer.capture_paths) == 2
+    # Cạnh lên thực sự trong lần 2 vẫn dừng ghi
+    writer.write([_frame(10.6, 0x200, 0), _frame(10.7, 0x200, 100)])
+    assert not writer.capturing
+    writer.close()
+
+
+def test_compression_without_rotation_keeps_chosen_name(tmp_path):
+    path = str(tmp_path / "log.csv")
+    writer = open_log_writer(path, compression=COMPRESSION_GZIP)
+    writer.write([_frame(0.0, 0x100), _frame(0.1, 0x100)])
+    writer.close()
+    assert writer.segment_paths == [path]
+    assert sorted(os.listdir(tmp_path)) == ["log.csv.gz"]
+
+
+def test_rotation_numbers_segments(tmp_path):
+    writer = open_log_writer(str(tmp_path / "log.csv"), rotate_bytes=1)
+    writer.write([_frame(0.0, 0x100)])
+    writer.write([_frame(0.1, 0x100)])
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == ["log_0001.csv", "log_0002.csv"]
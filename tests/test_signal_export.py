@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from signal_export import (ColumnarSignalWriter, read_npz_signals, EXPORT_FORMAT_NPZ, EXPORT_FORMAT_PARQUET,
+                           PYARROW_AVAILABLE)
+
+SIGNAL_NAMES = ["timestamp", "frame_id", "file", "Speed"]
+
+
+def _write(path, fmt):
+    writer = ColumnarSignalWriter(path, SIGNAL_NAMES, fmt)
+    timestamps = np.array([0.5, 1.5])
+    frame_ids = np.array([0x100, 0x200], dtype=np.uint32)
+    columns = {name: np.array([float(i), np.nan]) for i, name in enumerate(SIGNAL_NAMES)}
+    writer.write_group(timestamps, frame_ids, columns)
+    writer.close()
+    return writer.path
+
+
+def test_npz_keeps_reserved_and_savez_parameter_names(tmp_path):
+    data = read_npz_signals(_write(str(tmp_path / "out"), EXPORT_FORMAT_NPZ))
+    assert list(data) == ["timestamp", "frame_id", "signal.timestamp", "signal.frame_id", "file", "Speed"]
+    np.testing.assert_array_equal(data["timestamp"], [0.5, 1.5])
+    np.testing.assert_array_equal(data["frame_id"], [0x100, 0x200])
+    assert data["signal.timestamp"][0] == 0 and data["signal.frame_id"][0] == 1
+    assert data["file"][0] == 2 and np.isnan(data["Speed"][1])
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow chưa được cài đặt")
+def test_parquet_schema_has_unique_columns(tmp_path):
+    import pyarrow.parquet as pq
+    table = pq.read_table(_write(str(tmp_path / "out"), EXPORT_FORMAT_PARQUET))
+    assert table.column_names == ["timestamp", "frame_id", "signal.timestamp", "signal.frame_id", "file", "Speed"]
+    assert table.column("timestamp").to_pylist() == [0.5, 1.5]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from trace_buffer import TraceStoreBuilder
+from trace_csv import _parse_block, _parse_line_slow
+
+
+def _parse_fast(lines):
+    builder = TraceStoreBuilder()
+    errors = _parse_block(lines, 1, builder)
+    return builder.build(), errors
+
+
+def _parse_slow(lines):
+    builder = TraceStoreBuilder()
+    errors = sum(_parse_line_slow(line, 1 + i, builder) for i, line in enumerate(lines))
+    return builder.build(), errors
+
+
+def _assert_same(lines):
+    fast, fast_errors = _parse_fast(lines)
+    slow, slow_errors = _parse_slow(lines)
+    assert fast_errors == slow_errors
+    for column in ('timestamps', 'ids', 'dlcs', 'flags', 'payloads'):
+        np.testing.assert_array_equal(getattr(fast, column), getattr(slow, column))
+    return fast, fast_errors
+
+
+def test_extra_and_missing_column_do_not_shift_fields():
+    # Tổng số trường bằng 4 * số dòng nhưng từng dòng sai số cột
+    store, errors = _assert_same(b"1.0,0x100,2,AABB,7\n0x200,2,CCDD\n".split(b"\n")[:-1])
+    assert len(store.timestamps) == 1 and errors == 1
+    assert store.ids[0] == 0x100 and bytes(store.payloads[0, :2]) == b"\xAA\xBB"
+
+
+def test_irregular_rows_in_large_block_match_line_parser():
+    lines = [b"%d.5,0x%X,2,%02X%02X" % (i, 0x100 + i % 7, i % 256, (3 * i) % 256) for i in range(200)]
+    lines[37] += b",extra"
+    lines[38] = lines[38].rsplit(b",", 1)[0]
+    lines[150] = b"x" + lines[150]
+    _assert_same(lines)
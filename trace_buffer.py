@@ -0,0 +1,236 @@
+from array import array
+
+import numpy as np
+
+# --- Lưu trữ frame CAN thô theo cột ---
+# Frame được lưu theo cột NumPy (timestamp, ID, DLC, cờ, payload) thay vì một
+# đối tượng Python cho mỗi frame: FrameRingBuffer cho dữ liệu live (frame cũ
+# nhất bị ghi đè khi đầy), TraceStore cho trace tải từ file.
+
+# Cờ của frame (cột flags)
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+FLAG_ERROR = 0x04
+FLAG_FD = 0x08
+
+CLASSIC_PAYLOAD_WIDTH = 8
+FD_PAYLOAD_WIDTH = 64
+
+
+def message_flags(msg):
+    """Tính byte cờ cho một can.Message."""
+    flags = 0
+    if msg.is_extended_id: flags |= FLAG_EXTENDED
+    if msg.is_remote_frame: flags |= FLAG_REMOTE
+    if msg.is_error_frame: flags |= FLAG_ERROR
+    if msg.is_fd: flags |= FLAG_FD
+    return flags
+
+
+class FrameRingBuffer:
+    """Bộ đệm vòng dung lượng cố định cho frame CAN, lưu theo cột NumPy.
+
+    Hàng 0 luôn là frame cũ nhất còn giữ. Payload dùng ma trận uint8 với
+    độ rộng 8 byte, tự mở rộng lên 64 byte khi gặp frame CAN FD.
+    """
+
+    def __init__(self, capacity, payload_width=CLASSIC_PAYLOAD_WIDTH):
+        self.capacity = max(1, int(capacity))
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.ids = np.zeros(self.capacity, dtype=np.uint32)
+        self.dlcs = np.zeros(self.capacity, dtype=np.uint8)
+        self.flags = np.zeros(self.capacity, dtype=np.uint8)
+        self.payloads = np.zeros((self.capacity, payload_width), dtype=np.uint8)
+        self._start = 0   # Vị trí vật lý của hàng 0
+        self._count = 0
+        self.first_seq = 0 # Số thứ tự (tuyệt đối) của hàng 0, tăng khi frame cũ bị loại
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+        self.first_seq = 0
+
+    def _slot(self, row):
+        return (self._start + row) % self.capacity
+
+    def _ensure_payload_width(self, width):
+        if width <= self.payloads.shape[1]:
+            return
+        new_width = FD_PAYLOAD_WIDTH if width <= FD_PAYLOAD_WIDTH else width
+        grown = np.zeros((self.capacity, new_width), dtype=np.uint8)
+        grown[:, :self.payloads.shape[1]] = self.payloads
+        self.payloads = grown
+
+    def drop_front(self, count):
+        """Loại bỏ count frame cũ nhất."""
+        count = min(count, self._count)
+        self._start = (self._start + count) % self.capacity
+        self._count -= count
+        self.first_seq += count
+
+    def overflow_for(self, count):
+        """Số frame cũ sẽ bị ghi đè nếu thêm count frame."""
+        return max(0, self._count + min(count, self.capacity) - self.capacity)
+
+    def append_arrays(self, timestamps, ids, dlcs, flags, payloads):
+        """Thêm nhiều frame từ các mảng cột (payloads: ma trận uint8 n x width)."""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if n > self.capacity: # Chỉ các frame cuối còn nằm trong bộ đệm
+            timestamps, ids, dlcs, flags, payloads = (
+                timestamps[-self.capacity:], ids[-self.capacity:], dlcs[-self.capacity:],
+                flags[-self.capacity:], payloads[-self.capacity:])
+            n = self.capacity
+        self.drop_front(self.overflow_for(n))
+        self._ensure_payload_width(payloads.shape[1])
+
+        slots = (self._start + self._count + np.arange(n)) % self.capacity
+        self.timestamps[slots] = timestamps
+        self.ids[slots] = ids
+        self.dlcs[slots] = dlcs
+        self.flags[slots] = flags
+        width = payloads.shape[1]
+        self.payloads[slots, :width] = payloads
+        if width < self.payloads.shape[1]:
+            self.payloads[slots, width:] = 0
+        self._count += n
+
+    def append_messages(self, msgs):
+        """Thêm một batch can.Message (một lần chuyển sang cột cho cả batch)."""
+        if not msgs:
+            return
+        msgs = msgs[-self.capacity:]
+        width = max(self.payloads.shape[1], max(len(msg.data) for msg in msgs))
+        payload_bytes = b"".join(bytes(msg.data).ljust(width, b"\x00") for msg in msgs)
+        self.append_arrays(
+            np.fromiter((msg.timestamp for msg in msgs), dtype=np.float64, count=len(msgs)),
+            np.fromiter((msg.arbitration_id for msg in msgs), dtype=np.uint32, count=len(msgs)),
+            np.fromiter((msg.dlc for msg in msgs), dtype=np.uint8, count=len(msgs)),
+            np.fromiter((message_flags(msg) for msg in msgs), dtype=np.uint8, count=len(msgs)),
+            np.frombuffer(payload_bytes, dtype=np.uint8).reshape(len(msgs), width))
+
+    def snapshot(self):
+        """Sao chép nội dung hiện tại thành TraceStore (theo thứ tự, cũ nhất trước)."""
+        slots = (self._start + np.arange(self._count)) % self.capacity
+        return TraceStore(self.timestamps[slots], self.ids[slots], self.dlcs[slots],
+                          self.flags[slots], self.payloads[slots])
+
+    def frame(self, row):
+        """Trả về (timestamp, id, dlc, flags, data bytes) của hàng row."""
+        slot = self._slot(row)
+        flags = int(self.flags[slot])
+        dlc = int(self.dlcs[slot])
+        length = 0 if flags & FLAG_REMOTE else min(dlc, self.payloads.shape[1])
+        return (float(self.timestamps[slot]), int(self.ids[slot]), dlc, flags,
+                self.payloads[slot, :length].tobytes())
+
+
+class TraceStore:
+    """Trace đã tải từ file, lưu theo cột NumPy (chỉ đọc).
+
+    Mỗi frame chiếm khoảng 22 byte (CAN cổ điển) đến 78 byte (CAN FD):
+    timestamp float64, ID uint32, DLC uint8, cờ uint8 và một dòng payload.
+    Cùng giao diện đọc với FrameRingBuffer (len, frame, first_seq).
+    """
+    first_seq = 0
+
+    def __init__(self, timestamps, ids, dlcs, flags, payloads):
+        self.timestamps = timestamps
+        self.ids = ids
+        self.dlcs = dlcs
+        self.flags = flags
+        self.payloads = payloads
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.uint32),
+                   np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8),
+                   np.zeros((0, CLASSIC_PAYLOAD_WIDTH), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        return (self.timestamps.nbytes + self.ids.nbytes + self.dlcs.nbytes
+                + self.flags.nbytes + self.payloads.nbytes)
+
+    def frame(self, row):
+        """Trả về (timestamp, id, dlc, flags, data bytes) của hàng row."""
+        flags = int(self.flags[row])
+        dlc = int(self.dlcs[row])
+        length = 0 if flags & FLAG_REMOTE else min(dlc, self.payloads.shape[1])
+        return (float(self.timestamps[row]), int(self.ids[row]), dlc, flags,
+                self.payloads[row, :length].tobytes())
+
+
+class TraceStoreBuilder:
+    """Gom frame từng cái một (khi đọc file) rồi tạo TraceStore.
+
+    Dữ liệu được tích lũy trong array.array/bytearray (không có đối tượng
+    Python cho mỗi frame), sau đó NumPy dùng lại chính các buffer này.
+    """
+
+    def __init__(self):
+        self._timestamps = array('d')
+        self._ids = array('I')
+        self._dlcs = array('B')
+        self._flags = array('B')
+        self._payloads = bytearray()
+        self._width = CLASSIC_PAYLOAD_WIDTH
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def _widen(self, width):
+        # Chuyển payload đã gom sang độ rộng mới (chỉ xảy ra một lần khi gặp frame CAN FD)
+        new_width = FD_PAYLOAD_WIDTH if width <= FD_PAYLOAD_WIDTH else width
+        old = np.frombuffer(self._payloads, dtype=np.uint8).reshape(-1, self._width)
+        grown = np.zeros((old.shape[0], new_width), dtype=np.uint8)
+        grown[:, :self._width] = old
+        del old # Giải phóng view trước khi thay bytearray
+        self._payloads = bytearray(grown.tobytes())
+        self._width = new_width
+
+    def append(self, timestamp, frame_id, dlc, flags, data):
+        if len(data) > self._width:
+            self._widen(len(data))
+        self._timestamps.append(timestamp)
+        self._ids.append(frame_id)
+        self._dlcs.append(dlc)
+        self._flags.append(flags)
+        self._payloads += data
+        if len(data) < self._width:
+            self._payloads += bytes(self._width - len(data))
+
+    def append_columns(self, timestamps, ids, dlcs, flags, payloads):
+        """Thêm nhiều frame một lần từ mảng NumPy (payloads: ma trận uint8 n x width)."""
+        if len(timestamps) == 0:
+            return
+        width = payloads.shape[1]
+        if width > self._width:
+            self._widen(width)
+        if width < self._width:
+            padded = np.zeros((len(payloads), self._width), dtype=np.uint8)
+            padded[:, :width] = payloads
+            payloads = padded
+        self._timestamps.frombytes(np.ascontiguousarray(timestamps, dtype=np.float64).tobytes())
+        self._ids.frombytes(np.ascontiguousarray(ids, dtype=np.uint32).tobytes())
+        self._dlcs.frombytes(np.ascontiguousarray(dlcs, dtype=np.uint8).tobytes())
+        self._flags.frombytes(np.ascontiguousarray(flags, dtype=np.uint8).tobytes())
+        self._payloads += np.ascontiguousarray(payloads, dtype=np.uint8).tobytes()
+
+    def build(self):
+        count = len(self._timestamps)
+        if count == 0:
+            return TraceStore.empty()
+        return TraceStore(
+            np.frombuffer(self._timestamps, dtype=np.float64),
+            np.frombuffer(self._ids, dtype=np.uint32),
+            np.frombuffer(self._dlcs, dtype=np.uint8),
+            np.frombuffer(self._flags, dtype=np.uint8),
+            np.frombuffer(self._payloads, dtype=np.uint8).reshape(count, self._width))
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from trace_buffer import TraceStore
+
+# --- Cache nhị phân cạnh file trace ---
+# Lần tải đầu ghi file "<trace>.dbrcache": bản ghi frame độ rộng cố định và
+# các mảng tín hiệu đã giải mã. Lần sau, nếu khóa (kích thước, mtime của trace,
+# hash DBC) khớp, các mảng được numpy.memmap thẳng từ file thay vì đọc lại CSV:
+# chỉ các trang được truy cập mới được nạp vào bộ nhớ.
+#
+# Bố cục: MAGIC | độ dài header (uint64 LE) | header JSON | các mảng (căn 64 byte)
+
+CACHE_SUFFIX = ".dbrcache"
+CACHE_VERSION = 1
+MAGIC = b"DBRTRACE"
+ALIGNMENT = 64
+RECORD_BLOCK = 1 << 20 # Số bản ghi frame tạo mỗi lần khi ghi
+
+
+def cache_path_for(trace_path):
+    return trace_path + CACHE_SUFFIX
+
+
+def file_hash(path):
+    """SHA-1 nội dung file (dùng cho DBC). None nếu không có file."""
+    if not path:
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_key(trace_path, dbc_hash):
+    stat = os.stat(trace_path)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "dbc": dbc_hash}
+
+
+def frame_record_dtype(payload_width):
+    """Kiểu bản ghi frame cố định (little-endian, không padding)."""
+    return np.dtype([("timestamp", "<f8"), ("id", "<u4"), ("dlc", "u1"), ("flags", "u1"),
+                     ("payload", "u1", (payload_width,))])
+
+
+def save_trace_cache(trace_path, dbc_hash, trace_data, signal_timeseries, decoded_count=0, error_count=0):
+    """Ghi cache cạnh file trace. Trả về đường dẫn cache, None nếu không ghi được."""
+    cache_path = cache_path_for(trace_path)
+    temp_path = cache_path + ".tmp"
+    record_dtype = frame_record_dtype(trace_data.payloads.shape[1])
+    # Bản ghi frame được tạo theo từng khối khi ghi (không nhân đôi trace trong RAM)
+    arrays = [("frames", np.empty((0,), dtype=record_dtype))]
+    signal_names = list(signal_timeseries)
+    for index, sig_name in enumerate(signal_names):
+        timestamps, values = signal_timeseries[sig_name]
+        arrays.append((f"sig{index}_t", np.ascontiguousarray(timestamps, dtype="<f8")))
+        arrays.append((f"sig{index}_v", np.ascontiguousarray(values, dtype="<f8")))
+
+    # Vị trí mảng tính tương đối với cuối header, header được căn lại sau khi mã hóa
+    layout = []
+    offset = 0
+    for name, array_data in arrays:
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        count = len(trace_data) if name == "frames" else len(array_data)
+        layout.append({"name": name, "offset": offset, "shape": [count],
+                       "dtype": array_data.dtype.descr if array_data.dtype.fields else array_data.dtype.str})
+        offset += count * array_data.dtype.itemsize
+    header = {"key": _cache_key(trace_path, dbc_hash), "payload_width": trace_data.payloads.shape[1],
+              "signals": signal_names, "decoded": int(decoded_count), "errors": int(error_count),
+              "arrays": layout}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            f.seek(data_start + layout[0]["offset"])
+            for start in range(0, len(trace_data), RECORD_BLOCK):
+                end = min(start + RECORD_BLOCK, len(trace_data))
+                records = np.empty(end - start, dtype=record_dtype)
+                records["timestamp"] = trace_data.timestamps[start:end]
+                records["id"] = trace_data.ids[start:end]
+                records["dlc"] = trace_data.dlcs[start:end]
+                records["flags"] = trace_data.flags[start:end]
+                records["payload"] = trace_data.payloads[start:end]
+                f.write(records.view(np.uint8))
+            for entry, (_name, array_data) in zip(layout[1:], arrays[1:]):
+                f.seek(data_start + entry["offset"])
+                f.write(array_data.view(np.uint8))
+            f.truncate(data_start + offset)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # Thư mục chỉ đọc hoặc cache cũ đang được map (Windows): bỏ qua cache
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return None
+    return cache_path
+
+
+def load_trace_cache(trace_path, dbc_hash):
+    """Map cache nếu khóa khớp.
+
+    Trả về (TraceStore, signal_timeseries, số frame đã giải mã, số lỗi)
+    hoặc None nếu không có cache hợp lệ.
+    """
+    cache_path = cache_path_for(trace_path)
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        if header.get("key") != _cache_key(trace_path, dbc_hash):
+            return None
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for entry in header["arrays"]:
+            dtype = entry["dtype"]
+            dtype = np.dtype([tuple(field) for field in dtype]) if isinstance(dtype, list) else np.dtype(dtype)
+            shape = tuple(entry["shape"])
+            if shape[0] == 0: # mmap không map được vùng rỗng
+                arrays[entry["name"]] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[entry["name"]] = np.memmap(cache_path, dtype=dtype, mode='r',
+                                              offset=data_start + entry["offset"], shape=shape)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None # Cache hỏng/không đọc được: đọc lại file trace
+
+    records = arrays["frames"]
+    trace_data = TraceStore(records["timestamp"], records["id"], records["dlc"], records["flags"],
+                            records["payload"])
+    signal_timeseries = {sig_name: (arrays[f"sig{index}_t"], arrays[f"sig{index}_v"])
+                         for index, sig_name in enumerate(header["signals"])}
+    return trace_data, signal_timeseries, header["decoded"], header["errors"]
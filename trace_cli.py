@@ -0,0 +1,290 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- Chuyển đổi / giải mã trace không cần giao diện (headless) ---
+# Dùng cùng các module không phụ thuộc Qt mà TraceLoadingWorker / LoggingWorker
+# dùng: đọc CSV/ASC/BLF theo khối (trace_csv.iter_csv_trace,
+# trace_vector.iter_vector_trace), ghi trace CSV / BLF hoặc bảng tín hiệu
+# dạng cột (signal_export). Mỗi khối được ghi ngay nên bộ nhớ không phụ thuộc
+# kích thước file. Nhiều file (hoặc cả thư mục) được xử lý song song, mỗi file
+# một tiến trình; DBC được tải một lần cho mỗi tiến trình.
+#
+# Ví dụ:
+#   python trace_cli.py log.blf -o log.csv
+#   python trace_cli.py logs/ -o out/ --to parquet --dbc powertrain.dbc -j 8
+
+from trace_csv import TRACE_CSV_HEADER, format_csv_trace, iter_csv_trace
+from trace_vector import VECTOR_TRACE_EXTENSIONS, is_vector_trace, iter_vector_trace
+
+OUTPUT_CSV = "csv"
+OUTPUT_BLF = "blf"
+OUTPUT_PARQUET = "parquet"
+OUTPUT_NPZ = "npz"
+OUTPUT_COLUMNAR = "columnar" # Parquet nếu có pyarrow, ngược lại npz
+OUTPUT_FORMATS = (OUTPUT_CSV, OUTPUT_BLF, OUTPUT_PARQUET, OUTPUT_NPZ, OUTPUT_COLUMNAR)
+INPUT_EXTENSIONS = ('.csv',) + VECTOR_TRACE_EXTENSIONS
+
+
+def load_decoder_table(dbc_path):
+    """Tải DBC (thử lần lượt các encoding như giao diện) và biên dịch DecoderTable."""
+    from can_decoder import DecoderTable, load_dbc
+    return DecoderTable(load_dbc(dbc_path))
+
+
+def iter_trace(file_path):
+    """Đọc trace CSV/ASC/BLF theo khối: sinh ra (TraceStore, số lỗi)."""
+    if is_vector_trace(file_path):
+        return iter_vector_trace(file_path)
+    return iter_csv_trace(file_path)
+
+
+def output_format_for_path(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".blf":
+        return OUTPUT_BLF
+    if extension == ".parquet":
+        return OUTPUT_PARQUET
+    if extension == ".signals":
+        return OUTPUT_NPZ
+    return OUTPUT_CSV
+
+
+def output_extension(output_format):
+    from signal_export import NPZ_DIR_SUFFIX, default_export_format, EXPORT_FORMAT_NPZ
+    if output_format == OUTPUT_COLUMNAR:
+        output_format = OUTPUT_NPZ if default_export_format() == EXPORT_FORMAT_NPZ else OUTPUT_PARQUET
+    return {OUTPUT_CSV: ".csv", OUTPUT_BLF: ".blf", OUTPUT_PARQUET: ".parquet", OUTPUT_NPZ: NPZ_DIR_SUFFIX}[output_format]
+
+
+class _FrameSink:
+    """Ghi các khối TraceStore ra trace CSV (trace_csv) hoặc BLF (can_logger)."""
+
+    def __init__(self, output_path, output_format):
+        self.path = output_path
+        self.row_count = 0
+        if output_format == OUTPUT_BLF:
+            from can_logger import LogFileWriter
+            self._writer = LogFileWriter(output_path, output_format, flush_bytes=None, flush_interval=None)
+            self._file = None
+        else:
+            # Định dạng trace CSV (ID có tiền tố 0x) để file đích tải lại được trong giao diện
+            self._writer = None
+            self._file = open(output_path, 'w', newline='', encoding='utf-8')
+            self._file.write(TRACE_CSV_HEADER)
+
+    def write(self, store):
+        if self._writer is not None:
+            from can_logger import messages_from_store
+            self._writer.write(messages_from_store(store))
+        else:
+            self._file.write(format_csv_trace(store))
+        self.row_count += len(store)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+class _SignalSink:
+    """Giải mã các khối TraceStore và ghi bảng tín hiệu dạng cột (signal_export)."""
+
+    def __init__(self, output_path, output_format, decoder_table):
+        from signal_export import ColumnarSignalWriter, EXPORT_FORMAT_NPZ, EXPORT_FORMAT_PARQUET
+        fmt = {OUTPUT_PARQUET: EXPORT_FORMAT_PARQUET, OUTPUT_NPZ: EXPORT_FORMAT_NPZ}.get(output_format)
+        self._decoder_table = decoder_table
+        self._writer = ColumnarSignalWriter(output_path, decoder_table.signal_names(), fmt)
+        self.path = self._writer.path
+
+    @property
+    def row_count(self):
+        return self._writer.row_count
+
+    def write(self, store):
+        self._writer.write_store(store, self._decoder_table)
+
+    def close(self):
+        self._writer.close()
+
+
+def convert_trace(input_path, output_path, output_format=None, decoder_table=None):
+    """Chuyển một file trace theo từng khối.
+
+    Trả về dict thống kê: input, output, frames, errors, decoded, decode_errors, rows, seconds.
+    decoded/decode_errors chỉ được đếm khi có decoder_table.
+    """
+    if not os.path.isfile(input_path):
+        raise FileNotFoundError(f"Không tìm thấy file trace '{input_path}'")
+    output_format = output_format or output_format_for_path(output_path)
+    columnar = output_format in (OUTPUT_PARQUET, OUTPUT_NPZ, OUTPUT_COLUMNAR)
+    if columnar and decoder_table is None:
+        raise ValueError("Xuất tín hiệu dạng cột cần file DBC (--dbc)")
+
+    started = time.perf_counter()
+    stats = {"input": input_path, "frames": 0, "errors": 0, "decoded": 0, "decode_errors": 0}
+    sink = (_SignalSink(output_path, output_format, decoder_table) if columnar
+            else _FrameSink(output_path, output_format))
+    try:
+        for store, error_count in iter_trace(input_path):
+            stats["frames"] += len(store)
+            stats["errors"] += error_count
+            if not len(store):
+                continue
+            if decoder_table is not None and not columnar:
+                _series, decoded_count, decode_errors = decoder_table.decode_rows(store)
+                stats["decoded"] += decoded_count
+                stats["decode_errors"] += decode_errors
+            sink.write(store)
+    finally:
+        sink.close()
+    if columnar:
+        # Số frame giải mã được = số dòng của bảng tín hiệu
+        stats["decoded"] = sink.row_count
+    stats["output"] = sink.path
+    stats["rows"] = sink.row_count
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+_worker_decoder_table = None # Bảng giải mã của tiến trình con
+
+
+def _init_convert_worker(dbc_path):
+    global _worker_decoder_table
+    _worker_decoder_table = load_decoder_table(dbc_path) if dbc_path else None
+
+
+def _convert_in_worker(input_path, output_path, output_format):
+    return convert_trace(input_path, output_path, output_format, _worker_decoder_table)
+
+
+def collect_inputs(paths, recursive=False):
+    """Danh sách file trace từ các file/thư mục đầu vào (thư mục: *.csv, *.asc, *.blf)."""
+    inputs = []
+    for path in paths:
+        if not os.path.isdir(path):
+            inputs.append(path)
+            continue
+        if recursive:
+            walk = ((root, files) for root, _dirs, files in os.walk(path))
+        else:
+            walk = [(path, [name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))])]
+        for root, files in walk:
+            inputs.extend(os.path.join(root, name) for name in sorted(files)
+                          if os.path.splitext(name)[1].lower() in INPUT_EXTENSIONS)
+    return inputs
+
+
+def plan_outputs(inputs, output, output_format):
+    """Ghép mỗi file đầu vào với đường dẫn đầu ra.
+
+    Một file đầu vào và output không phải thư mục: output là file đích.
+    Ngược lại output là thư mục, file đích giữ tên file gốc với phần mở rộng mới.
+    """
+    if len(inputs) == 1 and not os.path.isdir(output) and not output.endswith(os.sep):
+        return [(inputs[0], output)]
+    os.makedirs(output, exist_ok=True)
+    extension = output_extension(output_format)
+    plan = []
+    used = set()
+    for input_path in inputs:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        name = stem + extension
+        index = 1
+        while name in used: # Trùng tên (vd: a.csv và a.blf, hoặc thư mục con): thêm số thứ tự
+            index += 1
+            name = f"{stem}_{index}{extension}"
+        used.add(name)
+        plan.append((input_path, os.path.join(output, name)))
+    return plan
+
+
+def _format_stats(stats):
+    rate = stats["frames"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    text = (f"{stats['input']} -> {stats['output']}: {stats['frames']} frame, {stats['errors']} lỗi, "
+            f"{stats['rows']} dòng ghi")
+    if stats["decoded"] or stats["decode_errors"]:
+        text += f", {stats['decoded']} frame giải mã ({stats['decode_errors']} lỗi giải mã)"
+    return text + f", {stats['seconds']:.2f}s ({rate:,.0f} frame/s)"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="trace_cli.py",
+        description="Chuyển đổi / giải mã trace CAN (CSV, ASC, BLF) không cần giao diện.")
+    parser.add_argument("inputs", nargs="+", help="File trace hoặc thư mục chứa *.csv / *.asc / *.blf")
+    parser.add_argument("-o", "--output", required=True,
+                        help="File đích (một đầu vào) hoặc thư mục đích (nhiều đầu vào)")
+    parser.add_argument("-t", "--to", choices=OUTPUT_FORMATS, default=None,
+                        help="Định dạng đích (mặc định theo phần mở rộng của --output, hoặc csv). "
+                             "parquet/npz/columnar: bảng tín hiệu đã giải mã, cần --dbc")
+    parser.add_argument("--dbc", help="File DBC để giải mã")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Số tiến trình khi có nhiều file (mặc định: số CPU)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Tìm file trong thư mục con")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Chỉ in lỗi")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    inputs = collect_inputs(args.inputs, args.recursive)
+    if not inputs:
+        print("Không tìm thấy file trace nào.", file=sys.stderr)
+        return 2
+    output_format = args.to or (output_format_for_path(args.output) if len(inputs) == 1 else OUTPUT_CSV)
+    if output_format in (OUTPUT_PARQUET, OUTPUT_NPZ, OUTPUT_COLUMNAR) and not args.dbc:
+        print("Lỗi: xuất tín hiệu dạng cột cần --dbc", file=sys.stderr)
+        return 2
+    plan = plan_outputs(inputs, args.output, output_format)
+
+    failures = 0
+    total_frames = 0
+    started = time.perf_counter()
+    jobs = max(1, min(args.jobs, len(plan)))
+    if jobs == 1:
+        decoder_table = load_decoder_table(args.dbc) if args.dbc else None
+        results = []
+        for input_path, output_path in plan:
+            try:
+                results.append((input_path, convert_trace(input_path, output_path, output_format, decoder_table), None))
+            except Exception as e:
+                results.append((input_path, None, e))
+            _report(*results[-1], args.quiet)
+    else:
+        results = []
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_convert_worker,
+                                 initargs=(args.dbc,)) as executor:
+            futures = {executor.submit(_convert_in_worker, input_path, output_path, output_format): input_path
+                       for input_path, output_path in plan}
+            for future in as_completed(futures):
+                try:
+                    results.append((futures[future], future.result(), None))
+                except Exception as e:
+                    results.append((futures[future], None, e))
+                _report(*results[-1], args.quiet)
+
+    for _input_path, stats, error in results:
+        if error is not None:
+            failures += 1
+        else:
+            total_frames += stats["frames"]
+    if not args.quiet and len(plan) > 1:
+        elapsed = time.perf_counter() - started
+        print(f"Tổng: {len(plan) - failures}/{len(plan)} file, {total_frames} frame, {elapsed:.2f}s")
+    return 1 if failures else 0
+
+
+def _report(input_path, stats, error, quiet):
+    if error is not None:
+        print(f"Lỗi: {input_path}: {error}", file=sys.stderr)
+    elif not quiet:
+        print(_format_stats(stats))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
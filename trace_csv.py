@@ -0,0 +1,388 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from trace_buffer import TraceStore, TraceStoreBuilder, FLAG_EXTENDED, FLAG_FD, FLAG_REMOTE
+
+# --- Đọc trace CSV (Timestamp, ID, DLC, Data hex) ---
+# Đọc file một lần theo khối nhị phân lớn; tiến trình tính theo byte đã đọc.
+# Mỗi khối được chuyển đổi theo cột (timestamp, ID, DLC, payload) trong vài
+# lệnh lớn. Dòng không hợp lệ được tách ra bằng cách chia đôi khối và xử lý
+# từng dòng theo quy tắc cũ (csv.reader + kiểm tra từng trường).
+
+CHUNK_SIZE = 8 * 1024 * 1024
+SLOW_PATH_LINES = 32 # Khối nhỏ hơn thế này được xử lý từng dòng khi có lỗi
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024 # File nhỏ hơn thế này đọc trong một tiến trình
+RANGES_PER_WORKER = 4 # Số đoạn byte cho mỗi tiến trình (cân tải + báo tiến trình)
+MIN_RANGE_BYTES = 16 * 1024 * 1024
+
+
+_ROW_MARKER = b",\0," # Ngăn cách dòng trong _parse_block_fast
+
+
+class _IrregularBlock(Exception):
+    """Khối có dòng không theo định dạng chuẩn (xử lý lại theo từng dòng)."""
+
+
+def iter_line_chunks(file_obj, chunk_size=CHUNK_SIZE, limit=None):
+    """Đọc file nhị phân theo khối, mỗi khối kết thúc ở cuối dòng.
+
+    limit: số byte tối đa được đọc (None = đến hết file).
+    Trả về (bytes của các dòng đầy đủ, số byte đã đọc).
+    """
+    offset = 0
+    pending = b""
+    while True:
+        size = chunk_size if limit is None else min(chunk_size, limit - offset)
+        data = file_obj.read(size) if size > 0 else b""
+        if not data:
+            break
+        offset += len(data)
+        if offset == len(data) and data.startswith(b"\xef\xbb\xbf"):
+            data = data[3:] # Bỏ BOM UTF-8
+        data = pending + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            pending = data
+            continue
+        pending = data[cut + 1:]
+        yield data[:cut + 1], offset
+    if pending:
+        yield pending, offset
+
+
+# Giá trị của ký tự ASCII khi là chữ số hex (99 = không hợp lệ)
+_DIGIT_VALUES = np.full(256, 99, dtype=np.int64)
+for _code in range(256):
+    if chr(_code) in "0123456789abcdefABCDEF":
+        _DIGIT_VALUES[_code] = int(chr(_code), 16)
+
+
+def _parse_id_column(id_fields):
+    """Chuyển cột ID (hex có tiền tố 0x hoặc thập phân) sang mảng int64."""
+    column = np.array(id_fields)
+    if column.dtype.itemsize == 0:
+        raise _IrregularBlock()
+    chars = column.view(np.uint8).reshape(len(column), column.dtype.itemsize)
+    lengths = np.char.str_len(column)
+    is_hex = (chars[:, 0] == ord("0")) & ((chars[:, 1] | 0x20) == ord("x")) if chars.shape[1] > 1 else np.zeros(len(column), dtype=bool)
+    if is_hex.all():
+        base, first = 16, 2
+    elif not is_hex.any():
+        base, first = 10, 0
+    else:
+        raise _IrregularBlock() # Trộn hex/thập phân trong một khối
+    if (lengths <= first).any() or (lengths - first > (8 if base == 16 else 10)).any():
+        raise _IrregularBlock()
+    values = np.zeros(len(column), dtype=np.int64)
+    for pos in range(first, chars.shape[1]):
+        active = pos < lengths
+        digits = _DIGIT_VALUES[chars[:, pos]]
+        if ((digits >= base) & active).any():
+            raise _IrregularBlock()
+        values = np.where(active, values * base + digits, values)
+    return values
+
+
+def _parse_block_fast(lines):
+    """Chuyển một khối dòng sang cột. Ném _IrregularBlock nếu có dòng bất thường."""
+    rows = [line for line in lines if line]
+    if not rows:
+        return None
+    # Trường đánh dấu NUL giữa các dòng: dòng nào cũng đúng 4 cột khi mọi trường
+    # thứ 5 là dấu (chỉ so tổng số trường thì dòng 5 cột cạnh dòng 3 cột vẫn lọt qua)
+    text = _ROW_MARKER.join(rows)
+    if b'"' in text:
+        raise _IrregularBlock() # Trường có dấu nháy: cần csv.reader
+    fields = text.split(b",")
+    if (len(fields) != 5 * len(rows) - 1 or text.count(b"\0") != len(rows) - 1
+            or fields[4::5].count(b"\0") != len(rows) - 1):
+        raise _IrregularBlock() # Dòng thiếu/thừa cột
+    has_blanks = b" " in text or b"\t" in text
+    if has_blanks:
+        fields = [field.strip() for field in fields]
+    ts_fields = fields[0::5]
+    id_fields = fields[1::5]
+    dlc_fields = fields[2::5]
+    data_fields = fields[3::5]
+    if has_blanks:
+        data_fields = [b"".join(field.split()) for field in data_fields]
+
+    try:
+        timestamps = np.array(ts_fields).astype(np.float64)
+        ids = _parse_id_column(id_fields)
+        dlcs = np.array(dlc_fields).astype(np.int64)
+        lengths = np.char.str_len(np.array(data_fields)).astype(np.int64)
+        raw = np.frombuffer(bytes.fromhex(b"".join(data_fields).decode("ascii")), dtype=np.uint8)
+    except (ValueError, TypeError, UnicodeDecodeError, OverflowError):
+        raise _IrregularBlock()
+    if ((lengths & 1).any() or (dlcs < 0).any() or (dlcs > 64).any()
+            or (ids < 0).any() or (ids > 0xFFFFFFFF).any()):
+        raise _IrregularBlock()
+
+    lengths >>= 1
+    width = max(8, int(lengths.max()))
+    if (lengths == width).all():
+        payloads = raw.reshape(len(rows), width)
+    else:
+        payloads = np.zeros((len(rows), width), dtype=np.uint8)
+        row_index = np.repeat(np.arange(len(rows)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        col_index = np.arange(len(raw)) - np.repeat(starts, lengths)
+        payloads[row_index, col_index] = raw
+    flags = np.where(ids > 0x7FF, FLAG_EXTENDED, 0) | np.where(lengths > 8, FLAG_FD, 0)
+    return timestamps, ids, lengths, flags, payloads
+
+
+def _parse_line_slow(line, line_num, builder, line_ts_rows=None):
+    """Xử lý một dòng theo quy tắc gốc. Trả về 1 nếu dòng lỗi, ngược lại 0.
+
+    line_ts_rows: danh sách nhận chỉ số các frame dùng số dòng làm timestamp.
+    """
+    try:
+        row = next(csv.reader([line.decode("utf-8")]), [])
+    except (UnicodeDecodeError, csv.Error):
+        return 1
+    if len(row) < 4:
+        # Bỏ qua dòng trống, dòng thiếu cột là lỗi
+        return 1 if any(field.strip() for field in row) else 0
+
+    timestamp_str, id_str, dlc_str, data_str = [field.strip() for field in row[:4]]
+    try:
+        can_id = int(id_str, 16) if id_str.lower().startswith('0x') else int(id_str)
+        if not (0 <= can_id <= 0xFFFFFFFF):
+            raise ValueError("ID ngoài khoảng hợp lệ")
+        dlc = int(dlc_str)
+        if not (0 <= dlc <= 64): # Cho phép CAN FD
+            raise ValueError("DLC ngoài khoảng hợp lệ (0-64)")
+        data_bytes = bytes.fromhex("".join(data_str.split()))
+    except ValueError:
+        return 1
+    try:
+        ts_float = float(timestamp_str)
+    except ValueError:
+        ts_float = line_num # Timestamp không phải số: dùng số dòng làm "thời gian" tạm thời
+        if line_ts_rows is not None:
+            line_ts_rows.append(len(builder))
+    # DLC lưu theo số byte data thực tế (giống can.Message.dlc)
+    flags = (FLAG_EXTENDED if can_id > 0x7FF else 0) | (FLAG_FD if len(data_bytes) > 8 else 0)
+    builder.append(ts_float, can_id, len(data_bytes), flags, data_bytes)
+    return 0
+
+
+def _parse_block(lines, first_line_num, builder, line_ts_rows=None):
+    """Thêm các dòng vào builder, trả về số dòng lỗi."""
+    if len(lines) <= SLOW_PATH_LINES:
+        try:
+            columns = _parse_block_fast(lines)
+        except _IrregularBlock:
+            return sum(_parse_line_slow(line, first_line_num + i, builder, line_ts_rows)
+                       for i, line in enumerate(lines))
+    else:
+        try:
+            columns = _parse_block_fast(lines)
+        except _IrregularBlock:
+            # Chia đôi để chỉ các dòng bất thường đi qua đường chậm
+            half = len(lines) // 2
+            return (_parse_block(lines[:half], first_line_num, builder, line_ts_rows)
+                    + _parse_block(lines[half:], first_line_num + half, builder, line_ts_rows))
+    if columns is not None:
+        builder.append_columns(*columns)
+    return 0
+
+
+def _split_lines(chunk):
+    lines = chunk.replace(b"\r", b"").split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop() # Phần rỗng sau ký tự xuống dòng cuối cùng
+    return lines
+
+
+def _read_lines(trace_file, builder, chunk_size, limit=None, progress=None, total_bytes=0, line_ts_rows=None):
+    """Đọc và chuyển đổi các dòng từ vị trí hiện tại. Trả về (số dòng lỗi, số dòng)."""
+    error_count = 0
+    line_num = 1
+    for chunk, bytes_read in iter_line_chunks(trace_file, chunk_size, limit):
+        lines = _split_lines(chunk)
+        error_count += _parse_block(lines, line_num, builder, line_ts_rows)
+        line_num += len(lines)
+        if progress is not None:
+            progress(bytes_read, total_bytes, line_num - 1)
+    return error_count, line_num - 1
+
+
+def read_csv_trace(file_path, progress=None, chunk_size=CHUNK_SIZE):
+    """Đọc trace CSV thành TraceStore trong một lần đọc file.
+
+    progress(bytes_read, total_bytes, line_count) được gọi sau mỗi khối.
+    Trả về (TraceStore, số dòng lỗi).
+    """
+    total_bytes = os.path.getsize(file_path)
+    builder = TraceStoreBuilder()
+    with open(file_path, 'rb') as trace_file:
+        error_count, _line_count = _read_lines(trace_file, builder, chunk_size,
+                                               progress=progress, total_bytes=total_bytes)
+    return builder.build(), error_count
+
+
+def iter_csv_trace(file_path, chunk_size=CHUNK_SIZE, progress=None):
+    """Đọc trace CSV từng khối, bộ nhớ không phụ thuộc kích thước file.
+
+    Sinh ra (TraceStore của khối, số dòng lỗi trong khối) theo thứ tự file.
+    progress(bytes_read, total_bytes, line_count) được gọi sau mỗi khối.
+    """
+    total_bytes = os.path.getsize(file_path)
+    line_num = 1
+    with open(file_path, 'rb') as trace_file:
+        for chunk, bytes_read in iter_line_chunks(trace_file, chunk_size):
+            lines = _split_lines(chunk)
+            builder = TraceStoreBuilder()
+            error_count = _parse_block(lines, line_num, builder)
+            line_num += len(lines)
+            if progress is not None:
+                progress(bytes_read, total_bytes, line_num - 1)
+            yield builder.build(), error_count
+
+
+# Dòng kết thúc bằng \r\n như log CSV (can_logger.CSV_HEADER)
+TRACE_CSV_HEADER = "Timestamp,ID_Hex,DLC,Data_Hex\r\n"
+
+
+def format_csv_trace(store):
+    """Định dạng một TraceStore thành các dòng trace CSV (đọc lại được bằng read_csv_trace)."""
+    width = store.payloads.shape[1]
+    raw = store.payloads.tobytes()
+    lengths = np.where((store.flags & FLAG_REMOTE) != 0, 0, np.minimum(store.dlcs, width)).tolist()
+    return "".join(
+        f"{timestamp:.6f},0x{frame_id:X},{length},{raw[row * width:row * width + length].hex().upper()}\r\n"
+        for row, (timestamp, frame_id, length) in enumerate(zip(store.timestamps.tolist(), store.ids.tolist(), lengths)))
+
+
+# --- Đọc song song nhiều tiến trình ---
+# File lớn được chia thành các đoạn byte bắt đầu/kết thúc ở đầu dòng. Mỗi
+# tiến trình con đọc và giải mã một đoạn (bảng giải mã được gửi một lần khi
+# khởi tạo tiến trình), tiến trình chính ghép các cột theo thứ tự thời gian.
+
+def split_line_ranges(file_path, parts):
+    """Chia file thành tối đa parts đoạn [start, end) căn theo đầu dòng."""
+    total_bytes = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, 'rb') as trace_file:
+        for part in range(1, parts):
+            pos = total_bytes * part // parts
+            if pos <= bounds[-1]:
+                continue
+            trace_file.seek(pos - 1)
+            trace_file.readline() # Tới đầu dòng kế tiếp
+            pos = trace_file.tell()
+            if pos >= total_bytes:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(total_bytes)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+_worker_decoder_table = None # Bảng giải mã của tiến trình con
+
+
+def _init_range_worker(decoder_table):
+    global _worker_decoder_table
+    _worker_decoder_table = decoder_table
+
+
+def _load_range(file_path, start, end, chunk_size):
+    """Chạy trong tiến trình con: đọc + giải mã đoạn [start, end)."""
+    builder = TraceStoreBuilder()
+    line_ts_rows = []
+    with open(file_path, 'rb') as trace_file:
+        trace_file.seek(start)
+        error_count, line_count = _read_lines(trace_file, builder, chunk_size, limit=end - start,
+                                              line_ts_rows=line_ts_rows)
+    store = builder.build()
+    signal_timeseries, decoded_count, decode_errors = {}, 0, 0
+    if _worker_decoder_table is not None and len(store):
+        signal_timeseries, decoded_count, decode_errors = _worker_decoder_table.decode_trace(store)
+    columns = (store.timestamps, store.ids, store.dlcs, store.flags, store.payloads)
+    return columns, signal_timeseries, decoded_count, error_count, decode_errors, line_count, line_ts_rows
+
+
+def _merge_ranges(results):
+    """Ghép kết quả các đoạn (theo thứ tự trong file) thành TraceStore."""
+    stores = [TraceStore(*columns) for columns, *_rest in results]
+    width = max(store.payloads.shape[1] for store in stores)
+    payloads = []
+    for store in stores:
+        block = store.payloads
+        if block.shape[1] < width:
+            block = np.zeros((len(store), width), dtype=np.uint8)
+            block[:, :store.payloads.shape[1]] = store.payloads
+        payloads.append(block)
+    return TraceStore(np.concatenate([store.timestamps for store in stores]),
+                      np.concatenate([store.ids for store in stores]),
+                      np.concatenate([store.dlcs for store in stores]),
+                      np.concatenate([store.flags for store in stores]),
+                      np.concatenate(payloads))
+
+
+def read_csv_trace_parallel(file_path, decoder_table=None, progress=None, workers=None,
+                            chunk_size=CHUNK_SIZE):
+    """Đọc + giải mã trace CSV bằng nhiều tiến trình.
+
+    Kết quả giống read_csv_trace + DecoderTable.decode_trace (thứ tự file).
+    progress(bytes_read, total_bytes, line_count) được gọi khi mỗi đoạn xong.
+    Trả về (TraceStore, signal_timeseries, số frame đã giải mã, số lỗi).
+    """
+    workers = workers or os.cpu_count() or 1
+    total_bytes = os.path.getsize(file_path)
+    range_size = max(MIN_RANGE_BYTES, total_bytes // (workers * RANGES_PER_WORKER) + 1)
+    ranges = split_line_ranges(file_path, max(1, -(-total_bytes // range_size)))
+
+    results = [None] * len(ranges)
+    bytes_done = 0
+    lines_done = 0
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), initializer=_init_range_worker,
+                             initargs=(decoder_table,)) as executor:
+        futures = {executor.submit(_load_range, file_path, start, end, chunk_size): index
+                   for index, (start, end) in enumerate(ranges)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            start, end = ranges[index]
+            bytes_done += end - start
+            lines_done += results[index][5]
+            if progress is not None:
+                progress(bytes_done, total_bytes, lines_done)
+
+    if not results:
+        return TraceStore.empty(), {}, 0, 0
+    store = _merge_ranges(results)
+    parse_errors = sum(result[3] for result in results)
+
+    # Timestamp thay bằng số dòng chỉ biết số dòng trong đoạn: cộng số dòng của
+    # các đoạn trước (hiếm gặp, khi đó giải mã lại trên trace đã ghép)
+    redecode = False
+    row_offset = 0
+    line_offset = 0
+    for columns, _series, _decoded, _errors, _decode_errors, line_count, line_ts_rows in results:
+        if line_ts_rows and line_offset:
+            store.timestamps[row_offset + np.asarray(line_ts_rows, dtype=np.intp)] += line_offset
+            redecode = True
+        row_offset += len(columns[0])
+        line_offset += line_count
+
+    # Giữ thứ tự file như read_csv_trace (cache .dbrcache không phụ thuộc đường đọc)
+    if redecode and decoder_table is not None:
+        signal_timeseries, decoded_count, decode_errors = decoder_table.decode_trace(store)
+        return store, signal_timeseries, decoded_count, parse_errors + decode_errors
+
+    decoded_count = sum(result[2] for result in results)
+    decode_errors = sum(result[4] for result in results)
+    signal_timeseries = {}
+    for sig_name in dict.fromkeys(name for result in results for name in result[1]):
+        parts = [result[1][sig_name] for result in results if sig_name in result[1]]
+        signal_timeseries[sig_name] = (np.concatenate([ts for ts, _values in parts]),
+                                       np.concatenate([values for _ts, values in parts]))
+    return store, signal_timeseries, decoded_count, parse_errors + decode_errors
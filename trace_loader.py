@@ -0,0 +1,75 @@
+import os
+import time
+
+from trace_cache import file_hash, load_trace_cache, save_trace_cache
+from trace_csv import read_csv_trace, read_csv_trace_parallel, PARALLEL_MIN_BYTES
+from trace_vector import is_vector_trace, read_vector_trace
+
+# --- Tải trace (không phụ thuộc Qt) ---
+# Chọn cách đọc phù hợp cho một file trace: cache cạnh file nếu còn hợp lệ,
+# log Vector .asc/.blf, CSV lớn đọc song song nhiều tiến trình, hoặc CSV đọc
+# theo khối; sau đó giải mã theo DBC và ghi cache. TraceLoadingWorker trong
+# giao diện chỉ chuyển các callback thành tín hiệu Qt.
+
+
+def load_trace(file_path, decoder_table=None, dbc_path=None, status=None, percent=None, workers=None):
+    """Đọc và giải mã một file trace CSV/ASC/BLF.
+
+    status(message) / percent(0-100) báo tiến trình (có thể None).
+    dbc_path là khóa cache theo DBC (bỏ qua nếu không có decoder_table).
+    Trả về (TraceStore, signal_timeseries, số frame đã giải mã, số lỗi).
+    """
+    status = status or (lambda message: None)
+    percent = percent or (lambda value: None)
+    signal_timeseries = {} # { 'SignalName': (timestamps float64[], values float64[]) }
+    decoded_count = 0
+    start_time = time.monotonic()
+
+    def report_progress(bytes_read, total_bytes, line_count):
+        # Tiến trình theo byte đã đọc (không cần đếm dòng trước)
+        elapsed = time.monotonic() - start_time
+        rate = int(line_count / elapsed) if elapsed > 0 else 0
+        status(f"Đọc dòng {line_count} ({rate} dòng/s)...")
+        if total_bytes > 0:
+            percent(int(bytes_read * 100 / total_bytes))
+
+    dbc_hash = file_hash(dbc_path if decoder_table is not None else None)
+    cached = load_trace_cache(file_path, dbc_hash)
+    if cached is not None:
+        # Cache cạnh file còn hợp lệ: map thẳng, không đọc lại trace
+        trace_data, signal_timeseries, decoded_count, error_count = cached
+        status(f"Đọc Trace từ cache ({len(trace_data)} msgs). Giải mã: {decoded_count}. Lỗi: {error_count}")
+        percent(100)
+        return trace_data, signal_timeseries, decoded_count, error_count
+
+    status(f"Đọc Trace: {os.path.basename(file_path)}...")
+    workers = workers or os.cpu_count() or 1
+    if is_vector_trace(file_path):
+        # Log Vector .asc/.blf: đọc trực tiếp qua python-can, không cần chuyển sang CSV
+        trace_data, error_count = read_vector_trace(file_path, progress=report_progress)
+        decode_after_read = True
+    elif workers > 1 and os.path.getsize(file_path) >= PARALLEL_MIN_BYTES:
+        # File lớn: chia theo đoạn byte, mỗi tiến trình đọc + giải mã một đoạn
+        status(f"Đọc Trace song song ({workers} tiến trình)...")
+        trace_data, signal_timeseries, decoded_count, error_count = read_csv_trace_parallel(
+            file_path, decoder_table, progress=report_progress, workers=workers)
+        decode_after_read = False
+    else:
+        # Đọc một lần theo khối nhị phân, chuyển đổi theo cột cho cả khối
+        trace_data, error_count = read_csv_trace(file_path, progress=report_progress)
+        decode_after_read = True
+
+    # Giải mã hàng loạt sau khi đọc: frame được nhóm theo ID và mỗi tín hiệu
+    # được tách bằng phép toán bit NumPy trên toàn bộ ma trận payload
+    if decode_after_read and decoder_table is not None and len(trace_data):
+        status(f"Giải mã {len(trace_data)} msgs...")
+        signal_timeseries, decoded_count, decode_errors = decoder_table.decode_trace(trace_data)
+        error_count += decode_errors
+
+    if len(trace_data):
+        status("Ghi cache trace...")
+        save_trace_cache(file_path, dbc_hash, trace_data, signal_timeseries, decoded_count, error_count)
+
+    status(f"Đọc Trace hoàn tất ({len(trace_data)} msgs). Giải mã: {decoded_count}. Lỗi: {error_count}")
+    percent(100)
+    return trace_data, signal_timeseries, decoded_count, error_count
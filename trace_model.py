@@ -0,0 +1,160 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from trace_buffer import FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR
+
+# --- Model Qt cho bảng Trace ---
+# Dùng chung cho các GUI: hiển thị một FrameRingBuffer (live) hoặc TraceStore
+# (file) trong QTableView mà không tạo item cho từng ô.
+
+# Các cột có thể hiển thị: khóa -> tiêu đề
+TRACE_COLUMN_HEADERS = {
+    'timestamp': "Timestamp",
+    'id': "ID (Hex)",
+    'xtd': "Xtd",
+    'rtr': "RTR",
+    'err': "ERR",
+    'dlc': "DLC",
+    'data': "Data (Hex)",
+    'decoded': "Decoded Signals",
+}
+LIVE_TRACE_COLUMNS = ('timestamp', 'id', 'xtd', 'rtr', 'err', 'dlc', 'data', 'decoded')
+FILE_TRACE_COLUMNS = ('timestamp', 'id', 'dlc', 'data', 'decoded')
+
+
+def format_decoded(decoded_signals_dict):
+    """Format dict tín hiệu đã giải mã thành chuỗi hiển thị."""
+    decoded_str_parts = []
+    for name, val in decoded_signals_dict.items():
+        # Format số float với độ chính xác hợp lý
+        if isinstance(val, float):
+            formatted_val = f"{val:.4g}"
+        else:
+            formatted_val = str(val)
+        decoded_str_parts.append(f"{name}={formatted_val}")
+    return "; ".join(decoded_str_parts)
+
+
+class TraceTableModel(QAbstractTableModel):
+    """Model chỉ đọc hiển thị một bộ đệm frame trong QTableView.
+
+    Bộ đệm là FrameRingBuffer hoặc TraceStore (len, frame, first_seq). Text
+    của ô chỉ được tạo trong data(), tức là chỉ cho các dòng đang hiển thị;
+    chuỗi giải mã được cache theo số thứ tự frame.
+    """
+    DECODED_CACHE_SIZE = 4096
+
+    def __init__(self, columns=LIVE_TRACE_COLUMNS, parent=None):
+        super().__init__(parent)
+        self._columns = tuple(columns)
+        self._decoded_column = self._columns.index('decoded') if 'decoded' in self._columns else -1
+        self._buffer = None
+        self._decoder_table = None
+        self._show_flags = True   # Trace CSV không có thông tin Xtd/RTR/ERR
+        self._decoded_cache = {}  # frame seq -> chuỗi giải mã
+
+    def frame_buffer(self):
+        return self._buffer
+
+    def set_source(self, frame_buffer, decoder_table=None, show_flags=True):
+        """Đổi bộ đệm frame được hiển thị (reset toàn bộ model)."""
+        self.beginResetModel()
+        self._buffer = frame_buffer
+        self._decoder_table = decoder_table
+        self._show_flags = show_flags
+        self._decoded_cache = {}
+        self.endResetModel()
+
+    def set_decoder_table(self, decoder_table):
+        self._decoder_table = decoder_table
+        self._decoded_cache = {}
+        if self.rowCount() > 0 and self._decoded_column >= 0:
+            self.dataChanged.emit(self.index(0, self._decoded_column),
+                                  self.index(self.rowCount() - 1, self._decoded_column))
+
+    def append_messages(self, msgs):
+        """Thêm một batch can.Message vào bộ đệm vòng đang hiển thị."""
+        frame_buffer = self._buffer
+        if frame_buffer is None or not msgs:
+            return
+        overflow = frame_buffer.overflow_for(len(msgs))
+        if overflow and overflow >= len(frame_buffer):
+            # Cả bảng bị thay thế: reset rẻ hơn xóa/thêm từng khoảng
+            self.beginResetModel()
+            frame_buffer.append_messages(msgs)
+            self._decoded_cache = {}
+            self.endResetModel()
+            return
+        if overflow:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            frame_buffer.drop_front(overflow)
+            self.endRemoveRows()
+        first_row = len(frame_buffer)
+        added = min(len(msgs), frame_buffer.capacity)
+        self.beginInsertRows(QModelIndex(), first_row, first_row + added - 1)
+        frame_buffer.append_messages(msgs)
+        self.endInsertRows()
+
+    def clear(self):
+        if self._buffer is not None and hasattr(self._buffer, 'clear'):
+            self.beginResetModel()
+            self._buffer.clear()
+            self._decoded_cache = {}
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._buffer is None:
+            return 0
+        return len(self._buffer)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return TRACE_COLUMN_HEADERS[self._columns[section]]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or self._buffer is None:
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole or (role == Qt.ToolTipRole and column == self._decoded_column):
+            return self._cell_text(index.row(), self._columns[column])
+        if role == Qt.TextAlignmentRole:
+            key = self._columns[column]
+            if key in ('id', 'dlc'):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            if key in ('xtd', 'rtr', 'err'):
+                return int(Qt.AlignCenter)
+        return None
+
+    def _cell_text(self, row, key):
+        timestamp, frame_id, dlc, flags, data = self._buffer.frame(row)
+        if key == 'timestamp': return f"{timestamp:.6f}"
+        if key == 'id': return f"{frame_id:X}"
+        if key == 'xtd': return ("Y" if flags & FLAG_EXTENDED else "N") if self._show_flags else ""
+        if key == 'rtr': return ("Y" if flags & FLAG_REMOTE else "N") if self._show_flags else ""
+        if key == 'err': return ("Y" if flags & FLAG_ERROR else "N") if self._show_flags else ""
+        if key == 'dlc': return str(dlc)
+        if key == 'data': return data.hex().upper()
+
+        # Cột giải mã: chỉ giải mã khi dòng được hiển thị
+        seq = self._buffer.first_seq + row
+        decoded_str = self._decoded_cache.get(seq)
+        if decoded_str is None:
+            decoded_str = self._decode_frame(frame_id, flags, data)
+            if len(self._decoded_cache) >= self.DECODED_CACHE_SIZE:
+                self._decoded_cache = {}
+            self._decoded_cache[seq] = decoded_str
+        return decoded_str
+
+    def _decode_frame(self, frame_id, flags, data):
+        if self._decoder_table is None or not data or flags & (FLAG_REMOTE | FLAG_ERROR):
+            return ""
+        decoder = self._decoder_table.get(frame_id)
+        if decoder is None:
+            return "(ID không có trong DBC)"
+        try:
+            return format_decoded(decoder.decode(data))
+        except Exception:
+            return "(Lỗi Decode)"
@@ -0,0 +1,71 @@
+import io
+import os
+
+from module_loader import load_module
+from trace_buffer import TraceStoreBuilder, message_flags
+
+# --- Đọc log Vector (.asc / .blf) trực tiếp ---
+# Frame được đọc tuần tự qua can.ASCReader / can.BLFReader và ghi thẳng vào
+# TraceStoreBuilder (cùng cấu trúc với trace CSV), không cần chuyển sang CSV.
+# Tiến trình tính theo vị trí byte của file gốc. iter_vector_trace đọc theo
+# batch để xử lý file lớn với bộ nhớ cố định.
+
+VECTOR_TRACE_EXTENSIONS = ('.asc', '.blf')
+PROGRESS_EVERY = 65536 # Báo tiến trình sau mỗi chừng này frame
+BATCH_FRAMES = 65536   # Số frame mỗi batch khi đọc theo luồng (iter_vector_trace)
+
+
+def is_vector_trace(file_path):
+    return os.path.splitext(file_path)[1].lower() in VECTOR_TRACE_EXTENSIONS
+
+
+def _iter_batches(file_path, batch_frames, progress):
+    """Sinh ra (TraceStore, số frame lỗi) mỗi batch_frames frame (None: một lần cho cả file)."""
+    total_bytes = os.path.getsize(file_path)
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in VECTOR_TRACE_EXTENSIONS:
+        raise ValueError(f"Định dạng trace không hỗ trợ: {extension}")
+    can = load_module("can") # python-can chỉ cần khi đọc log Vector
+    with open(file_path, 'rb') as raw_file:
+        if extension == '.blf':
+            reader = can.BLFReader(raw_file)
+        else:
+            # ASCReader cần file text; vị trí byte lấy từ file nhị phân bên dưới
+            reader = can.ASCReader(io.TextIOWrapper(raw_file, encoding='utf-8', errors='replace'))
+        builder = TraceStoreBuilder()
+        error_count = 0
+        count = 0
+        for count, msg in enumerate(reader, 1):
+            if not (0 <= msg.arbitration_id <= 0xFFFFFFFF) or len(msg.data) > 255:
+                error_count += 1 # Frame không hợp lệ
+                continue
+            # DLC lưu theo số byte data (giống trace CSV), riêng remote frame giữ DLC yêu cầu
+            dlc = min(msg.dlc, 255) if msg.is_remote_frame else len(msg.data)
+            builder.append(msg.timestamp, msg.arbitration_id, dlc, message_flags(msg), bytes(msg.data))
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                progress(raw_file.tell(), total_bytes, count)
+            if batch_frames is not None and len(builder) >= batch_frames:
+                yield builder.build(), error_count
+                builder = TraceStoreBuilder()
+                error_count = 0
+        if progress is not None:
+            progress(total_bytes, total_bytes, count)
+        yield builder.build(), error_count
+
+
+def read_vector_trace(file_path, progress=None):
+    """Đọc file .asc/.blf thành TraceStore.
+
+    progress(bytes_read, total_bytes, frame_count) được gọi định kỳ.
+    Trả về (TraceStore, số frame lỗi).
+    """
+    (trace_data, error_count), = _iter_batches(file_path, None, progress)
+    return trace_data, error_count
+
+
+def iter_vector_trace(file_path, batch_frames=BATCH_FRAMES, progress=None):
+    """Đọc file .asc/.blf theo từng batch frame (bộ nhớ cố định).
+
+    Sinh ra (TraceStore của batch, số frame lỗi trong batch) theo thứ tự file.
+    """
+    return _iter_batches(file_path, batch_frames, progress)